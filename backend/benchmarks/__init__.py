@@ -0,0 +1,19 @@
+"""
+Performance benchmarks for the API.
+
+They run against a throwaway SQLite database seeded with synthetic data
+(see benchmarks.settings and benchmarks.seed), never against db.sqlite3.
+"""
+
+import os
+
+
+def setup_django(directory):
+    """Configure Django for a benchmark database in `directory` and create its tables"""
+    os.environ['BENCHMARK_DATABASE'] = os.path.join(directory, 'benchmark.sqlite3')
+    os.environ['DJANGO_SETTINGS_MODULE'] = 'benchmarks.settings'
+
+    import django
+    django.setup()
+    from django.core.management import call_command
+    call_command('migrate', verbosity=0)
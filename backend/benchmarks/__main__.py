@@ -0,0 +1,84 @@
+"""
+Latency, throughput and queries per request of every API endpoint, checked against a baseline.
+
+    python -m benchmarks [--users 10] [--posts 200] [--comments 5] [--requests 100]
+                         [--only REGEX] [--cache] [--save-baseline] [--queries-only]
+                         [--threshold 0.25] [--min-delta 1]
+
+Seeds a throwaway database, measures each scenario in benchmarks.api and prints a table.
+With --save-baseline the results are written to the baseline file; otherwise they are compared
+with it, and the run exits with status 1 when a scenario's p95 latency grew by more than the
+threshold (and by at least --min-delta ms) or it makes more queries per request than before,
+and with status 2 when there is no baseline to compare with.
+
+Latencies are machine-specific: save a baseline on the machine (and with the options) you
+compare on. Queries per request are not, so the committed baseline.json holds only those
+(--save-baseline --queries-only with the default options), which is what CI checks.
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+from benchmarks import setup_django
+
+DEFAULT_BASELINE = Path(__file__).resolve().parent / 'baseline.json'
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=10, help='users to seed')
+    parser.add_argument('--posts', type=int, default=200, help='posts to seed')
+    parser.add_argument('--comments', type=int, default=5, help='comments to seed per post')
+    parser.add_argument('--requests', type=int, default=100, help='measured requests per scenario')
+    parser.add_argument('--only', help='only run the scenarios whose name matches this regular expression')
+    parser.add_argument('--cache', action='store_true', help='enable the response cache')
+    parser.add_argument('--baseline', type=Path, default=DEFAULT_BASELINE, help='baseline file')
+    parser.add_argument('--save-baseline', action='store_true', help='write the results to the baseline file')
+    parser.add_argument('--queries-only', action='store_true',
+                        help='only save and compare the queries per request, which are the same on every machine')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='allowed p95 slowdown against the baseline, as a fraction (default 0.25)')
+    parser.add_argument('--min-delta', type=float, default=1.0,
+                        help='p95 slowdowns under this many milliseconds are never regressions (default 1)')
+    parser.add_argument('--json', type=Path, help='also write the results to this file')
+    args = parser.parse_args(argv)
+    if not args.save_baseline and not args.baseline.exists():
+        print(f'no baseline at {args.baseline}; run with --save-baseline to create one', file=sys.stderr)
+        return 2
+
+    os.environ['RESPONSE_CACHE_ENABLED'] = str(args.cache)
+    with tempfile.TemporaryDirectory() as directory:
+        setup_django(directory)
+        from benchmarks.api import HEADER, Runner, compare, uncovered_routes
+        from benchmarks.seed import seed
+
+        runner = Runner(seed(users=args.users, posts=args.posts, comments=args.comments), requests=args.requests)
+        missing = uncovered_routes(runner.scenarios())
+        if missing:
+            print(f"warning: no scenario for {', '.join(missing)}", file=sys.stderr)
+        print(HEADER)
+        results = runner.run(only=args.only)
+
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2) + '\n')
+    if args.queries_only:
+        results = {name: {'queries': result['queries']} for name, result in results.items()}
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(results, indent=2, sort_keys=True) + '\n')
+        print(f'baseline saved to {args.baseline}')
+        return 0
+
+    regressions = compare(results, json.loads(args.baseline.read_text()), args.threshold, args.min_delta)
+    for regression in regressions:
+        print(f'REGRESSION {regression}')
+    if regressions:
+        return 1
+    print(f'no regressions against {args.baseline}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,267 @@
+"""
+Latency, throughput and query-count benchmark of every API endpoint.
+
+Each scenario sends the same request to one endpoint a number of times through Django's test
+client (in process, so only the application is measured) against the seeded database, and
+records the latency and the number of SQL queries of every request. Writes get a fresh target
+from their `setup` before each request, outside of the measured time.
+"""
+
+import io
+import json
+import re
+import statistics
+import time
+from contextlib import redirect_stdout
+from django.db import connection, reset_queries
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, URLResolver, get_resolver, reverse
+from django.contrib.auth import get_user_model
+from rest_framework.authtoken.models import Token
+from blog.models import BlogPost
+from comments.models import Comment
+from users.testing import GitHubStub
+
+User = get_user_model()
+
+PASSWORD = 'BenchPass123!'
+
+# routes that can't be driven on their own
+NOT_BENCHMARKED = {
+    'rest_password_reset': "the reset email links to a 'password_reset_confirm' route the project doesn't define",
+    'rest_password_reset_confirm': 'needs a reset token from the email',
+    'rest_verify_email': 'needs a key from the confirmation email',
+    'rest_resend_email': 'email verification is disabled',
+    'account_confirm_email': 'needs a key from the confirmation email',
+    'account_email_verification_sent': 'template view, email verification is disabled',
+}
+
+
+class Scenario:
+    """
+    One request shape to measure. `url` and `data` may be callables taking the value
+    returned by `setup()`, which runs before every request and isn't timed.
+    """
+
+    def __init__(self, name, route, method='get', url=None, data=None, status=200,
+                 setup=None, auth=False, requests=None):
+        self.name = name
+        self.route = route
+        self.method = method
+        self.url = url or reverse(route)
+        self.data = data
+        self.status = status
+        self.setup = setup
+        # True sends the benchmark author's token, a callable gets the token from the setup value
+        self.auth = auth
+        # cap for the scenarios dominated by password hashing
+        self.requests = requests
+
+    def build(self, context):
+        url = self.url(context) if callable(self.url) else self.url
+        data = self.data(context) if callable(self.data) else self.data
+        return url, data
+
+
+def percentile(values, pct):
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method='inclusive')[pct - 1]
+
+
+class Runner:
+    """Builds the scenarios from seeded data and measures them"""
+
+    def __init__(self, posts, requests=100, warmup=5):
+        self.requests = requests
+        self.warmup = warmup
+        self.post = posts[0]
+        self.author = self.post.author
+        self.comment = self.post.comments.order_by('id').first()
+        self.token = Token.objects.get_or_create(user=self.author)[0].key
+        self.author.set_password(PASSWORD)
+        self.author.save()
+        self.counter = 0
+
+    def unique(self):
+        self.counter += 1
+        return self.counter
+
+    def new_post(self, context=None):
+        return BlogPost.objects.create(title='Scratch post', content='# Scratch\n\nBody', author=self.author)
+
+    def new_comment(self, context=None):
+        return Comment.objects.create(post=self.post, author=self.author, content='Scratch comment')
+
+    def new_token(self, context=None):
+        # logging out deletes the token, so every request logs out a user of its own
+        n = self.unique()
+        user = User.objects.create_user(f'logout{n}@example.com', username=f'logout{n}')
+        return Token.objects.create(user=user).key
+
+    def scenarios(self):
+        post, comment, username = self.post, self.comment, self.author.username
+        word = re.search(r'\w+', post.title).group()
+        tag = post.tag_set.order_by('name').values_list('name', flat=True).first()
+        jsonl = '\n'.join(
+            json.dumps({'title': f'Imported {i}', 'content': '## Imported\n\n*body*', 'tags': ['bench']})
+            for i in range(10)
+        )
+        return [
+            # blog reads
+            Scenario('post list', 'blog-list'),
+            Scenario('post list ?tags', 'blog-list', url=f"{reverse('blog-list')}?tags={tag}"),
+            Scenario('post detail', 'blog-detail', url=reverse('blog-detail', args=[post.pk])),
+            Scenario('related posts', 'blog-related', url=reverse('blog-related', args=[post.pk])),
+            Scenario('author posts', 'user-posts', url=reverse('user-posts', args=[username])),
+            Scenario('tag list', 'tag-list'),
+            Scenario('search', 'blog-search', url=f"{reverse('blog-search')}?q={word}"),
+            Scenario('export', 'blog-export', auth=True, requests=10),
+            Scenario('async post list', 'blog-list-async'),
+            Scenario('async post detail', 'blog-detail-async', url=reverse('blog-detail-async', args=[post.pk])),
+            Scenario('async author posts', 'user-posts-async', url=reverse('user-posts-async', args=[username])),
+            # blog writes
+            Scenario('create post', 'blog-list', 'post', status=201, auth=True,
+                     data={'title': 'New post', 'content': '# New\n\nBody', 'tags': ['bench']}),
+            Scenario('update post', 'blog-detail', 'put', auth=True, setup=self.new_post,
+                     url=lambda p: reverse('blog-detail', args=[p.pk]),
+                     data={'title': 'Updated', 'content': '## Updated\n\nBody', 'tags': ['bench']}),
+            Scenario('delete post', 'blog-detail', 'delete', status=204, auth=True, setup=self.new_post,
+                     url=lambda p: reverse('blog-detail', args=[p.pk])),
+            Scenario('import 10 posts', 'blog-import', 'post', status=201, auth=True, data=jsonl,
+                     requests=20),
+            # comments
+            Scenario('comment list', 'comment-list', url=f"{reverse('comment-list')}?post_id={post.pk}"),
+            Scenario('threaded comments', 'comment-list',
+                     url=f"{reverse('comment-list')}?post_id={post.pk}&threaded=true"),
+            Scenario('comment detail', 'comment-detail', url=reverse('comment-detail', args=[comment.pk])),
+            Scenario('async comment list', 'comment-list-async',
+                     url=f"{reverse('comment-list-async')}?post_id={post.pk}"),
+            Scenario('async comment detail', 'comment-detail-async',
+                     url=reverse('comment-detail-async', args=[comment.pk])),
+            Scenario('create comment', 'comment-list', 'post', status=201, auth=True,
+                     data={'post_id': post.pk, 'content': 'New comment'}),
+            Scenario('update comment', 'comment-detail', 'put', auth=True, setup=self.new_comment,
+                     url=lambda c: reverse('comment-detail', args=[c.pk]), data={'content': 'Edited'}),
+            Scenario('delete comment', 'comment-detail', 'delete', status=204, auth=True,
+                     setup=self.new_comment, url=lambda c: reverse('comment-detail', args=[c.pk])),
+            Scenario('bulk delete comments', 'comment-bulk-delete', 'post', auth=True,
+                     setup=lambda _: [self.new_comment().pk for _ in range(5)], data=lambda ids: {'ids': ids}),
+            # users
+            Scenario('login', 'rest_login', 'post', data={'username': username, 'password': PASSWORD}, requests=20),
+            Scenario('logout', 'rest_logout', 'post', setup=self.new_token, auth=lambda token: token),
+            Scenario('user details', 'rest_user_details', auth=True),
+            Scenario('signup', 'rest_register', 'post', status=201, requests=20, setup=lambda _: self.unique(),
+                     data=lambda n: {'username': f'signup{n}', 'email': f'signup{n}@example.com',
+                                     'password1': PASSWORD, 'password2': PASSWORD}),
+            Scenario('password change', 'rest_password_change', 'post', auth=True, requests=20,
+                     data={'new_password1': PASSWORD, 'new_password2': PASSWORD}),
+            Scenario('github login', 'github-callback', 'post', data={'code': 'benchmark'}, requests=20),
+        ]
+
+    def measure(self, scenario):
+        client = Client()
+        count = min(self.requests, scenario.requests or self.requests)
+        latencies, queries = [], []
+        for i in range(self.warmup + count):
+            context = scenario.setup(None) if scenario.setup else None
+            url, data = scenario.build(context)
+            headers = {}
+            if scenario.auth:
+                token = scenario.auth(context) if callable(scenario.auth) else self.token
+                headers['HTTP_AUTHORIZATION'] = f'Token {token}'
+            if isinstance(data, str):
+                kwargs = {'data': data, 'content_type': 'application/x-ndjson'}
+            elif data is not None:
+                kwargs = {'data': json.dumps(data), 'content_type': 'application/json'}
+            else:
+                kwargs = {}
+
+            # the query log is capped, and a full one hides the queries of the next request
+            reset_queries()
+            # the views' debugging prints would drown the report
+            with CaptureQueriesContext(connection) as captured, redirect_stdout(io.StringIO()):
+                started = time.perf_counter()
+                response = getattr(client, scenario.method)(url, **kwargs, **headers)
+                if response.streaming:
+                    b''.join(response.streaming_content)
+                elapsed = time.perf_counter() - started
+            if response.status_code != scenario.status:
+                raise RuntimeError(
+                    f'{scenario.name}: {scenario.method.upper()} {url} returned {response.status_code}, '
+                    f'expected {scenario.status}: {response.content[:200]!r}'
+                )
+            if i >= self.warmup:
+                latencies.append(elapsed)
+                queries.append(len(captured))
+
+        total = sum(latencies)
+        return {
+            'route': scenario.route,
+            'method': scenario.method.upper(),
+            'requests': count,
+            'p50_ms': percentile(latencies, 50) * 1000,
+            'p95_ms': percentile(latencies, 95) * 1000,
+            'p99_ms': percentile(latencies, 99) * 1000,
+            'throughput': count / total if total else 0.0,
+            'queries': statistics.mean(queries),
+        }
+
+    def run(self, only=None, log=print):
+        results = {}
+        with GitHubStub() as github, override_settings(**github.settings()):
+            for scenario in self.scenarios():
+                if only and not re.search(only, scenario.name):
+                    continue
+                results[scenario.name] = self.measure(scenario)
+                log(format_row(scenario.name, results[scenario.name]))
+        return results
+
+
+def uncovered_routes(scenarios):
+    """Named routes (outside the admin) that no scenario drives and that aren't knowingly skipped"""
+    def walk(resolver):
+        for pattern in resolver.url_patterns:
+            if isinstance(pattern, URLResolver):
+                if pattern.app_name != 'admin':
+                    yield from walk(pattern)
+            elif isinstance(pattern, URLPattern) and pattern.name:
+                yield pattern.name
+
+    covered = {scenario.route for scenario in scenarios}
+    return sorted(set(walk(get_resolver())) - covered - NOT_BENCHMARKED.keys())
+
+
+HEADER = f"{'scenario':<24} {'requests':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'req/s':>8} {'queries':>8}"
+
+
+def format_row(name, result):
+    return (
+        f"{name:<24} {result['requests']:>8} {result['p50_ms']:>8.2f} {result['p95_ms']:>8.2f} "
+        f"{result['p99_ms']:>8.2f} {result['throughput']:>8.1f} {result['queries']:>8.1f}"
+    )
+
+
+def compare(results, baseline, threshold, min_delta_ms=1.0):
+    """
+    Return a description of every regression against the baseline:
+    p95 latency more than `threshold` (a fraction) and `min_delta_ms` slower, or any extra
+    query per request. The absolute floor keeps timer noise on millisecond endpoints from failing a run.
+    Latencies are only compared when both sides have them (not with --queries-only).
+    """
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        if 'p95_ms' in base and 'p95_ms' in result:
+            slower = result['p95_ms'] - base['p95_ms']
+            if slower > base['p95_ms'] * threshold and slower > min_delta_ms:
+                regressions.append(
+                    f"{name}: p95 {result['p95_ms']:.2f} ms vs baseline {base['p95_ms']:.2f} ms "
+                    f"(+{(result['p95_ms'] / base['p95_ms'] - 1) * 100:.0f}%, threshold {threshold * 100:.0f}%)"
+                )
+        if result['queries'] > base['queries']:
+            regressions.append(f"{name}: {result['queries']:.1f} queries per request vs baseline {base['queries']:.1f}")
+    return regressions
@@ -0,0 +1,147 @@
+"""
+Throughput of the sync (DRF) read views against their async-native counterparts under uvicorn.
+
+    python -m benchmarks.asgi_views [--requests 500] [--concurrency 20] [--posts 200]
+
+Seeds a throwaway database, starts `uvicorn config.asgi:application` on it, then fires the same
+number of concurrent GETs at each sync endpoint and its /async/ twin and prints the
+requests per second and latency percentiles of both.
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from benchmarks import setup_django
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+def endpoints(post, comment):
+    """(label, sync path, async path) of every read endpoint with an async counterpart"""
+    username = post.author.username
+    return [
+        ('post list', '/blog/posts/', '/blog/async/posts/'),
+        ('post detail', f'/blog/posts/{post.pk}/', f'/blog/async/posts/{post.pk}/'),
+        ('author posts', f'/blog/user/{username}/posts/', f'/blog/async/user/{username}/posts/'),
+        ('comment list', f'/comments/?post_id={post.pk}', f'/comments/async/?post_id={post.pk}'),
+        (
+            'threaded comments',
+            f'/comments/?post_id={post.pk}&threaded=true',
+            f'/comments/async/?post_id={post.pk}&threaded=true',
+        ),
+        ('comment detail', f'/comments/{comment.pk}/', f'/comments/async/{comment.pk}/'),
+    ]
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(port, process, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError('uvicorn exited before accepting connections')
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.2).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f'uvicorn did not start listening on port {port} within {timeout}s')
+
+
+async def load(client, path, requests, concurrency):
+    """GET `path` `requests` times, `concurrency` at a time; return (wall time, latencies)"""
+    latencies = []
+    queue = asyncio.Queue()
+    for _ in range(requests):
+        queue.put_nowait(path)
+
+    async def worker():
+        while not queue.empty():
+            queue.get_nowait()
+            started = time.perf_counter()
+            response = await client.get(path)
+            latencies.append(time.perf_counter() - started)
+            if response.status_code != 200:
+                raise RuntimeError(f'GET {path} returned {response.status_code}')
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return time.perf_counter() - started, latencies
+
+
+def percentile(values, pct):
+    return statistics.quantiles(values, n=100, method='inclusive')[pct - 1] if len(values) > 1 else values[0]
+
+
+async def run(base_url, pairs, requests, concurrency):
+    import httpx
+
+    results = []
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        for label, sync_path, async_path in pairs:
+            row = [label]
+            for path in (sync_path, async_path):
+                await load(client, path, min(requests, 20), concurrency)  # warm up
+                elapsed, latencies = await load(client, path, requests, concurrency)
+                row.append((requests / elapsed, percentile(latencies, 50), percentile(latencies, 95)))
+            results.append(row)
+    return results
+
+
+def report(results):
+    print(f"{'endpoint':<20} {'sync req/s':>10} {'p50 ms':>8} {'p95 ms':>8}   "
+          f"{'async req/s':>11} {'p50 ms':>8} {'p95 ms':>8}   {'speedup':>7}")
+    for label, (sync_rps, sync_p50, sync_p95), (async_rps, async_p50, async_p95) in results:
+        print(
+            f'{label:<20} {sync_rps:>10.1f} {sync_p50 * 1000:>8.1f} {sync_p95 * 1000:>8.1f}   '
+            f'{async_rps:>11.1f} {async_p50 * 1000:>8.1f} {async_p95 * 1000:>8.1f}   '
+            f'{async_rps / sync_rps:>6.2f}x'
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=500, help='requests per endpoint')
+    parser.add_argument('--concurrency', type=int, default=20, help='requests in flight at once')
+    parser.add_argument('--posts', type=int, default=200, help='posts to seed')
+    parser.add_argument('--comments', type=int, default=30, help='comments to seed per post')
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        setup_django(directory)
+        from benchmarks.seed import seed
+
+        posts = seed(posts=args.posts, comments=args.comments)
+        post = posts[0]
+        pairs = endpoints(post, post.comments.order_by('id').first())
+
+        port = free_port()
+        server = subprocess.Popen(
+            [sys.executable, '-m', 'uvicorn', 'config.asgi:application',
+             '--host', '127.0.0.1', '--port', str(port), '--log-level', 'warning'],
+            cwd=BACKEND_DIR,
+            env=os.environ.copy(),
+        )
+        try:
+            wait_for_port(port, server)
+            results = asyncio.run(run(f'http://127.0.0.1:{port}', pairs, args.requests, args.concurrency))
+        finally:
+            server.terminate()
+            server.wait()
+    report(results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+"""
+Per-request cost of token authentication on an authenticated, write-heavy workload: DRF's
+TokenAuthentication (a token and user query on every request) against
+users.authentication.CachedTokenAuthentication.
+
+    python -m benchmarks.authentication [--requests 200] [--posts 50]
+
+Runs the authenticated scenarios of benchmarks.api once with each class against the same
+seeded database and prints their latency and queries per request side by side.
+"""
+
+import argparse
+import tempfile
+from unittest import mock
+from benchmarks import setup_django
+
+# authenticated scenarios, mostly writes; logout is left out since it revokes its token every request
+SCENARIOS = r'^(create post|update post|delete post|create comment|update comment|delete comment|user details)$'
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=200, help='measured requests per scenario')
+    parser.add_argument('--posts', type=int, default=50, help='posts to seed')
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        setup_django(directory)
+        from rest_framework.authentication import TokenAuthentication
+        from rest_framework.views import APIView
+        from benchmarks.api import Runner
+        from benchmarks.seed import seed
+        from users import authentication
+
+        runner = Runner(seed(users=5, posts=args.posts, comments=2), requests=args.requests)
+        results = {}
+        for name, auth in (('token', TokenAuthentication), ('cached', authentication.CachedTokenAuthentication)):
+            authentication.clear()
+            with mock.patch.object(APIView, 'authentication_classes', [auth]):
+                results[name] = runner.run(only=SCENARIOS, log=lambda line: None)
+
+    print(f"{'scenario':<16} {'token p50':>10} {'cached p50':>11} {'saved ms':>9} {'token q':>8} {'cached q':>9}")
+    for scenario, before in results['token'].items():
+        after = results['cached'][scenario]
+        print(
+            f"{scenario:<16} {before['p50_ms']:>10.2f} {after['p50_ms']:>11.2f} "
+            f"{before['p50_ms'] - after['p50_ms']:>9.2f} {before['queries']:>8.1f} {after['queries']:>9.1f}"
+        )
+
+
+if __name__ == '__main__':
+    main()
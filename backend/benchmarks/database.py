@@ -0,0 +1,138 @@
+"""
+Reader/writer contention on SQLite, with the connection settings Django used by default
+(rollback journal, synchronous=FULL, deferred transactions) against config.database's
+(WAL, synchronous=NORMAL, busy_timeout, immediate transactions).
+
+    python -m benchmarks.database [--readers 4] [--writers 2] [--seconds 5]
+
+Readers page through the newest posts, like the post list; writers add a comment to a post and
+bump its counters in one transaction that reads before it writes, like the comment views.
+Both run in threads on their own connections to a throwaway database file, and every
+operation's latency and every 'database is locked' failure is recorded.
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+from config.database import SQLITE_PRAGMAS, sqlite_init_command
+
+POSTS = 2000
+
+MODES = {
+    'default': {'pragmas': 'PRAGMA journal_mode=DELETE;PRAGMA synchronous=FULL', 'begin': 'BEGIN', 'timeout': 5.0},
+    'tuned': {
+        'pragmas': sqlite_init_command(SQLITE_PRAGMAS['busy_timeout']),
+        'begin': 'BEGIN IMMEDIATE',
+        'timeout': SQLITE_PRAGMAS['busy_timeout'] / 1000,
+    },
+}
+
+
+def connect(path, mode):
+    connection = sqlite3.connect(path, timeout=mode['timeout'], isolation_level=None, check_same_thread=False)
+    for pragma in mode['pragmas'].split(';'):
+        connection.execute(pragma)
+    return connection
+
+
+def create(path):
+    connection = sqlite3.connect(path)
+    connection.executescript("""
+        CREATE TABLE post (id INTEGER PRIMARY KEY, title TEXT, excerpt TEXT, comment_count INTEGER, updated REAL);
+        CREATE TABLE comment (id INTEGER PRIMARY KEY, post_id INTEGER REFERENCES post (id), content TEXT, created REAL);
+        CREATE INDEX comment_post ON comment (post_id, created);
+    """)
+    connection.executemany(
+        'INSERT INTO post (title, excerpt, comment_count, updated) VALUES (?, ?, 0, ?)',
+        ((f'Post {i}', 'lorem ipsum ' * 20, time.time()) for i in range(POSTS)),
+    )
+    connection.commit()
+    connection.close()
+
+
+def read(connection, rng):
+    cursor = rng.randrange(POSTS)
+    connection.execute(
+        'SELECT id, title, excerpt, comment_count FROM post WHERE id < ? ORDER BY id DESC LIMIT 20', (cursor,)
+    ).fetchall()
+
+
+def write(connection, rng, begin):
+    post = rng.randrange(1, POSTS)
+    connection.execute(begin)
+    try:
+        (count,) = connection.execute('SELECT comment_count FROM post WHERE id = ?', (post,)).fetchone()
+        connection.execute('INSERT INTO comment (post_id, content, created) VALUES (?, ?, ?)',
+                           (post, 'benchmark comment', time.time()))
+        connection.execute('UPDATE post SET comment_count = ?, updated = ? WHERE id = ?', (count + 1, time.time(), post))
+        connection.execute('COMMIT')
+    except BaseException:
+        connection.execute('ROLLBACK')
+        raise
+
+
+def worker(path, mode, operation, seconds, stats, seed):
+    rng = random.Random(seed)
+    connection = connect(path, mode)
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        try:
+            if operation == 'write':
+                write(connection, rng, mode['begin'])
+            else:
+                read(connection, rng)
+        except sqlite3.OperationalError as error:
+            if 'locked' not in str(error):
+                raise
+            stats['errors'] += 1
+        else:
+            stats['latencies'].append(time.perf_counter() - started)
+    connection.close()
+
+
+def run(mode, readers, writers, seconds):
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'contention.sqlite3')
+        create(path)
+        connect(path, mode).close()  # switch the journal mode before the workers start
+        stats = {role: {'latencies': [], 'errors': 0} for role in ('read', 'write')}
+        threads = [
+            threading.Thread(target=worker, args=(path, mode, role, seconds, stats[role], i))
+            for i, role in enumerate(['read'] * readers + ['write'] * writers)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    return stats
+
+
+def percentile(values, pct):
+    return statistics.quantiles(values, n=100)[pct - 1] if len(values) > 1 else (values or [0])[0]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--readers', type=int, default=4, help='reading threads')
+    parser.add_argument('--writers', type=int, default=2, help='writing threads')
+    parser.add_argument('--seconds', type=float, default=5, help='duration of each run')
+    args = parser.parse_args(argv)
+
+    print(f"{'mode':<8} {'role':<6} {'ops/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'locked':>7}")
+    for name, mode in MODES.items():
+        for role, stats in run(mode, args.readers, args.writers, args.seconds).items():
+            latencies = stats['latencies']
+            print(
+                f'{name:<8} {role:<6} {len(latencies) / args.seconds:>8.0f} {percentile(latencies, 50) * 1000:>8.2f} '
+                f'{percentile(latencies, 95) * 1000:>8.2f} {percentile(latencies, 99) * 1000:>8.2f} {stats["errors"]:>7}'
+            )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""
+Per-post cost of the Markdown render pipeline, building the converter and sanitizer on every call
+(as blog.rendering used to) against reusing the thread's pre-built ones (blog.rendering.render_post).
+
+    python -m benchmarks.rendering [--repeat 200]
+
+Both produce the same output, which is checked before timing.
+"""
+
+import argparse
+import os
+import random
+import statistics
+import time
+import bleach
+import markdown as md
+
+DOCUMENTS = {
+    # a short note: a couple of headings and paragraphs
+    'small': 2,
+    # a long article
+    'large': 120,
+}
+
+
+def render_unshared(content):
+    """render_post, constructing a Markdown converter and both Cleaners for every document"""
+    from blog import rendering
+
+    converter = md.Markdown(extensions=['toc'])
+    html = bleach.clean(
+        converter.convert(content), tags=rendering.ALLOWED_TAGS, attributes=rendering.ALLOWED_ATTRIBUTES, strip=True
+    )
+    text = ' '.join(rendering.unescape(bleach.clean(html, tags=[], strip=True)).split())
+    word_count = len(rendering.WORD.findall(text))
+    return rendering.Rendered(
+        html=html,
+        excerpt=rendering.make_excerpt(text),
+        toc=rendering.toc_entries(converter.toc_tokens),
+        word_count=word_count,
+        reading_time=-(-word_count // rendering.WORDS_PER_MINUTE),
+    )
+
+
+def per_call(render, content, repeat):
+    """Median seconds per call over `repeat` calls"""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        render(content)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=200, help='renders per document and pipeline')
+    args = parser.parse_args(argv)
+
+    # no database is used, the models are only imported
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+    import django
+    django.setup()
+    from benchmarks.seed import markdown_body
+    from blog import rendering
+
+    rng = random.Random(0)
+    print(f"{'document':<10} {'bytes':>8} {'per call ms':>12} {'reused ms':>10} {'speedup':>8}")
+    for name, paragraphs in DOCUMENTS.items():
+        content = markdown_body(rng, paragraphs=paragraphs)
+        if render_unshared(content) != rendering.render_post(content):
+            raise RuntimeError(f'the two pipelines render the {name} document differently')
+        rendering.render_post(content)  # build this thread's converter and cleaners outside the timing
+        before = per_call(render_unshared, content, args.repeat)
+        after = per_call(rendering.render_post, content, args.repeat)
+        print(f'{name:<10} {len(content):>8} {before * 1000:>12.3f} {after * 1000:>10.3f} {before / after:>7.2f}x')
+
+
+if __name__ == '__main__':
+    main()
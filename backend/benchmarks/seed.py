@@ -0,0 +1,61 @@
+"""
+Synthetic data for benchmark runs.
+"""
+
+import random
+from django.contrib.auth import get_user_model
+from blog import bulk
+from blog.models import BlogPost
+from comments import counters
+from comments.models import Comment
+
+TAGS = ['django', 'python', 'react', 'performance', 'databases', 'testing', 'devops', 'security']
+
+
+def markdown_body(rng, paragraphs=6):
+    """A post body with the Markdown constructs real posts use: headings, emphasis, lists, links and code"""
+    parts = []
+    for i in range(paragraphs):
+        parts.append(f'## Section {i + 1}')
+        parts.append(
+            f'Some **bold** and *emphasised* text about {rng.choice(TAGS)}, '
+            f'with a [link](https://example.com/{i}) and `inline code`.'
+        )
+        if i % 2:
+            parts.append('\n'.join(f'- item {n}' for n in range(rng.randint(2, 5))))
+        else:
+            parts.append('```python\nfor n in range(10):\n    print(n)\n```')
+    return '\n\n'.join(parts)
+
+
+def seed(users=10, posts=200, comments=5, rng_seed=0):
+    """
+    Create `users` users, `posts` posts spread over them and `comments` comments per post,
+    some of them replies. Returns the created posts.
+    """
+    rng = random.Random(rng_seed)
+    User = get_user_model()
+    authors = [
+        User.objects.create_user(username=f'bench{i}', email=f'bench{i}@example.com', password=None)
+        for i in range(users)
+    ]
+    created = bulk.create_posts([
+        BlogPost(
+            title=f'Benchmark post {i}',
+            summary=f'Summary of post {i}',
+            content=markdown_body(rng),
+            tags=rng.sample(TAGS, 2),
+            author=rng.choice(authors),
+        )
+        for i in range(posts)
+    ])
+    for post in created:
+        thread = None
+        for i in range(comments):
+            # every third comment replies to the last top-level one
+            parent = thread if thread is not None and i % 3 == 2 else None
+            comment = Comment.objects.create(post=post, author=rng.choice(authors), parent=parent, content=f'Comment {i}')
+            if parent is None:
+                thread = comment
+    counters.recount([post.pk for post in created])
+    return created
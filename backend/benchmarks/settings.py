@@ -0,0 +1,26 @@
+"""
+Settings for benchmark runs: the project settings, pointed at a throwaway database.
+"""
+
+import os
+from config.database import database_config
+from config.settings import *  # noqa: F401,F403
+
+SECRET_KEY = os.getenv('DJANGO_SECRET_KEY') or 'benchmark-only-secret-key'
+DEBUG = False
+ALLOWED_HOSTS = ['127.0.0.1', 'localhost', 'testserver']
+
+# tuned like the project's own SQLite database
+DATABASES = {
+    'default': database_config(f"sqlite:///{os.environ['BENCHMARK_DATABASE']}", BASE_DIR, os.environ),  # noqa: F405
+}
+DATABASE_READ_REPLICAS = []
+
+# the scenarios send far more requests than any client is allowed
+THROTTLE_ENABLED = False
+
+# measure the views themselves, not cache hits
+RESPONSE_CACHE_ENABLED = os.getenv('RESPONSE_CACHE_ENABLED', 'False') == 'True'
+
+# password reset mails stay in memory
+EMAIL_BACKEND = 'django.core.mail.backends.locmem.EmailBackend'
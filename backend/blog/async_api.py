@@ -0,0 +1,65 @@
+"""
+Base class for the async-native read endpoints.
+
+DRF's APIView only runs synchronous handlers, so under ASGI every request to one is handed
+to a worker thread and back. The async views are plain Django class-based views whose
+handlers load rows with the async ORM (`aget`, `aiterator`) and then reuse the DRF
+serializers and paginators on the loaded rows, which needs no further database access.
+They serve the same JSON as their sync counterparts, without going through the response cache.
+"""
+
+from django.http import Http404, HttpResponse
+from django.views import View
+from rest_framework.exceptions import APIException, NotFound, Throttled, ValidationError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from config.throttling import AnonReadThrottle
+
+
+def json_response(data, status=200):
+    """Render `data` exactly as a DRF Response would with the JSON renderer"""
+    renderer = JSONRenderer()
+    return HttpResponse(renderer.render(data), status=status, content_type=renderer.media_type)
+
+
+def not_found(model):
+    """The Http404 get_object_or_404 raises, so both kinds of views return the same message"""
+    return Http404(f'No {model._meta.object_name} matches the given query.')
+
+
+async def evaluate(queryset):
+    """Load every row of a queryset with the async ORM"""
+    return [obj async for obj in queryset.aiterator()]
+
+
+class AsyncAPIView(View):
+    """
+    Read-only async view with DRF-style request and error handling:
+    handlers receive a rest_framework Request (for `query_params`), requests are throttled,
+    and Http404 or APIExceptions they raise become JSON error responses like DRF's default handler returns.
+    """
+    http_method_names = ['get', 'head', 'options']
+    # these views don't authenticate, so every request counts as anonymous
+    throttle_classes = [AnonReadThrottle]
+
+    async def dispatch(self, request, *args, **kwargs):
+        request = Request(request)
+        try:
+            await self.check_throttles(request)
+            return await super().dispatch(request, *args, **kwargs)
+        except Http404 as exc:
+            return json_response({'detail': NotFound(*exc.args).detail}, status=404)
+        except APIException as exc:
+            detail = exc.detail if isinstance(exc, ValidationError) else {'detail': exc.detail}
+            response = json_response(detail, status=exc.status_code)
+            if getattr(exc, 'wait', None):
+                response['Retry-After'] = '%d' % exc.wait
+            return response
+
+    async def check_throttles(self, request):
+        waits = []
+        for throttle in [cls() for cls in self.throttle_classes]:
+            if not await throttle.aallow_request(request, self):
+                waits.append(throttle.wait())
+        if waits:
+            raise Throttled(max(waits))
@@ -0,0 +1,60 @@
+from django.http import Http404
+from .async_api import AsyncAPIView, evaluate, json_response, not_found
+from .models import BlogPost
+from .serializers import BlogPostListSerializer, BlogPostSerializer
+from .views import POST_VERSION_FIELDS, BlogPostListMixin, filter_posts_by_tags, post_validators, post_versions
+from . import conditional
+
+
+class AsyncBlogPostListMixin(BlogPostListMixin):
+    async def list_posts(self, request, posts):
+        fields, posts = self.get_list_queryset(request, posts)
+        paginator = self.pagination_class()
+        page = paginator.get_page_queryset(posts, request)
+        if page is None:
+            # the client explicitly asked for every post with ?all=true
+            serializer = BlogPostListSerializer(await evaluate(posts), many=True, fields=fields)
+            return json_response(serializer.data)
+        rows = paginator.build_page(await evaluate(page))
+        serializer = BlogPostListSerializer(rows, many=True, fields=fields)
+        return json_response(paginator.get_paginated_data(serializer.data))
+
+
+class AsyncBlogPostListView(AsyncBlogPostListMixin, AsyncAPIView):
+    """Async counterpart of BlogPostListView.get"""
+
+    async def get(self, request):
+        posts, errors = filter_posts_by_tags(request, BlogPost.objects.all().order_by('-published_date', '-id'))
+        if errors:
+            return json_response(errors, status=400)
+        return await self.list_posts(request, posts)
+
+
+class AsyncBlogPostDetailView(AsyncAPIView):
+    """Async counterpart of BlogPostDetailView.get"""
+
+    async def get(self, request, pk):
+        if conditional.has_preconditions(request):
+            versions = await BlogPost.objects.filter(pk=pk).values_list(*POST_VERSION_FIELDS).afirst()
+            if versions is None:
+                raise Http404
+            response = conditional.evaluate_preconditions(request, *post_validators(pk, *versions))
+            if response is not None:
+                return response
+
+        try:
+            post = await BlogPost.objects.select_related('author').aget(pk=pk)
+        except BlogPost.DoesNotExist:
+            raise not_found(BlogPost)
+        serializer = BlogPostSerializer(post)
+        return conditional.set_validators(
+            json_response(serializer.data), *post_validators(post.pk, *post_versions(post))
+        )
+
+
+class AsyncUserBlogPostsView(AsyncBlogPostListMixin, AsyncAPIView):
+    """Async counterpart of UserBlogPostsView.get"""
+
+    async def get(self, request, username):
+        posts = BlogPost.objects.filter(author__username=username).order_by('-published_date', '-id')
+        return await self.list_posts(request, posts)
@@ -0,0 +1,172 @@
+"""
+Bulk import and export of blog posts as JSON Lines (one JSON object per line, a.k.a. NDJSON).
+
+Both directions stream: the import reads, validates and inserts a batch of rows at a time,
+each batch in its own transaction, and the export fetches rows with a server-side iterator,
+so memory use depends on the batch size rather than on the number of posts.
+"""
+
+import json
+import logging
+from itertools import islice
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import DatabaseError, transaction
+from rest_framework import serializers
+from .models import BlogPost
+from .serializers import BlogPostExportSerializer, BlogPostSerializer
+from . import related, response_cache, search, tags
+
+JSONL_CONTENT_TYPE = 'application/x-ndjson'
+# reported for the rows of a batch the database rejected; the error itself is logged, not sent to clients
+BATCH_FAILED_ERROR = 'The post could not be saved; its batch was rolled back'
+
+logger = logging.getLogger(__name__)
+
+
+def read_rows(lines):
+    """
+    Yield a (line number, data, error) triple for each non-blank line of a JSONL stream.
+    `lines` may yield bytes or str; exactly one of data and error is None.
+    """
+    for number, line in enumerate(lines, start=1):
+        if isinstance(line, bytes):
+            line = line.decode('utf-8', errors='replace')
+        if not line.strip():
+            continue
+        try:
+            data = json.loads(line)
+        except ValueError as exc:
+            yield number, None, {'non_field_errors': [f'Invalid JSON: {exc}']}
+            continue
+        if not isinstance(data, dict):
+            yield number, None, {'non_field_errors': ['Each line must be a JSON object']}
+            continue
+        yield number, data, None
+
+
+def create_posts(posts):
+    """
+    Insert unsaved posts with a single bulk INSERT, and do what saving them one at a time would:
+    render their HTML, link their tags, index them for search and for related posts, and invalidate
+    cached listings.
+    Returns the inserted posts, with their primary keys set.
+    """
+    BlogPost.refresh_renderings(posts)
+    with transaction.atomic():
+        # bulk_create neither calls save() nor sends post_save, so the signal handlers' work is done here
+        created = BlogPost.objects.bulk_create(posts)
+        tags.link_new_posts_tags(created)
+        related.add_posts([post.pk for post in created if post.tags])
+        search.index_posts(created)
+        response_cache.bump(
+            response_cache.post_list_version(),
+            *{response_cache.author_version(post.author.username) for post in created}
+        )
+    return created
+
+
+def restore_fields(batch, author):
+    """
+    For import_posts(restore=True): the {line number: {'author': ..., 'published_date': ...}}
+    of a batch's rows, from the `author` username and `published_date` an export writes, and
+    the {line number: errors} of the rows whose values can't be restored. A row without an
+    author falls back to `author`, one without a date gets the time of the import.
+    """
+    usernames = {data['author'] for _, data, _ in batch if data and isinstance(data.get('author'), str)}
+    users = {}
+    for user in get_user_model().objects.filter(username__in=usernames):
+        # usernames aren't unique; a shared one can't tell which user wrote the post
+        users[user.username] = None if user.username in users else user
+    date_field = serializers.DateTimeField()
+    fields, errors = {}, {}
+    for number, data, _ in batch:
+        if data is None:
+            continue
+        username = data.get('author')
+        user = author if username is None else users.get(username)
+        if user is None:
+            if username is None:
+                problem = 'This field is required.'
+            elif username in users:
+                problem = f"Several users have the username '{username}'."
+            else:
+                problem = f"There is no user with the username '{username}'."
+            errors[number] = {'author': [problem]}
+            continue
+        fields[number] = {'author': user}
+        if data.get('published_date') is not None:
+            try:
+                fields[number]['published_date'] = date_field.to_internal_value(data['published_date'])
+            except serializers.ValidationError as exc:
+                errors[number] = {'published_date': exc.detail}
+    return fields, errors
+
+
+def import_posts(lines, author, batch_size=None, restore=False):
+    """
+    Create a post authored by `author` for every valid row of a JSONL stream.
+    Rows are validated with BlogPostSerializer and inserted `batch_size` at a time;
+    an invalid row is reported and skipped without affecting the rest of its batch.
+    Ids, authors and publication dates are assigned anew, unless `restore` keeps each row's
+    author and publication date (see restore_fields); ids are always new.
+    Returns {'created': <count>, 'skipped': <count>, 'errors': [{'line': <number>, 'errors': {...}}, ...]},
+    where only the first BLOG_IMPORT_MAX_ERRORS invalid rows are listed.
+    """
+    batch_size = batch_size or settings.BLOG_BULK_BATCH_SIZE
+    rows = read_rows(lines)
+    created, skipped, errors = 0, 0, []
+
+    def skip(number, row_errors):
+        nonlocal skipped
+        skipped += 1
+        if len(errors) < settings.BLOG_IMPORT_MAX_ERRORS:
+            errors.append({'line': number, 'errors': row_errors})
+
+    while batch := list(islice(rows, batch_size)):
+        restored, restore_errors = restore_fields(batch, author) if restore else ({}, {})
+        posts, numbers, dates = [], [], []
+        for number, data, row_errors in batch:
+            if row_errors is None:
+                serializer = BlogPostSerializer(data=data)
+                if serializer.is_valid() and number not in restore_errors:
+                    fields = restored.get(number, {})
+                    post = BlogPost(**serializer.validated_data, author=fields.get('author', author))
+                    posts.append(post)
+                    numbers.append(number)
+                    if 'published_date' in fields:
+                        dates.append((post, fields['published_date']))
+                    continue
+                row_errors = {**restore_errors.get(number, {}), **serializer.errors}
+            skip(number, row_errors)
+        if not posts:
+            continue
+        try:
+            with transaction.atomic():
+                inserted = create_posts(posts)
+                # published_date is set on insert whatever the post carries, so restored dates go in after
+                for post, published_date in dates:
+                    post.published_date = published_date
+                BlogPost.objects.bulk_update([post for post, _ in dates], ['published_date'])
+            created += len(inserted)
+        except DatabaseError:
+            # the batch's transaction was rolled back; report its rows and carry on with the next one
+            logger.exception('Importing the posts of lines %s-%s failed', numbers[0], numbers[-1])
+            for number in numbers:
+                skip(number, {'non_field_errors': [BATCH_FAILED_ERROR]})
+    return {'created': created, 'skipped': skipped, 'errors': errors}
+
+
+def export_posts(queryset=None, chunk_size=None):
+    """
+    Yield every post of `queryset` (all posts by default) as a line of JSON, in id order.
+    Rows are fetched `chunk_size` at a time, so the queryset's result is never held in memory.
+    """
+    chunk_size = chunk_size or settings.BLOG_BULK_BATCH_SIZE
+    if queryset is None:
+        queryset = BlogPost.objects.all()
+    serializer = BlogPostExportSerializer()
+    fields = [name for name in serializer.fields if name != 'author'] + ['author__username']
+    posts = queryset.select_related('author').only(*fields).order_by('id')
+    for post in posts.iterator(chunk_size=chunk_size):
+        yield json.dumps(serializer.to_representation(post), ensure_ascii=False) + '\n'
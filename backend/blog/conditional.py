@@ -0,0 +1,63 @@
+"""
+Helpers for HTTP conditional requests (ETag / Last-Modified).
+
+Views compute validators from a cheap query, let Django's precondition logic decide
+whether the request can be answered with 304 Not Modified or 412 Precondition Failed,
+and only load and serialize the full data when it can't.
+"""
+
+import hashlib
+from django.conf import settings
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework import status
+from rest_framework.response import Response
+
+PRECONDITION_HEADERS = (
+    'HTTP_IF_MATCH',
+    'HTTP_IF_NONE_MATCH',
+    'HTTP_IF_MODIFIED_SINCE',
+    'HTTP_IF_UNMODIFIED_SINCE',
+)
+
+
+def make_etag(*parts):
+    """Build a strong ETag from the values that identify a representation's version"""
+    digest = hashlib.sha1('|'.join(str(part) for part in parts).encode('utf-8')).hexdigest()
+    return f'"{digest}"'
+
+
+def has_preconditions(request):
+    return any(header in request.META for header in PRECONDITION_HEADERS)
+
+
+def evaluate_preconditions(request, etag, last_modified=None):
+    """
+    Return a 304/412 response if the request's preconditions decide the outcome,
+    or None if the view should go on and build the full response.
+    """
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+    response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+    if response is not None:
+        set_validators(response, etag, last_modified)
+    return response
+
+
+def require_if_match(request):
+    """
+    Return a 428 response for an unconditional write when BLOG_REQUIRE_IF_MATCH is on,
+    or None if the write may proceed.
+    """
+    if settings.BLOG_REQUIRE_IF_MATCH and 'HTTP_IF_MATCH' not in request.META:
+        return Response(
+            {'error': 'This request must be conditional: send the ETag you last read in If-Match'},
+            status=status.HTTP_428_PRECONDITION_REQUIRED
+        )
+    return None
+
+
+def set_validators(response, etag, last_modified=None):
+    response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    return response
@@ -0,0 +1,132 @@
+import json
+import re
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from blog.models import BlogPost
+
+# sqlite reports a table read without an index as "SCAN <table>", with no "USING ..." clause
+SQLITE_FULL_SCAN = re.compile(r'^SCAN (?!CONSTANT ROW)(?P<table>\S+)$')
+# ...which it also prints when reading back the rows of a subquery it has already evaluated
+SQLITE_SUBQUERY = re.compile(r'^(?:CO-ROUTINE|MATERIALIZE) (?P<name>.+)$')
+
+
+def hot_requests(post):
+    """
+    Return the (label, url) pairs of the read requests that serve most traffic,
+    with parameters taken from `post` so that every query of each view actually runs.
+    """
+    comment = post.comments.order_by('id').first()
+    tag = post.tag_set.order_by('name').first()
+    word = re.search(r'\w+', post.title)
+    requests = [
+        ('post list', reverse('blog-list')),
+        ('post detail', reverse('blog-detail', args=[post.pk])),
+        ('related posts', reverse('blog-related', args=[post.pk])),
+        ('author posts', reverse('user-posts', args=[post.author.username])),
+        ('tag list', reverse('tag-list')),
+        ('comment list', f"{reverse('comment-list')}?post_id={post.pk}"),
+        ('threaded comment list', f"{reverse('comment-list')}?post_id={post.pk}&threaded=true"),
+    ]
+    if tag is not None:
+        requests.append(('post list by tag', f"{reverse('blog-list')}?tags={tag.name}"))
+    if word is not None:
+        requests.append(('search', f"{reverse('blog-search')}?q={word.group()}"))
+    if comment is not None:
+        requests.append(('comment detail', reverse('comment-detail', args=[comment.pk])))
+    return requests
+
+
+def sqlite_full_scans(cursor, sql):
+    cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+    plan = [row[3] for row in cursor.fetchall()]
+    subqueries = {match.group('name') for match in map(SQLITE_SUBQUERY.match, plan) if match}
+    scans = [
+        match.group('table') for match in map(SQLITE_FULL_SCAN.match, plan)
+        if match and match.group('table') not in subqueries
+    ]
+    return plan, scans
+
+
+def postgresql_full_scans(cursor, sql):
+    # with sequential scans priced out, the planner only picks one when no index can serve the query
+    with transaction.atomic():
+        cursor.execute('SET LOCAL enable_seqscan = off')
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}')
+        result = cursor.fetchone()[0]
+    root = (json.loads(result) if isinstance(result, str) else result)[0]['Plan']
+    plan, scans, nodes = [], [], [(root, 0)]
+    while nodes:
+        node, level = nodes.pop()
+        relation = node.get('Relation Name')
+        plan.append('  ' * level + node['Node Type'] + (f' on {relation}' if relation else ''))
+        if node['Node Type'] == 'Seq Scan':
+            scans.append(relation)
+        nodes.extend((child, level + 1) for child in reversed(node.get('Plans', [])))
+    return plan, scans
+
+
+EXPLAINERS = {
+    'sqlite': sqlite_full_scans,
+    'postgresql': postgresql_full_scans,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Run EXPLAIN on the queries issued by the hot read endpoints and flag full table scans. '
+        'Exits with an error when any is found, so index coverage can be checked in CI.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--post',
+            type=int,
+            help='Id of the post to use as sample data (defaults to the one with the most comments)'
+        )
+
+    def handle(self, *args, **options):
+        explain = EXPLAINERS.get(connection.vendor)
+        if explain is None:
+            raise CommandError(f'EXPLAIN is not supported for {connection.vendor} databases')
+
+        posts = BlogPost.objects.select_related('author')
+        if options['post']:
+            post = posts.filter(pk=options['post']).first()
+        else:
+            post = posts.order_by('-comment_count', '-id').first()
+        if post is None:
+            raise CommandError('No sample post found: the hot queries need at least one post to run')
+
+        flagged = 0
+        for label, url in hot_requests(post):
+            self.stdout.write(self.style.MIGRATE_HEADING(f'{label}: GET {url}'))
+            for sql in self.capture_queries(url):
+                with connection.cursor() as cursor:
+                    plan, scans = explain(cursor, sql)
+                flagged += bool(scans)
+                if scans:
+                    self.stdout.write(self.style.ERROR(f"  FULL SCAN of {', '.join(scans)}: {sql}"))
+                elif options['verbosity'] > 1:
+                    self.stdout.write(f'  ok: {sql}')
+                if scans or options['verbosity'] > 1:
+                    for line in plan:
+                        self.stdout.write(f'      {line}')
+
+        if flagged:
+            raise CommandError(f'{flagged} hot quer{"y does" if flagged == 1 else "ies do"} a full table scan')
+        self.stdout.write(self.style.SUCCESS('No full table scans in the hot queries'))
+
+    def capture_queries(self, url):
+        """Request `url` with the response cache off and return the SQL of every SELECT it ran"""
+        with override_settings(RESPONSE_CACHE_ENABLED=False, ALLOWED_HOSTS=['testserver']):
+            with CaptureQueriesContext(connection) as queries:
+                response = Client().get(url)
+        if response.status_code != 200:
+            raise CommandError(f'GET {url} returned {response.status_code}')
+        return [
+            query['sql'] for query in queries.captured_queries
+            if query['sql'].lstrip().upper().startswith(('SELECT', 'WITH'))
+        ]
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+from blog import bulk
+from blog.models import BlogPost
+
+
+class Command(BaseCommand):
+    help = 'Write every blog post as JSONL (NDJSON), one post per line, in the format import_posts reads'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', default='-', help="File to write, or '-' for standard output")
+        parser.add_argument(
+            '--author',
+            help='Only export the posts of the user with this username'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            help='Number of posts to fetch per query (default: BLOG_BULK_BATCH_SIZE)'
+        )
+
+    def handle(self, *args, **options):
+        posts = BlogPost.objects.all()
+        if options['author']:
+            posts = posts.filter(author__username=options['author'])
+
+        if options['path'] == '-':
+            exported = self.write_posts(posts, options['chunk_size'], lambda line: self.stdout.write(line, ending=''))
+        else:
+            with open(options['path'], 'w', encoding='utf-8') as out:
+                exported = self.write_posts(posts, options['chunk_size'], out.write)
+        self.stderr.write(f'Exported {exported} blog post(s)')
+
+    def write_posts(self, posts, chunk_size, write):
+        exported = 0
+        for line in bulk.export_posts(posts, chunk_size):
+            write(line)
+            exported += 1
+        return exported
@@ -0,0 +1,59 @@
+import sys
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from blog import bulk
+
+
+class Command(BaseCommand):
+    help = (
+        'Create blog posts from a JSONL (NDJSON) file, one post per line, reporting invalid lines. '
+        'Posts get new ids, the --author user and the time of the import as their publication date; '
+        'with --restore, the author and publication date of each line (as written by export_posts) are kept'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="JSONL file to read, or '-' for standard input")
+        parser.add_argument(
+            '--author',
+            help='Username of the user the posts are created for (with --restore, of lines without an author)'
+        )
+        parser.add_argument(
+            '--restore',
+            action='store_true',
+            help="Keep each line's author (by username) and publication date, e.g. to load an export_posts backup"
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            help='Number of lines to validate and insert per transaction (default: BLOG_BULK_BATCH_SIZE)'
+        )
+
+    def handle(self, *args, **options):
+        author = None
+        if options['author'] is not None:
+            author = self.get_author(options['author'])
+        elif not options['restore']:
+            raise CommandError('--author is required unless --restore is given')
+
+        if options['path'] == '-':
+            result = bulk.import_posts(sys.stdin, author, options['batch_size'], options['restore'])
+        else:
+            with open(options['path'], encoding='utf-8') as lines:
+                result = bulk.import_posts(lines, author, options['batch_size'], options['restore'])
+
+        for error in result['errors']:
+            self.stderr.write(f"line {error['line']}: {error['errors']}")
+        if result['skipped'] > len(result['errors']):
+            self.stderr.write(f"... and {result['skipped'] - len(result['errors'])} more invalid line(s)")
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {result['created']} blog post(s), skipped {result['skipped']} invalid line(s)"
+        ))
+
+    def get_author(self, username):
+        User = get_user_model()
+        try:
+            return User.objects.get(username=username)
+        except User.DoesNotExist:
+            raise CommandError(f"No user with username {username}")
+        except User.MultipleObjectsReturned:
+            raise CommandError(f"Several users have the username {username}; rename all but one of them first")
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from blog import related
+
+
+class Command(BaseCommand):
+    help = (
+        'Recompute the related posts of every blog post from their tags. Saving posts keeps the index '
+        'up to date; run it after changing BLOG_RELATED_POSTS, or now and then to refresh the tag weights.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of index rows to insert per query'
+        )
+
+    def handle(self, *args, **options):
+        posts = related.rebuild_posts(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Indexed the related posts of {posts} blog post(s)'))
@@ -0,0 +1,62 @@
+from django.core.management.base import BaseCommand
+from blog.models import BlogPost
+from blog import response_cache
+
+
+class Command(BaseCommand):
+    help = (
+        'Pre-render the stored HTML, excerpt, table of contents and reading stats of every blog post '
+        'whose rendering is missing or stale. Run it after changing the renderer: reads serve the stored rendering.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Re-render every post, even if its stored HTML is up to date'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Number of posts to load, render and write per batch'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            help='Processes rendering each batch (default: the BLOG_RENDER_WORKERS setting; 1 renders serially)'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        posts = (
+            BlogPost.objects.select_related('author')
+            .only('id', 'content', 'content_html_hash', 'author__username')
+            .order_by('id')
+        )
+
+        rendered = 0
+        batch = []
+        for post in posts.iterator(chunk_size=batch_size):
+            batch.append(post)
+            if len(batch) >= batch_size:
+                rendered += self.render(batch, options['force'], options['workers'])
+                batch = []
+        if batch:
+            rendered += self.render(batch, options['force'], options['workers'])
+
+        self.stdout.write(self.style.SUCCESS(f'Rendered {rendered} blog post(s)'))
+
+    def render(self, posts, force, workers):
+        """Re-render the stale posts of a batch (in parallel, see rendering.render_many) and save them"""
+        posts = BlogPost.refresh_renderings(posts, force=force, workers=workers)
+        if not posts:
+            return 0
+        BlogPost.objects.bulk_update(posts, BlogPost.RENDERED_FIELDS)
+        # bulk_update sends no signals, so drop the cached responses showing the old rendering here
+        response_cache.bump(
+            response_cache.post_list_version(),
+            *(response_cache.post_version(post.pk) for post in posts),
+            *{response_cache.author_version(post.author.username) for post in posts}
+        )
+        return len(posts)
@@ -0,0 +1,90 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0002_blogpost_content_html_blogpost_content_html_hash"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Tag",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(max_length=50, unique=True)),
+                ("post_count", models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                "ordering": ["-post_count", "name"],
+                "indexes": [
+                    models.Index(
+                        fields=["-post_count", "name"], name="blog_tag_count_idx"
+                    )
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name="BlogPostTag",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "post",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="post_tags",
+                        to="blog.blogpost",
+                    ),
+                ),
+                (
+                    "tag",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="post_tags",
+                        to="blog.tag",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddField(
+            model_name="blogpost",
+            name="tag_set",
+            field=models.ManyToManyField(
+                blank=True,
+                related_name="posts",
+                through="blog.BlogPostTag",
+                to="blog.tag",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="blogposttag",
+            index=models.Index(
+                fields=["tag", "post"], name="blog_posttag_tag_post_idx"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="blogposttag",
+            constraint=models.UniqueConstraint(
+                fields=("post", "tag"), name="blog_posttag_unique"
+            ),
+        ),
+    ]
@@ -0,0 +1,47 @@
+from django.db import migrations
+from django.db.models import Count, OuterRef, Subquery
+
+
+def backfill_tags(apps, schema_editor):
+    """Build Tag rows and post links from the existing `tags` JSON field"""
+    BlogPost = apps.get_model("blog", "BlogPost")
+    Tag = apps.get_model("blog", "Tag")
+    BlogPostTag = apps.get_model("blog", "BlogPostTag")
+    max_length = Tag._meta.get_field("name").max_length
+
+    tag_ids = {}
+    links = []
+    for post_id, raw_tags in BlogPost.objects.values_list("id", "tags").iterator(chunk_size=1000):
+        names = []
+        for name in raw_tags or []:
+            if isinstance(name, str):
+                name = name.strip().lower()[:max_length]
+                if name and name not in names:
+                    names.append(name)
+        for name in names:
+            if name not in tag_ids:
+                tag_ids[name] = Tag.objects.create(name=name).id
+            links.append(BlogPostTag(post_id=post_id, tag_id=tag_ids[name]))
+        if len(links) >= 1000:
+            BlogPostTag.objects.bulk_create(links)
+            links = []
+    BlogPostTag.objects.bulk_create(links)
+
+    counts = (
+        BlogPostTag.objects.filter(tag=OuterRef("pk"))
+        .values("tag")
+        .annotate(n=Count("id"))
+        .values("n")
+    )
+    Tag.objects.update(post_count=Subquery(counts))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0003_tag"),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_tags, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,88 @@
+from html.parser import HTMLParser
+
+import markdown
+from django.db import migrations
+
+# The index as it was when this migration was written; blog.search maintains it from here on
+# and may change, so nothing is imported from it.
+INDEX_TABLE = "blog_post_search"
+
+INSTALL = {
+    "sqlite": [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {INDEX_TABLE} "
+        f"USING fts5(title, body, tokenize='unicode61 remove_diacritics 2')",
+    ],
+    "postgresql": [
+        f"CREATE TABLE IF NOT EXISTS {INDEX_TABLE} ("
+        f"  post_id bigint PRIMARY KEY REFERENCES blog_blogpost (id) ON DELETE CASCADE,"
+        f"  title text NOT NULL,"
+        f"  body text NOT NULL,"
+        f"  document tsvector GENERATED ALWAYS AS ("
+        f"    setweight(to_tsvector('english', title), 'A') ||"
+        f"    setweight(to_tsvector('english', body), 'B')"
+        f"  ) STORED"
+        f")",
+        f"CREATE INDEX IF NOT EXISTS {INDEX_TABLE}_document_idx ON {INDEX_TABLE} USING GIN (document)",
+    ],
+}
+
+INSERT = {
+    "sqlite": f"INSERT INTO {INDEX_TABLE} (rowid, title, body) VALUES (%s, %s, %s)",
+    "postgresql": f"INSERT INTO {INDEX_TABLE} (post_id, title, body) VALUES (%s, %s, %s)",
+}
+
+
+class TextExtractor(HTMLParser):
+    """Collect the text of an HTML document, entities decoded"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+
+    def handle_data(self, data):
+        self.parts.append(data)
+
+
+def html_to_text(html):
+    extractor = TextExtractor()
+    extractor.feed(html)
+    extractor.close()
+    return "".join(extractor.parts)
+
+
+def create_search_index(apps, schema_editor):
+    """Create the vendor specific full-text index and fill it from the existing posts"""
+    connection = schema_editor.connection
+    if connection.vendor not in INSTALL:
+        return
+    BlogPost = apps.get_model("blog", "BlogPost")
+    with connection.cursor() as cursor:
+        for sql in INSTALL[connection.vendor]:
+            cursor.execute(sql)
+        posts = BlogPost.objects.using(connection.alias).only("id", "title", "content", "content_html")
+        batch = []
+        for post in posts.iterator(chunk_size=500):
+            html = post.content_html or markdown.markdown(post.content)
+            batch.append((post.id, post.title, html_to_text(html)))
+            if len(batch) >= 500:
+                cursor.executemany(INSERT[connection.vendor], batch)
+                batch = []
+        if batch:
+            cursor.executemany(INSERT[connection.vendor], batch)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor in INSTALL:
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {INDEX_TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0004_backfill_tags"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
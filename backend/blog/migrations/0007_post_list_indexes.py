@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:17
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0006_blogpost_comment_stats"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="blogpost",
+            index=models.Index(
+                fields=["-published_date", "-id"], name="blog_post_published_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="blogpost",
+            index=models.Index(
+                fields=["author", "-published_date", "-id"],
+                name="blog_post_author_pub_idx",
+            ),
+        ),
+    ]
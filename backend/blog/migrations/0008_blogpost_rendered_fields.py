@@ -0,0 +1,112 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:46
+
+import math
+import re
+from html import unescape
+
+import bleach
+import markdown
+from django.db import migrations, models
+from markdown.extensions.toc import TocExtension, slugify
+
+
+RENDERED_FIELDS = ["content_html", "content_html_hash", "excerpt", "toc", "word_count", "reading_time"]
+
+# The renderer as it was when this migration was written; blog.rendering may change, so nothing
+# is imported from it. The stored hash is cleared rather than computed: `manage.py render_posts`
+# (or the next save) brings every post up to date with the renderer of the day.
+ALLOWED_TAGS = [
+    "a", "abbr", "acronym", "b", "blockquote", "code", "em", "i", "li", "ol", "strong", "ul",
+    "p", "pre", "hr", "br", "h1", "h2", "h3", "h4", "h5", "h6", "img", "table", "thead", "tbody", "tr", "th", "td",
+]
+ALLOWED_ATTRIBUTES = {
+    "*": ["class", "style"],
+    "a": ["href", "title", "rel"],
+    "img": ["src", "alt", "title"],
+    **{f"h{level}": ["id"] for level in range(1, 7)},
+}
+HEADING_ID_PREFIX = "section-"
+EXCERPT_LENGTH = 300
+WORDS_PER_MINUTE = 200
+CJK = "\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff"
+WORD = re.compile(f"[{CJK}]|[^\\s{CJK}]+")
+
+
+def allow_attribute(tag, name, value):
+    if name not in ALLOWED_ATTRIBUTES.get(tag, []) and name not in ALLOWED_ATTRIBUTES["*"]:
+        return False
+    return name != "id" or value.startswith(HEADING_ID_PREFIX)
+
+
+def toc_entries(tokens):
+    return [
+        {
+            "level": token["level"],
+            "id": token["id"],
+            "title": unescape(token["name"]),
+            "children": toc_entries(token["children"]),
+        }
+        for token in tokens
+    ]
+
+
+def render_posts(apps, schema_editor):
+    """Fill in the new rendered fields, and re-render the HTML with the heading anchors they link to"""
+    converter = markdown.Markdown(
+        extensions=[TocExtension(slugify=lambda value, separator: HEADING_ID_PREFIX + slugify(value, separator))]
+    )
+    cleaner = bleach.Cleaner(tags=ALLOWED_TAGS, attributes=allow_attribute, strip=True)
+    text_cleaner = bleach.Cleaner(tags=[], strip=True)
+
+    BlogPost = apps.get_model("blog", "BlogPost")
+    batch = []
+    for post in BlogPost.objects.only("id", "content").iterator(chunk_size=500):
+        html = cleaner.clean(converter.reset().convert(post.content))
+        text = " ".join(unescape(text_cleaner.clean(html)).split())
+        if len(text) > EXCERPT_LENGTH:
+            cut = text[:EXCERPT_LENGTH]
+            excerpt = (cut.rsplit(" ", 1)[0] if " " in cut else cut) + "…"
+        else:
+            excerpt = text
+        post.content_html = html
+        post.content_html_hash = ""
+        post.excerpt = excerpt
+        post.toc = toc_entries(converter.toc_tokens)
+        post.word_count = len(WORD.findall(text))
+        post.reading_time = math.ceil(post.word_count / WORDS_PER_MINUTE)
+        batch.append(post)
+        if len(batch) >= 500:
+            BlogPost.objects.bulk_update(batch, RENDERED_FIELDS)
+            batch = []
+    BlogPost.objects.bulk_update(batch, RENDERED_FIELDS)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0007_post_list_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="blogpost",
+            name="excerpt",
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name="blogpost",
+            name="reading_time",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="blogpost",
+            name="toc",
+            field=models.JSONField(blank=True, default=list, editable=False),
+        ),
+        migrations.AddField(
+            model_name="blogpost",
+            name="word_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(render_posts, migrations.RunPython.noop),
+    ]
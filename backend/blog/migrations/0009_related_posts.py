@@ -0,0 +1,100 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:25
+
+import heapq
+import math
+from collections import defaultdict
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def build_related_posts(apps, schema_editor):
+    """
+    Index the related posts of the existing posts: every post keeps its BLOG_RELATED_POSTS best
+    posts by shared tags, each weighted log(1 + posts / posts with the tag). The scoring is copied
+    from blog.related as it was, so later changes there don't alter this migration.
+    """
+    BlogPost = apps.get_model("blog", "BlogPost")
+    BlogPostTag = apps.get_model("blog", "BlogPostTag")
+    RelatedPost = apps.get_model("blog", "RelatedPost")
+    Tag = apps.get_model("blog", "Tag")
+
+    total = BlogPost.objects.count()
+    weights = {
+        tag_id: math.log(1 + total / max(post_count, 1))
+        for tag_id, post_count in Tag.objects.values_list("id", "post_count")
+    }
+    posts_by_tag, tags_by_post = defaultdict(list), defaultdict(list)
+    for post_id, tag_id in BlogPostTag.objects.values_list("post_id", "tag_id").iterator(chunk_size=1000):
+        posts_by_tag[tag_id].append(post_id)
+        tags_by_post[post_id].append(tag_id)
+
+    rows = []
+    for post_id, tag_ids in tags_by_post.items():
+        scores = defaultdict(float)
+        for tag_id in tag_ids:
+            for other_id in posts_by_tag[tag_id]:
+                if other_id != post_id:
+                    scores[other_id] += weights[tag_id]
+        # newer posts win ties
+        for related_id, score in heapq.nlargest(
+            settings.BLOG_RELATED_POSTS, scores.items(), key=lambda item: (item[1], item[0])
+        ):
+            rows.append(RelatedPost(post_id=post_id, related_id=related_id, score=score))
+    RelatedPost.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0008_blogpost_rendered_fields"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RelatedPost",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("score", models.FloatField()),
+                (
+                    "post",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="related_links",
+                        to="blog.blogpost",
+                    ),
+                ),
+                (
+                    "related",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="blog.blogpost",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["post", "-score", "-related"],
+                        name="blog_related_score_idx",
+                    )
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("post", "related"), name="blog_relatedpost_unique"
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(build_related_posts, migrations.RunPython.noop),
+    ]
@@ -1,7 +1,11 @@
 from django.db import models
 from django.conf import settings
+from . import rendering
 
 class BlogPost(models.Model):
+    # the columns refresh_rendering() derives from `content`
+    RENDERED_FIELDS = ('content_html', 'content_html_hash', 'excerpt', 'toc', 'word_count', 'reading_time')
+
     title = models.CharField(max_length=200)
     content = models.TextField()
     summary = models.TextField(blank=True)
@@ -13,9 +17,132 @@ class BlogPost(models.Model):
     published_date = models.DateTimeField(auto_now_add=True)
     updated_date = models.DateTimeField(auto_now=True)
     tags = models.JSONField(default=list, blank=True)
+    # normalized, indexed copy of `tags`, kept in sync on save (see blog.tags)
+    tag_set = models.ManyToManyField(
+        'Tag',
+        through='BlogPostTag',
+        related_name='posts',
+        blank=True
+    )
+    # rendered from `content` on save (see rendering.render_post), keyed by a hash of the content
+    # and the renderer config, so reads never run the Markdown renderer or the sanitizer
+    content_html = models.TextField(blank=True, editable=False)
+    content_html_hash = models.CharField(max_length=64, blank=True, editable=False)
+    excerpt = models.TextField(blank=True, editable=False)
+    # the headings: [{'level', 'id', 'title', 'children'}, ...]
+    toc = models.JSONField(default=list, blank=True, editable=False)
+    word_count = models.PositiveIntegerField(default=0, editable=False)
+    # minutes
+    reading_time = models.PositiveIntegerField(default=0, editable=False)
+    # denormalized from comments.Comment, maintained by the comment views (see comments.counters)
+    comment_count = models.PositiveIntegerField(default=0, editable=False)
+    last_comment_at = models.DateTimeField(null=True, blank=True, editable=False)
 
     class Meta:
         ordering = ['-published_date']
+        indexes = [
+            # the post list and its keyset pagination, newest first
+            models.Index(fields=['-published_date', '-id'], name='blog_post_published_idx'),
+            # one author's posts, newest first
+            models.Index(fields=['author', '-published_date', '-id'], name='blog_post_author_pub_idx'),
+        ]
+
+    def __str__(self):
+        return self.title
+
+    def refresh_rendering(self, force=False):
+        """
+        Re-render the RENDERED_FIELDS if the stored rendering is missing or stale.
+        Returns True when they changed and need to be persisted.
+        """
+        digest = rendering.content_digest(self.content)
+        if not force and digest == self.content_html_hash:
+            return False
+        self.apply_rendering(rendering.render_post(self.content), digest)
+        return True
+
+    @classmethod
+    def refresh_renderings(cls, posts, force=False, workers=None):
+        """
+        refresh_rendering() for many posts, rendering the stale ones in parallel when there are
+        enough of them (see rendering.render_many). Returns the posts whose rendered fields changed.
+        """
+        stale = []
+        for post in posts:
+            digest = rendering.content_digest(post.content)
+            if force or digest != post.content_html_hash:
+                stale.append((post, digest))
+        for (post, digest), rendered in zip(stale, rendering.render_many([post.content for post, _ in stale], workers)):
+            post.apply_rendering(rendered, digest)
+        return [post for post, _ in stale]
+
+    def apply_rendering(self, rendered, digest):
+        self.content_html = rendered.html
+        self.content_html_hash = digest
+        self.excerpt = rendered.excerpt
+        self.toc = rendered.toc
+        self.word_count = rendered.word_count
+        self.reading_time = rendered.reading_time
+
+    def save(self, *args, **kwargs):
+        if self.refresh_rendering() and kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = {*kwargs['update_fields'], *self.RENDERED_FIELDS}
+        super().save(*args, **kwargs)
+
+
+class Tag(models.Model):
+    """
+    A normalized (lower-cased, trimmed) tag.
+    `post_count` is maintained as posts gain and lose the tag,
+    so tag listings never have to count links.
+    """
+    name = models.CharField(max_length=50, unique=True)
+    post_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['-post_count', 'name']
+        indexes = [
+            models.Index(fields=['-post_count', 'name'], name='blog_tag_count_idx'),
+        ]
+
+    def __str__(self):
+        return self.name
+
+
+class BlogPostTag(models.Model):
+    post = models.ForeignKey(BlogPost, on_delete=models.CASCADE, related_name='post_tags')
+    tag = models.ForeignKey(Tag, on_delete=models.CASCADE, related_name='post_tags')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['post', 'tag'], name='blog_posttag_unique'),
+        ]
+        indexes = [
+            # serves "posts with tag X" lookups for ?tags= filtering
+            models.Index(fields=['tag', 'post'], name='blog_posttag_tag_post_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.post_id}:{self.tag_id}'
+
+
+class RelatedPost(models.Model):
+    """
+    One of a post's most related posts, by the IDF-weighted tags they share.
+    Each post keeps its top BLOG_RELATED_POSTS, maintained as tags change (see blog.related).
+    """
+    post = models.ForeignKey(BlogPost, on_delete=models.CASCADE, related_name='related_links')
+    related = models.ForeignKey(BlogPost, on_delete=models.CASCADE, related_name='+')
+    score = models.FloatField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['post', 'related'], name='blog_relatedpost_unique'),
+        ]
+        indexes = [
+            # a post's related posts, best first
+            models.Index(fields=['post', '-score', '-related'], name='blog_related_score_idx'),
+        ]
 
     def __str__(self):
-        return self.title
\ No newline at end of file
+        return f'{self.post_id}->{self.related_id}'
@@ -0,0 +1,175 @@
+import base64
+import json
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset (cursor) pagination over a fixed, unique ordering.
+    Each page is fetched with a `WHERE (ordering) < (cursor position)` filter instead of an OFFSET,
+    so deep pages cost the same as the first one.
+    The cursors returned in `next`/`previous` are opaque to clients.
+    """
+    # must end with a unique field so every row has a distinct position
+    ordering = ('-published_date', '-id')
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    # explicit opt-in for the old behaviour of returning every row in one response
+    unpaginated_query_param = 'all'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def get_default_page_size(self):
+        return settings.BLOG_PAGE_SIZE
+
+    def get_page_size(self, request):
+        page_size = self.get_default_page_size()
+        requested = request.query_params.get(self.page_size_query_param)
+        if requested:
+            try:
+                page_size = int(requested)
+            except ValueError:
+                pass
+        return max(1, min(page_size, settings.BLOG_MAX_PAGE_SIZE))
+
+    def is_unpaginated(self, request):
+        return request.query_params.get(self.unpaginated_query_param, '').lower() in ('1', 'true', 'yes')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """
+        Return the rows of the requested page, or None if the client opted out of pagination
+        """
+        queryset = self.get_page_queryset(queryset, request)
+        if queryset is None:
+            return None
+        return self.build_page(list(queryset))
+
+    def get_page_queryset(self, queryset, request):
+        """
+        Build the (unevaluated) query for the requested page.
+        Kept separate from evaluation so async views can iterate it with the async ORM.
+        """
+        if self.is_unpaginated(request):
+            return None
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.model = queryset.model
+        position, self.reverse = self.decode_cursor(request)
+        self.has_cursor = position is not None
+
+        ordering = self.ordering
+        if self.reverse:
+            ordering = tuple(self._flip(field) for field in ordering)
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(self._after(ordering, position))
+        # fetch one extra row to know whether there is another page in this direction
+        return queryset[:self.page_size + 1]
+
+    def build_page(self, rows):
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if self.reverse:
+            rows.reverse()
+            self.has_next, self.has_previous = self.has_cursor, has_more
+        else:
+            self.has_next, self.has_previous = has_more, self.has_cursor
+        self.page = rows
+        return rows
+
+    def get_paginated_response(self, data):
+        return Response(self.get_paginated_data(data))
+
+    def get_paginated_data(self, data):
+        return {
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        }
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def encode_cursor(self, obj, reverse):
+        values = [self._field_value(obj, field) for field in self.ordering]
+        payload = json.dumps({'p': values, 'r': reverse}, separators=(',', ':'))
+        cursor = base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, cursor)
+
+    def decode_cursor(self, request):
+        """
+        Return the (position, reverse) pair encoded in the request's cursor
+        """
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')))
+            values = payload['p']
+            if len(values) != len(self.ordering):
+                raise ValueError
+            position = [self.to_python(field.lstrip('-'), value) for field, value in zip(self.ordering, values)]
+            return position, bool(payload.get('r'))
+        except (TypeError, ValueError, KeyError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def to_python(self, name, value):
+        """Convert a position value decoded from a cursor back to the field's type"""
+        return self.model._meta.get_field(name).to_python(value)
+
+    @staticmethod
+    def _flip(field):
+        return field[1:] if field.startswith('-') else f'-{field}'
+
+    @staticmethod
+    def _field_value(obj, field):
+        value = getattr(obj, field.lstrip('-'))
+        return value.isoformat() if hasattr(value, 'isoformat') else value
+
+    @staticmethod
+    def _after(ordering, position):
+        """
+        Build the row-value comparison `(f1, f2, ...) > (v1, v2, ...)` for the given ordering
+        as `f1 > v1 OR (f1 = v1 AND f2 > v2) OR ...`, honouring each field's direction.
+        """
+        condition = Q()
+        equal = {}
+        for field, value in zip(ordering, position):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            condition |= Q(**equal, **{f'{name}__{lookup}': value})
+            equal[name] = value
+        return condition
+
+
+class SearchPagination(KeysetPagination):
+    """
+    Keyset pagination over search hits ordered by (rank, id).
+    The rank is deterministic for a given query, so it can serve as a cursor position.
+    """
+    ordering = ('rank', 'id')
+
+    def to_python(self, name, value):
+        return float(value) if name == 'rank' else int(value)
+
+    def paginate_search(self, search, query, request):
+        """Run `search(query, limit, position, reverse)` for the requested page and return its hits"""
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        position, self.reverse = self.decode_cursor(request)
+        self.has_cursor = position is not None
+        return self.build_page(search(query, self.page_size + 1, position, self.reverse))
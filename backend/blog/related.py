@@ -0,0 +1,193 @@
+"""
+The related-posts index.
+
+Two posts are related by the tags they share, each weighted by its inverse document frequency,
+log(1 + posts / posts with the tag), so a rare tag in common counts for more than a tag half
+the blog carries. The weights come from the maintained Tag.post_count counters.
+
+Every post keeps its BLOG_RELATED_POSTS best scoring posts as RelatedPost rows, so reading them
+is one indexed query for K rows. The rows are maintained as tags change: when a post's tags
+change, its own list is recomputed from the posts sharing one of its tags (one scan of their
+tag links), and it is offered to each of those posts' lists; a list it drops out of, or sinks
+in, is recomputed, since a post outside it may now belong there. Posts created together
+(bulk imports) are indexed as a batch by add_posts, from one scan of their tags' links. The
+weights of other tags drift as posts come and go without rescoring every pair; rebuild_posts
+(the rebuild_related_posts command) recomputes everything from scratch.
+"""
+
+import heapq
+import math
+from collections import defaultdict
+from django.conf import settings
+from django.db import transaction
+from .models import BlogPost, BlogPostTag, RelatedPost, Tag
+
+
+def idf(post_count, total):
+    return math.log(1 + total / max(post_count, 1))
+
+
+def best(scores, limit):
+    """The `limit` best (post id, score) pairs of a {post id: score} mapping; newer posts win ties"""
+    return heapq.nlargest(limit, scores.items(), key=lambda item: (item[1], item[0]))
+
+
+def neighbour_scores(post_id, total):
+    """Score every post sharing a tag with post `post_id`, out of `total` posts: {post id: score}"""
+    weights = {
+        tag_id: idf(post_count, total)
+        for tag_id, post_count in Tag.objects.filter(post_tags__post_id=post_id).values_list('id', 'post_count')
+    }
+    scores = defaultdict(float)
+    links = BlogPostTag.objects.filter(tag_id__in=weights).exclude(post_id=post_id).values_list('post_id', 'tag_id')
+    for other_id, tag_id in links.iterator():
+        scores[other_id] += weights[tag_id]
+    return scores
+
+
+def replace_lists(lists):
+    """Store {post id: [(related id, score), ...]} as the posts' related posts"""
+    RelatedPost.objects.filter(post_id__in=lists).delete()
+    RelatedPost.objects.bulk_create([
+        RelatedPost(post_id=post_id, related_id=related_id, score=score)
+        for post_id, entries in lists.items() for related_id, score in entries
+    ])
+
+
+def recompute(post_ids, total=None):
+    """Recompute the related posts of `post_ids` from scratch"""
+    if total is None:
+        total = BlogPost.objects.count()
+    limit = settings.BLOG_RELATED_POSTS
+    replace_lists({post_id: best(neighbour_scores(post_id, total), limit) for post_id in post_ids})
+
+
+def update_post(post):
+    """Bring the index up to date after `post` was created or its tags changed"""
+    limit = settings.BLOG_RELATED_POSTS
+    total = BlogPost.objects.count()
+    scores = neighbour_scores(post.pk, total)
+
+    # the lists the post may enter, and the ones it was in
+    current = defaultdict(dict)
+    entries = RelatedPost.objects.filter(post_id__in=scores) | RelatedPost.objects.filter(related_id=post.pk)
+    for post_id, related_id, score in entries.values_list('post_id', 'related_id', 'score'):
+        current[post_id][related_id] = score
+
+    changed, stale = {post.pk: best(scores, limit)}, []
+    for other_id in set(scores) | set(current):
+        listed = current[other_id]
+        old, new = listed.pop(post.pk, None), scores.get(other_id)
+        if old is not None and (new is None or new < old):
+            # something outside the list may now score higher than this post
+            stale.append(other_id)
+            continue
+        if new is None or (old is None and len(listed) >= limit and new <= min(listed.values())):
+            continue
+        listed[post.pk] = new
+        changed[other_id] = best(listed, limit)
+
+    with transaction.atomic():
+        replace_lists(changed)
+        if stale:
+            recompute(stale, total)
+
+
+def add_posts(post_ids):
+    """
+    Bring the index up to date after the posts `post_ids` were created together. New posts are
+    in no list yet and can only enter others, so nothing needs recomputing: every list the
+    batch may enter is read and rewritten once, whatever the number of posts.
+    """
+    post_ids = set(post_ids)
+    if not post_ids:
+        return
+    limit = settings.BLOG_RELATED_POSTS
+    total = BlogPost.objects.count()
+    post_counts = Tag.objects.filter(post_tags__post_id__in=post_ids).distinct().values_list('id', 'post_count')
+    weights = {tag_id: idf(post_count, total) for tag_id, post_count in post_counts}
+    posts_by_tag, tags_by_post = inverted_index(
+        BlogPostTag.objects.filter(tag_id__in=weights).values_list('post_id', 'tag_id').iterator()
+    )
+
+    # the new posts' lists, and what each of them offers the lists of older posts
+    changed, offers = {}, defaultdict(dict)
+    for post_id in post_ids & set(tags_by_post):
+        scores = shared_tag_scores(post_id, tags_by_post[post_id], posts_by_tag, weights)
+        changed[post_id] = best(scores, limit)
+        for other_id, score in scores.items():
+            if other_id not in post_ids:
+                offers[other_id][post_id] = score
+
+    current = defaultdict(dict)
+    rows = RelatedPost.objects.filter(post_id__in=offers).values_list('post_id', 'related_id', 'score')
+    for post_id, related_id, score in rows:
+        current[post_id][related_id] = score
+    for other_id, offered in offers.items():
+        entries = best({**current[other_id], **offered}, limit)
+        # lists none of the new posts made it into stay as they are
+        if any(related_id in offered for related_id, score in entries):
+            changed[other_id] = entries
+
+    with transaction.atomic():
+        replace_lists(changed)
+
+
+def release_post(post):
+    """The posts listing `post`, which is about to be deleted; pass them to refill() once it is"""
+    return list(RelatedPost.objects.filter(related_id=post.pk).values_list('post_id', flat=True))
+
+
+def refill(post_ids):
+    """Recompute the lists a deleted post was removed from"""
+    if post_ids:
+        recompute(post_ids)
+
+
+def inverted_index(links):
+    """The posts of each tag and the tags of each post, from (post id, tag id) links"""
+    posts_by_tag, tags_by_post = defaultdict(list), defaultdict(list)
+    for post_id, tag_id in links:
+        posts_by_tag[tag_id].append(post_id)
+        tags_by_post[post_id].append(tag_id)
+    return posts_by_tag, tags_by_post
+
+
+def shared_tag_scores(post_id, tag_ids, posts_by_tag, weights):
+    """Score every post sharing one of `tag_ids` with post `post_id` from an inverted index: {post id: score}"""
+    scores = defaultdict(float)
+    for tag_id in tag_ids:
+        for other_id in posts_by_tag[tag_id]:
+            if other_id != post_id:
+                scores[other_id] += weights[tag_id]
+    return scores
+
+
+def index_rows(links, post_counts, total, limit):
+    """
+    Every post's `limit` most related posts, from all the (post id, tag id) tag links held in
+    memory as an inverted index, the tags' {tag id: post count} and the number of posts.
+    Yields (post id, related id, score).
+    """
+    weights = {tag_id: idf(post_count, total) for tag_id, post_count in post_counts.items()}
+    posts_by_tag, tags_by_post = inverted_index(links)
+    for post_id, tag_ids in tags_by_post.items():
+        for related_id, score in best(shared_tag_scores(post_id, tag_ids, posts_by_tag, weights), limit):
+            yield post_id, related_id, score
+
+
+def rebuild_posts(batch_size=1000):
+    """Recompute every post's related posts. Returns the number of posts that have some"""
+    rows = index_rows(
+        BlogPostTag.objects.values_list('post_id', 'tag_id').iterator(),
+        dict(Tag.objects.values_list('id', 'post_count')),
+        BlogPost.objects.count(),
+        settings.BLOG_RELATED_POSTS,
+    )
+    with transaction.atomic():
+        RelatedPost.objects.all().delete()
+        created = RelatedPost.objects.bulk_create(
+            [RelatedPost(post_id=post_id, related_id=related_id, score=score) for post_id, related_id, score in rows],
+            batch_size=batch_size,
+        )
+    return len({row.post_id for row in created})
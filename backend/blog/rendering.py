@@ -0,0 +1,213 @@
+import hashlib
+import math
+import multiprocessing
+import re
+import threading
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from html import unescape
+
+import bleach
+import markdown as md
+from django.conf import settings
+from markdown.extensions.toc import TocExtension, slugify
+from config.metrics import timer
+
+# 只允许常见安全标签和属性
+ALLOWED_TAGS = list(bleach.sanitizer.ALLOWED_TAGS) + [
+    'p', 'pre', 'code', 'hr', 'br', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'ul', 'ol', 'li', 'blockquote', 'strong', 'em', 'a', 'img', 'table', 'thead', 'tbody', 'tr', 'th', 'td'
+]
+ALLOWED_ATTRIBUTES = {
+    '*': ['class', 'style'],
+    'a': ['href', 'title', 'rel'],
+    'img': ['src', 'alt', 'title'],
+    # the anchors the table of contents links to, see allow_attribute()
+    **{f'h{level}': ['id'] for level in range(1, 7)},
+}
+
+# Every heading id starts with this, so neither a heading's text nor raw HTML in a post can give
+# an element the id of a global the frontend relies on (DOM clobbering)
+HEADING_ID_PREFIX = 'section-'
+
+# Bump this whenever the rendering pipeline changes in a way the allow-lists don't capture
+RENDERER_VERSION = 3
+
+# the auto-generated excerpt is cut at a word boundary below this many characters
+EXCERPT_LENGTH = 300
+WORDS_PER_MINUTE = 200
+# a word is a run of non-space characters, except that every Chinese or Japanese character counts as one
+CJK = '\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff'
+WORD = re.compile(f'[{CJK}]|[^\\s{CJK}]+')
+
+Rendered = namedtuple('Rendered', ['html', 'excerpt', 'toc', 'word_count', 'reading_time'])
+
+# Building a Markdown converter (its extensions and processors) and a bleach Cleaner (its html5lib
+# parser, walker and serializer) costs more than rendering a short post. Neither is thread-safe,
+# so every thread keeps its own, built on first use from the allow-lists as they are then.
+_local = threading.local()
+
+
+def get_markdown():
+    """This thread's Markdown converter, reset so no state carries over from the previous document"""
+    converter = getattr(_local, 'markdown', None)
+    if converter is None:
+        converter = _local.markdown = md.Markdown(extensions=[TocExtension(slugify=heading_slug)])
+    return converter.reset()
+
+
+def get_cleaner():
+    """This thread's sanitizer for rendered post HTML"""
+    cleaner = getattr(_local, 'cleaner', None)
+    if cleaner is None:
+        cleaner = _local.cleaner = bleach.Cleaner(tags=ALLOWED_TAGS, attributes=allow_attribute, strip=True)
+    return cleaner
+
+
+def heading_slug(value, separator):
+    """The id of the heading with the given text, the anchor its table of contents entry links to"""
+    return HEADING_ID_PREFIX + slugify(value, separator)
+
+
+def allow_attribute(tag, name, value):
+    """
+    Whether the sanitizer keeps an attribute: those ALLOWED_ATTRIBUTES lists, except that a
+    heading id must carry HEADING_ID_PREFIX like the ones heading_slug() generates
+    """
+    if name not in ALLOWED_ATTRIBUTES.get(tag, []) and name not in ALLOWED_ATTRIBUTES['*']:
+        return False
+    return name != 'id' or value.startswith(HEADING_ID_PREFIX)
+
+
+def get_text_cleaner():
+    """This thread's sanitizer stripping every tag"""
+    cleaner = getattr(_local, 'text_cleaner', None)
+    if cleaner is None:
+        cleaner = _local.text_cleaner = bleach.Cleaner(tags=[], strip=True)
+    return cleaner
+
+
+def renderer_signature():
+    """
+    Describe the current renderer configuration as a stable string,
+    so that changing the allow-lists invalidates every stored rendering.
+    """
+    attributes = sorted((tag, sorted(attrs)) for tag, attrs in ALLOWED_ATTRIBUTES.items())
+    return f'v{RENDERER_VERSION}|{sorted(set(ALLOWED_TAGS))}|{attributes}|{HEADING_ID_PREFIX}'
+
+
+def content_digest(content):
+    """Return the cache key for the rendered HTML of the given Markdown content"""
+    payload = f'{renderer_signature()}\n{content}'
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def render_post(content):
+    """
+    Render a post body once and derive everything stored from it: the sanitized HTML,
+    a plain-text excerpt, the table of contents of its headings, its word count and
+    its reading time in minutes.
+    """
+    with timer('markdown'):
+        converter = get_markdown()
+        html = get_cleaner().clean(converter.convert(content))
+        text = ' '.join(html_to_text(html).split())
+        word_count = len(WORD.findall(text))
+        return Rendered(
+            html=html,
+            excerpt=make_excerpt(text),
+            toc=toc_entries(converter.toc_tokens),
+            word_count=word_count,
+            reading_time=math.ceil(word_count / WORDS_PER_MINUTE),
+        )
+
+
+def render_markdown(content):
+    """Render Markdown to sanitized HTML"""
+    return render_post(content).html
+
+
+# worker processes for render_many, started on the first batch big enough to need them
+_pool = None
+_pool_workers = None
+_pool_lock = threading.Lock()
+
+
+def get_pool(workers):
+    """
+    Return the pool of `workers` processes batch renders are spread over.
+    Workers are spawned rather than forked, so they don't inherit the locks and
+    database connections of a threaded server.
+    """
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is not None and _pool_workers != workers:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+            _pool_workers = workers
+        return _pool
+
+
+def shutdown_pool():
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = _pool_workers = None
+
+
+def render_many(contents, workers=None):
+    """
+    render_post() every document, in order.
+    Rendering is CPU-bound and holds the GIL, so batches of at least BLOG_PARALLEL_RENDER_THRESHOLD
+    documents are spread over `workers` (default BLOG_RENDER_WORKERS) processes; smaller ones
+    (and every batch when there is at most one worker) are rendered here, which is cheaper than
+    shipping them out.
+    """
+    contents = list(contents)
+    workers = settings.BLOG_RENDER_WORKERS if workers is None else workers
+    with timer('markdown'):
+        if workers <= 1 or len(contents) < max(settings.BLOG_PARALLEL_RENDER_THRESHOLD, 2):
+            return [render_post(content) for content in contents]
+        try:
+            return list(get_pool(workers).map(render_post, contents, chunksize=max(1, len(contents) // (workers * 4))))
+        except BrokenProcessPool:
+            # a worker died (killed, out of memory): start over with a fresh pool next time, render here now
+            shutdown_pool()
+            return [render_post(content) for content in contents]
+
+
+def make_excerpt(text):
+    """
+    Cut plain text to at most EXCERPT_LENGTH characters, at the last space if there is one
+    (text without spaces, like Chinese, is cut anywhere)
+    """
+    if len(text) <= EXCERPT_LENGTH:
+        return text
+    cut = text[:EXCERPT_LENGTH]
+    if ' ' in cut:
+        cut = cut.rsplit(' ', 1)[0]
+    return cut + '…'
+
+
+def toc_entries(tokens):
+    """
+    Reduce Markdown's toc_tokens to plain data: [{'level', 'id', 'title', 'children'}, ...].
+    Titles are plain text; the heading HTML the tokens carry isn't sanitized, so it's left out.
+    """
+    return [
+        {
+            'level': token['level'],
+            'id': token['id'],
+            'title': unescape(token['name']),
+            'children': toc_entries(token['children']),
+        }
+        for token in tokens
+    ]
+
+
+def html_to_text(html):
+    """Strip every tag from rendered HTML, leaving plain text"""
+    return unescape(get_text_cleaner().clean(html))
@@ -0,0 +1,162 @@
+"""
+Invalidation-aware cache for read endpoint responses.
+
+A cached response is keyed by the request path, its query string and the current value of
+every version counter it depends on (the post list, one post, one author's posts, one post's
+comments). Writes bump the relevant counters from model signals, which orphans every cached
+response built from older data instead of trying to find and delete them.
+"""
+
+import hashlib
+import threading
+import time
+from collections import Counter
+from functools import wraps
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+from rest_framework.response import Response
+from config import routers
+
+# headers stored alongside the data so hits can still answer conditional requests
+CACHED_HEADERS = ('ETag', 'Last-Modified')
+
+_stats = Counter()
+_stats_lock = threading.Lock()
+
+
+def get_cache():
+    return caches[settings.RESPONSE_CACHE_ALIAS]
+
+
+def version_key(scope, ident=''):
+    return f'rc:v:{scope}:{ident}'
+
+
+def post_list_version():
+    return version_key('posts')
+
+
+def post_version(pk):
+    return version_key('post', pk)
+
+
+def author_version(username):
+    return version_key('author', username)
+
+
+def comments_version(post_id):
+    return version_key('comments', post_id)
+
+
+def current_versions(keys):
+    """
+    Return the current value of each version counter.
+    Missing counters (never bumped, or evicted) start from a fresh timestamp
+    so they can't collide with a value used by responses cached before the eviction.
+    """
+    cache = get_cache()
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, time.time_ns(), timeout=None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def recent_key(key):
+    return f'rc:recent:{key}'
+
+
+def bump(*keys):
+    """
+    Invalidate every cached response that depends on any of the given version counters,
+    now and again once the current transaction commits: a request reading before the write
+    commits would otherwise cache the old data under the new version.
+    With read replicas, the counters are also marked as recently bumped for the replicas'
+    sticky window, while a replica may not have the write yet (see cache_response).
+    """
+    def incr():
+        cache = get_cache()
+        for key in keys:
+            try:
+                cache.incr(key)
+            except ValueError:
+                cache.set(key, time.time_ns(), timeout=None)
+        if settings.DATABASE_READ_REPLICAS:
+            cache.set_many({recent_key(key): True for key in keys}, settings.DATABASE_REPLICA_STICKY_SECONDS)
+
+    if keys:
+        incr()
+        transaction.on_commit(incr)
+
+
+def record(view_name, hit):
+    with _stats_lock:
+        _stats[(view_name, 'hit' if hit else 'miss')] += 1
+
+
+def get_stats():
+    """Return the hit/miss counts of this process, keyed by (view name, 'hit'|'miss')"""
+    with _stats_lock:
+        return dict(_stats)
+
+
+def response_key(request, versions):
+    query = '&'.join(sorted(request.GET.urlencode().split('&')))
+    raw = f'{request.path}?{query}|{"|".join(str(v) for v in versions)}'
+    return 'rc:r:' + hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def stale(cache, version_keys):
+    """
+    Whether a response may have been built from a replica that lacks a recent write to its data;
+    stored, it would stay cached under the current versions
+    """
+    return routers.reads_replica() and bool(cache.get_many([recent_key(key) for key in version_keys]))
+
+
+def cache_response(get_version_keys):
+    """
+    Cache the data of a successful APIView GET handler.
+    `get_version_keys(request, *args, **kwargs)` returns the version counters the response depends on.
+    Hits skip the handler entirely, including its database queries and serialization,
+    and still answer If-None-Match / If-Modified-Since from the cached validators.
+    """
+    def decorator(handler):
+        @wraps(handler)
+        def wrapper(view, request, *args, **kwargs):
+            if not settings.RESPONSE_CACHE_ENABLED:
+                return handler(view, request, *args, **kwargs)
+
+            cache = get_cache()
+            version_keys = get_version_keys(request, *args, **kwargs)
+            versions = current_versions(version_keys)
+            key = response_key(request, versions)
+            view_name = type(view).__name__
+
+            cached = cache.get(key)
+            if cached is not None:
+                record(view_name, hit=True)
+                data, headers = cached
+                response = Response(data, headers=headers)
+                response['X-Cache'] = 'HIT'
+                return get_conditional_response(
+                    request,
+                    etag=headers.get('ETag'),
+                    last_modified=parse_http_date_safe(headers.get('Last-Modified')),
+                    response=response
+                )
+
+            record(view_name, hit=False)
+            response = handler(view, request, *args, **kwargs)
+            if isinstance(response, Response) and response.status_code == 200:
+                if not stale(cache, version_keys):
+                    headers = {name: response[name] for name in CACHED_HEADERS if response.has_header(name)}
+                    cache.set(key, (response.data, headers), settings.RESPONSE_CACHE_TIMEOUT)
+                response['X-Cache'] = 'MISS'
+            return response
+        return wrapper
+    return decorator
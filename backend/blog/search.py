@@ -0,0 +1,191 @@
+"""
+Full-text search over blog posts.
+
+The index lives next to the blog tables and is maintained incrementally from the post
+save/delete signals. SQLite uses an FTS5 virtual table, PostgreSQL a tsvector column
+with a GIN index. Both rank matches so that a lower rank is a better match.
+"""
+
+import re
+from collections import namedtuple
+from django.db import connections
+from django.utils.html import escape
+from .rendering import html_to_text, render_markdown
+
+SearchHit = namedtuple('SearchHit', ['id', 'rank', 'snippet'])
+
+INDEX_TABLE = 'blog_post_search'
+# control characters never appear in indexed text, so they are safe highlight markers;
+# they are swapped for <mark> tags only after the snippet has been HTML-escaped
+HIGHLIGHT_START = '\x02'
+HIGHLIGHT_END = '\x03'
+
+
+def document_for(post):
+    """Return the (id, title, body) triple indexed for a post"""
+    html = post.content_html or render_markdown(post.content)
+    return post.id, post.title, html_to_text(html)
+
+
+def highlight(snippet):
+    """Escape a raw snippet and turn the highlight markers into <mark> tags"""
+    return escape(snippet).replace(HIGHLIGHT_START, '<mark>').replace(HIGHLIGHT_END, '</mark>')
+
+
+class SqliteSearchBackend:
+    """FTS5 index whose rowid is the post id"""
+
+    def install(self, cursor):
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {INDEX_TABLE} "
+            f"USING fts5(title, body, tokenize='unicode61 remove_diacritics 2')"
+        )
+
+    def uninstall(self, cursor):
+        cursor.execute(f'DROP TABLE IF EXISTS {INDEX_TABLE}')
+
+    def index(self, cursor, documents):
+        self.remove(cursor, [doc[0] for doc in documents])
+        cursor.executemany(f'INSERT INTO {INDEX_TABLE} (rowid, title, body) VALUES (%s, %s, %s)', documents)
+
+    def remove(self, cursor, post_ids):
+        if post_ids:
+            placeholders = ', '.join(['%s'] * len(post_ids))
+            cursor.execute(f'DELETE FROM {INDEX_TABLE} WHERE rowid IN ({placeholders})', list(post_ids))
+
+    @staticmethod
+    def to_match_expression(query):
+        """
+        Turn free text into a safe FTS5 expression: every word quoted (implicit AND),
+        the last one as a prefix so results show up while typing.
+        """
+        words = re.findall(r'\w+', query)
+        if not words:
+            return None
+        terms = [f'"{word}"' for word in words]
+        terms[-1] += '*'
+        return ' '.join(terms)
+
+    def search(self, cursor, query, limit, position=None, reverse=False):
+        expression = self.to_match_expression(query)
+        if expression is None:
+            return []
+        sql = (
+            f"SELECT post_id, rank, snippet FROM ("
+            f"  SELECT rowid AS post_id, bm25({INDEX_TABLE}, 10.0, 1.0) AS rank,"
+            f"         snippet({INDEX_TABLE}, 1, %s, %s, '…', 24) AS snippet"
+            f"  FROM {INDEX_TABLE} WHERE {INDEX_TABLE} MATCH %s"
+            f")"
+        )
+        params = [HIGHLIGHT_START, HIGHLIGHT_END, expression]
+        sql, params = _page(sql, params, 'post_id', position, reverse, limit)
+        cursor.execute(sql, params)
+        return [SearchHit(*row) for row in cursor.fetchall()]
+
+
+class PostgresSearchBackend:
+    """Weighted tsvector (title A, body B) kept in a side table with a GIN index"""
+
+    config = 'english'
+
+    def install(self, cursor):
+        cursor.execute(
+            f"CREATE TABLE IF NOT EXISTS {INDEX_TABLE} ("
+            f"  post_id bigint PRIMARY KEY REFERENCES blog_blogpost (id) ON DELETE CASCADE,"
+            f"  title text NOT NULL,"
+            f"  body text NOT NULL,"
+            f"  document tsvector GENERATED ALWAYS AS ("
+            f"    setweight(to_tsvector('{self.config}', title), 'A') ||"
+            f"    setweight(to_tsvector('{self.config}', body), 'B')"
+            f"  ) STORED"
+            f")"
+        )
+        cursor.execute(
+            f'CREATE INDEX IF NOT EXISTS {INDEX_TABLE}_document_idx ON {INDEX_TABLE} USING GIN (document)'
+        )
+
+    def uninstall(self, cursor):
+        cursor.execute(f'DROP TABLE IF EXISTS {INDEX_TABLE}')
+
+    def index(self, cursor, documents):
+        cursor.executemany(
+            f'INSERT INTO {INDEX_TABLE} (post_id, title, body) VALUES (%s, %s, %s) '
+            f'ON CONFLICT (post_id) DO UPDATE SET title = EXCLUDED.title, body = EXCLUDED.body',
+            documents
+        )
+
+    def remove(self, cursor, post_ids):
+        if post_ids:
+            cursor.execute(f'DELETE FROM {INDEX_TABLE} WHERE post_id = ANY(%s)', [list(post_ids)])
+
+    def search(self, cursor, query, limit, position=None, reverse=False):
+        # rank first, then build headlines only for the rows of the requested page
+        ranked = (
+            f"SELECT post_id, -ts_rank_cd(document, query)::float8 AS rank, body, query"
+            f" FROM {INDEX_TABLE}, websearch_to_tsquery('{self.config}', %s) query"
+            f" WHERE document @@ query"
+        )
+        ranked, params = _page(f'SELECT * FROM ({ranked}) ranked', [query], 'post_id', position, reverse, limit)
+        sql = (
+            f"SELECT post_id, rank, ts_headline('{self.config}', body, query, %s) FROM ({ranked}) page"
+            f" ORDER BY rank {'DESC' if reverse else 'ASC'}, post_id {'DESC' if reverse else 'ASC'}"
+        )
+        options = f'StartSel={HIGHLIGHT_START}, StopSel={HIGHLIGHT_END}, MaxWords=35, MinWords=15'
+        cursor.execute(sql, [options, *params])
+        return [SearchHit(*row) for row in cursor.fetchall()]
+
+
+def _page(sql, params, id_column, position, reverse, limit):
+    """Apply keyset pagination on (rank, id) to a ranked subquery"""
+    if position is not None:
+        op = '<' if reverse else '>'
+        rank, post_id = position
+        sql += f' WHERE rank {op} %s OR (rank = %s AND {id_column} {op} %s)'
+        params = [*params, rank, rank, post_id]
+    direction = 'DESC' if reverse else 'ASC'
+    sql += f' ORDER BY rank {direction}, {id_column} {direction} LIMIT %s'
+    return sql, [*params, limit]
+
+
+BACKENDS = {
+    'sqlite': SqliteSearchBackend,
+    'postgresql': PostgresSearchBackend,
+}
+
+
+def get_backend(connection):
+    """Return the search backend for a database connection, or None if the vendor isn't supported"""
+    backend_class = BACKENDS.get(connection.vendor)
+    return backend_class() if backend_class else None
+
+
+def index_posts(posts, using='default'):
+    """Add or refresh the index entries of the given posts"""
+    connection = connections[using]
+    backend = get_backend(connection)
+    if backend is None or not posts:
+        return
+    with connection.cursor() as cursor:
+        backend.index(cursor, [document_for(post) for post in posts])
+
+
+def remove_posts(post_ids, using='default'):
+    connection = connections[using]
+    backend = get_backend(connection)
+    if backend is None:
+        return
+    with connection.cursor() as cursor:
+        backend.remove(cursor, list(post_ids))
+
+
+def search_posts(query, limit, position=None, reverse=False, using='default'):
+    """
+    Return up to `limit` SearchHits for a free-text query, best match first,
+    starting after the (rank, id) `position` of a previous page.
+    """
+    connection = connections[using]
+    backend = get_backend(connection)
+    if backend is None:
+        return []
+    with connection.cursor() as cursor:
+        return backend.search(cursor, query, limit, position, reverse)
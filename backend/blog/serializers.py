@@ -1,35 +1,89 @@
 from rest_framework import serializers
-from .models import BlogPost
-import markdown as md
-import bleach
+from config.metrics import TimedSerializerMixin
+from .models import BlogPost, Tag
 
-class BlogPostSerializer(serializers.ModelSerializer):
+class BlogPostSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """
     This serializer handles the serialization and deserialization of blog posts,
     """
     author = serializers.CharField(source='author.username', read_only=True)
-    content_html = serializers.SerializerMethodField()
     class Meta:
         model = BlogPost
         # Specify the fields to be included in the serialized output
-        fields = ['id', 'title', 'content', 'content_html', 'summary', 'author', 
-                 'published_date', 'updated_date', 'tags']
-        read_only_fields = ['author', 'published_date', 'updated_date'] # these fields are set automatically
+        fields = ['id', 'title', 'content', 'content_html', 'summary', 'excerpt', 'toc', 'word_count',
+                 'reading_time', 'author', 'published_date', 'updated_date', 'tags', 'comment_count',
+                 'last_comment_at']
+        # these fields are set automatically; the rendered ones are stored when the post is saved
+        read_only_fields = ['author', 'published_date', 'updated_date', 'comment_count', 'last_comment_at',
+                            'content_html', 'excerpt', 'toc', 'word_count', 'reading_time']
 
     def create(self, validated_data):
         # Automatically set the author to the current user when creating a new blog post
         validated_data['author'] = self.context['request'].user
         return super().create(validated_data)
-    
-    def get_content_html(self, obj):
-        html = md.markdown(obj.content)
-        # 只允许常见安全标签和属性
-        allowed_tags = list(bleach.sanitizer.ALLOWED_TAGS) + [
-            'p', 'pre', 'code', 'hr', 'br', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'ul', 'ol', 'li', 'blockquote', 'strong', 'em', 'a', 'img', 'table', 'thead', 'tbody', 'tr', 'th', 'td'
-        ]
-        allowed_attributes = {
-            '*': ['class', 'style'],
-            'a': ['href', 'title', 'rel'],
-            'img': ['src', 'alt', 'title'],
-        }
-        return bleach.clean(html, tags=allowed_tags, attributes=allowed_attributes, strip=True)
\ No newline at end of file
+
+
+class BlogPostListSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    """
+    Compact, read-only representation used by the post listings.
+    Leaves out `content` and `content_html` so list views never load or render the post body.
+    Pass `fields=[...]` to narrow it down further (sparse fieldsets).
+    """
+    author = serializers.CharField(source='author.username', read_only=True)
+
+    class Meta:
+        model = BlogPost
+        fields = ['id', 'title', 'summary', 'excerpt', 'reading_time', 'author', 'published_date',
+                  'updated_date', 'tags', 'comment_count', 'last_comment_at']
+        read_only_fields = fields
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+    @classmethod
+    def parse_fields(cls, value):
+        """
+        Parse a `?fields=` value into a list of field names.
+        Returns None when no fieldset was requested.
+        """
+        if not value:
+            return None
+        requested = [name.strip() for name in value.split(',') if name.strip()]
+        unknown = [name for name in requested if name not in cls.Meta.fields]
+        if unknown:
+            raise serializers.ValidationError(
+                {'fields': f"Unknown field(s): {', '.join(unknown)}. Choose from: {', '.join(cls.Meta.fields)}"}
+            )
+        return requested
+
+    def get_model_fields(self):
+        """
+        Return the `.only()` paths needed to serialize the selected fields,
+        and the relations they traverse, for use with `.select_related()`.
+        """
+        sources = [field.source for field in self.fields.values()]
+        only = {source.replace('.', '__') for source in sources}
+        related = {source.split('.')[0] for source in sources if '.' in source}
+        return only, related
+
+
+class BlogPostExportSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    """
+    One line of a JSONL export.
+    The rendered HTML is left out: it is derived from `content` and rebuilt on import.
+    """
+    author = serializers.CharField(source='author.username', read_only=True)
+
+    class Meta:
+        model = BlogPost
+        fields = ['id', 'title', 'content', 'summary', 'author', 'published_date', 'updated_date', 'tags']
+        read_only_fields = fields
+
+
+class TagSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    class Meta:
+        model = Tag
+        fields = ['name', 'post_count']
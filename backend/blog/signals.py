@@ -0,0 +1,86 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from .models import BlogPost
+from . import related, response_cache, search, tags
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=BlogPost)
+def sync_tags_on_save(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or 'tags' in update_fields:
+        if tags.sync_post_tags(instance):
+            related.update_post(instance)
+
+
+@receiver(pre_delete, sender=BlogPost)
+def release_tags_on_delete(sender, instance, **kwargs):
+    tags.release_post_tags(instance)
+    # the lists the post is in lose it to the cascade and are refilled once it's gone
+    instance._listed_by = related.release_post(instance)
+
+
+@receiver(post_delete, sender=BlogPost)
+def refill_related_on_delete(sender, instance, **kwargs):
+    related.refill(getattr(instance, '_listed_by', []))
+
+
+@receiver(post_save, sender=BlogPost)
+def index_on_save(sender, instance, using, update_fields=None, **kwargs):
+    if update_fields is None or {'title', 'content', 'content_html'} & set(update_fields):
+        search.index_posts([instance], using=using)
+
+
+@receiver(post_delete, sender=BlogPost)
+def unindex_on_delete(sender, instance, using, **kwargs):
+    search.remove_posts([instance.pk], using=using)
+
+
+def author_username(post, origin=None):
+    """
+    The username of a post's author, without loading the author when it can be avoided:
+    a deleted user's posts are deleted with it (`origin`), and views usually have it loaded
+    """
+    if isinstance(origin, User) and origin.pk == post.author_id:
+        return origin.username
+    if BlogPost.author.is_cached(post):
+        return post.author.username
+    return User.objects.filter(pk=post.author_id).values_list('username', flat=True).first()
+
+
+@receiver(post_save, sender=BlogPost)
+@receiver(post_delete, sender=BlogPost)
+def invalidate_cached_responses(sender, instance, origin=None, **kwargs):
+    response_cache.bump(
+        response_cache.post_list_version(),
+        response_cache.post_version(instance.pk),
+        response_cache.author_version(author_username(instance, origin)),
+    )
+
+
+@receiver(pre_save, sender=User)
+def remember_username(sender, instance, update_fields=None, **kwargs):
+    # GitHub logins rename users; the old name is needed to invalidate what was cached under it
+    if instance.pk is not None and (update_fields is None or 'username' in update_fields):
+        instance._saved_username = User.objects.filter(pk=instance.pk).values_list('username', flat=True).first()
+
+
+def renamed_from(user):
+    """The username `user` had before the save in progress, if the save changes it"""
+    old = getattr(user, '_saved_username', None)
+    return old if old is not None and old != user.username else None
+
+
+@receiver(post_save, sender=User)
+def invalidate_cached_responses_on_rename(sender, instance, created, **kwargs):
+    old = None if created else renamed_from(instance)
+    if old is not None:
+        # every post of the user shows the author's name
+        post_ids = BlogPost.objects.filter(author=instance).values_list('pk', flat=True)
+        response_cache.bump(
+            response_cache.post_list_version(),
+            response_cache.author_version(old),
+            response_cache.author_version(instance.username),
+            *(response_cache.post_version(pk) for pk in post_ids),
+        )
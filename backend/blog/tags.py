@@ -0,0 +1,98 @@
+from collections import Counter, defaultdict
+from django.db import transaction
+from django.db.models import Count, F
+from .models import BlogPostTag, Tag
+
+TAG_MAX_LENGTH = Tag._meta.get_field('name').max_length
+MATCH_ALL = 'all'
+MATCH_ANY = 'any'
+
+
+def normalize_tags(names):
+    """
+    Normalize raw tag names: trim, lower-case, truncate and drop empties and duplicates,
+    keeping the original order.
+    """
+    normalized = []
+    for name in names or []:
+        if not isinstance(name, str):
+            continue
+        name = name.strip().lower()[:TAG_MAX_LENGTH]
+        if name and name not in normalized:
+            normalized.append(name)
+    return normalized
+
+
+def parse_tags_param(value):
+    """Parse a comma separated `?tags=` value"""
+    return normalize_tags(value.split(',')) if value else []
+
+
+def sync_post_tags(post):
+    """
+    Make the post's Tag links match its `tags` JSON field,
+    adjusting each affected tag's `post_count` counter. Returns whether the links changed.
+    """
+    names = set(normalize_tags(post.tags))
+    current = dict(BlogPostTag.objects.filter(post=post).values_list('tag__name', 'tag_id'))
+    added = names - current.keys()
+    removed_ids = [tag_id for name, tag_id in current.items() if name not in names]
+    if not added and not removed_ids:
+        return False
+
+    with transaction.atomic():
+        if added:
+            Tag.objects.bulk_create([Tag(name=name) for name in added], ignore_conflicts=True)
+            added_ids = list(Tag.objects.filter(name__in=added).values_list('id', flat=True))
+            BlogPostTag.objects.bulk_create(
+                [BlogPostTag(post=post, tag_id=tag_id) for tag_id in added_ids],
+                ignore_conflicts=True
+            )
+            Tag.objects.filter(id__in=added_ids).update(post_count=F('post_count') + 1)
+        if removed_ids:
+            BlogPostTag.objects.filter(post=post, tag_id__in=removed_ids).delete()
+            Tag.objects.filter(id__in=removed_ids).update(post_count=F('post_count') - 1)
+    return True
+
+
+def link_new_posts_tags(posts):
+    """
+    Create the Tag links of freshly inserted posts in bulk, for writes such as
+    `bulk_create` that skip the post_save signal calling `sync_post_tags`.
+    """
+    names_by_post = {post.pk: normalize_tags(post.tags) for post in posts}
+    names = {name for post_names in names_by_post.values() for name in post_names}
+    if not names:
+        return
+
+    with transaction.atomic():
+        Tag.objects.bulk_create([Tag(name=name) for name in names], ignore_conflicts=True)
+        tag_ids = dict(Tag.objects.filter(name__in=names).values_list('name', 'id'))
+        BlogPostTag.objects.bulk_create([
+            BlogPostTag(post_id=post_id, tag_id=tag_ids[name])
+            for post_id, post_names in names_by_post.items() for name in post_names
+        ])
+        # one UPDATE per distinct increment rather than one per tag
+        by_increment = defaultdict(list)
+        for tag_id, added in Counter(tag_ids[name] for names in names_by_post.values() for name in names).items():
+            by_increment[added].append(tag_id)
+        for added, ids in by_increment.items():
+            Tag.objects.filter(id__in=ids).update(post_count=F('post_count') + added)
+
+
+def release_post_tags(post):
+    """Decrement the counters of every tag on a post that is about to be deleted"""
+    Tag.objects.filter(post_tags__post=post).update(post_count=F('post_count') - 1)
+
+
+def filter_by_tags(queryset, names, match=MATCH_ALL):
+    """
+    Restrict a BlogPost queryset to posts carrying all (or any) of the given normalized tag names.
+    Both forms are a single indexed subquery on the post/tag link table.
+    """
+    if not names:
+        return queryset
+    links = BlogPostTag.objects.filter(tag__name__in=names)
+    if match == MATCH_ALL:
+        links = links.values('post_id').annotate(matched=Count('tag_id')).filter(matched=len(names))
+    return queryset.filter(id__in=links.values('post_id'))
@@ -1,13 +1,30 @@
+import json
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+from django.core.management import CommandError, call_command
+from django.db import DatabaseError, connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from rest_framework import status
 from rest_framework.test import APITestCase
-from .models import BlogPost
+from config.testing import QueryBudgetMixin
+from .models import BlogPost, RelatedPost, Tag
+from . import bulk, rendering, response_cache
+from .management.commands import explain_hot_queries
 
 User = get_user_model()
 
 class BlogAPITestCase(APITestCase):
     def setUp(self):
+        cache.clear()
         self.user = User.objects.create_user(
             username='testuser',
             email='test@example.com',
@@ -37,8 +54,8 @@ class BlogAPITestCase(APITestCase):
     def test_list_blog_posts(self):
         response = self.client.get(self.list_url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
-        self.assertEqual(response.data[0]['title'], 'Test Post')
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertEqual(response.data['results'][0]['title'], 'Test Post')
 
     def test_create_blog_post_authenticated(self):
         self.authenticate_user(self.user)
@@ -110,24 +127,70 @@ class BlogAPITestCase(APITestCase):
         """test listing all blog posts by a specific user"""
         response = self.client.get(self.user_posts_url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
-        self.assertEqual(response.data[0]['author'], self.user.username)
-
-    # TODO uncomment and implement filtering by tags after changing DB to AWS PostgreSQL
-    # def test_blog_post_tags_filter(self):
-    #     """test filtering blog posts by tags"""
-    #     BlogPost.objects.create(
-    #         title='Another Post',
-    #         content='Content',
-    #         summary='Summary',
-    #         author=self.user,
-    #         tags=['other']
-    #     )
-        
-    #     response = self.client.get(f'{self.list_url}?tags=test')
-    #     self.assertEqual(response.status_code, status.HTTP_200_OK)
-    #     self.assertEqual(len(response.data), 1)
-    #     self.assertEqual(response.data[0]['title'], 'Test Post')
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertEqual(response.data['results'][0]['author'], self.user.username)
+
+    def test_list_omits_post_body(self):
+        """list views return the compact representation and never load the content column"""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.list_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn('content', response.data['results'][0])
+        self.assertNotIn('content_html', response.data['results'][0])
+        self.assertEqual(response.data['results'][0]['summary'], 'Test Summary')
+        for query in queries.captured_queries:
+            self.assertNotIn('"blog_blogpost"."content"', query['sql'])
+
+    def test_list_sparse_fieldset(self):
+        response = self.client.get(self.user_posts_url, {'fields': 'id,title'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(set(response.data['results'][0]), {'id', 'title'})
+
+    def test_list_unknown_field(self):
+        response = self.client.get(self.list_url, {'fields': 'title,content'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('fields', response.data)
+
+    def test_blog_post_tags_filter(self):
+        """test filtering blog posts by tags"""
+        BlogPost.objects.create(
+            title='Another Post',
+            content='Content',
+            summary='Summary',
+            author=self.user,
+            tags=['other', 'API']
+        )
+
+        response = self.client.get(f'{self.list_url}?tags=test')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertEqual(response.data['results'][0]['title'], 'Test Post')
+
+        # all tags must match by default; names are matched case-insensitively
+        response = self.client.get(f'{self.list_url}?tags=API,other')
+        self.assertEqual([p['title'] for p in response.data['results']], ['Another Post'])
+
+        response = self.client.get(f'{self.list_url}?tags=test,other&tag_match=any')
+        self.assertEqual(len(response.data['results']), 2)
+
+        response = self.client.get(f'{self.list_url}?tags=test&tag_match=some')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_tag_counts_maintained(self):
+        """tag counters follow post creation, tag edits and deletion"""
+        other = BlogPost.objects.create(title='Other', content='Content', author=self.user, tags=['api', 'django'])
+        response = self.client.get(reverse('tag-list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data[0], {'name': 'api', 'post_count': 2})
+
+        other.tags = ['django', 'orm']
+        other.save()
+        self.assertEqual(Tag.objects.get(name='api').post_count, 1)
+        self.assertEqual(Tag.objects.get(name='orm').post_count, 1)
+
+        self.test_post.delete()
+        response = self.client.get(reverse('tag-list'))
+        self.assertEqual({t['name']: t['post_count'] for t in response.data}, {'django': 1, 'orm': 1})
 
     def test_create_blog_post_invalid_data(self):
         """test creating a blog post with invalid data"""
@@ -152,3 +215,806 @@ class BlogAPITestCase(APITestCase):
         response = self.client.put(self.detail_url, data, format='json')
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
         self.assertIn('title', response.data)
+
+
+@override_settings(RESPONSE_CACHE_ENABLED=False)
+class BlogConditionalRequestTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='etaguser',
+            email='etag@example.com',
+            password='EtagPass123!'
+        )
+        self.post = BlogPost.objects.create(title='Cached', content='Body', author=self.user)
+        self.detail_url = reverse('blog-detail', kwargs={'pk': self.post.pk})
+
+    def test_detail_sends_validators(self):
+        response = self.client.get(self.detail_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response['ETag'].startswith('"'))
+        self.assertIn('Last-Modified', response)
+
+    def test_if_none_match_returns_304(self):
+        etag = self.client.get(self.detail_url)['ETag']
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+        # only the timestamp probe runs; the post body is never loaded
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('"blog_blogpost"."content"', queries.captured_queries[0]['sql'])
+
+        self.post.title = 'Changed'
+        self.post.save()
+        response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_rename_changes_etag(self):
+        etag = self.client.get(self.detail_url)['ETag']
+        self.user.username = 'renamed'
+        self.user.save()
+        response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['author'], 'renamed')
+
+    def test_if_modified_since_returns_304(self):
+        last_modified = self.client.get(self.detail_url)['Last-Modified']
+        response = self.client.get(self.detail_url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_conditional_put(self):
+        """an update made with a stale ETag is rejected instead of overwriting the newer version"""
+        self.client.force_authenticate(user=self.user)
+        etag = self.client.get(self.detail_url)['ETag']
+        data = {'title': 'First editor', 'content': 'Body'}
+        response = self.client.put(self.detail_url, data, format='json', HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+        data = {'title': 'Second editor', 'content': 'Body'}
+        response = self.client.put(self.detail_url, data, format='json', HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.title, 'First editor')
+
+    @override_settings(BLOG_REQUIRE_IF_MATCH=True)
+    def test_if_match_required(self):
+        self.client.force_authenticate(user=self.user)
+        response = self.client.put(self.detail_url, {'title': 'Blind', 'content': 'Body'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_428_PRECONDITION_REQUIRED)
+
+
+class BlogResponseCacheTestCase(QueryBudgetMixin, APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='cacheuser',
+            email='cache@example.com',
+            password='CachePass123!'
+        )
+        self.post = BlogPost.objects.create(title='Cached', content='Body', author=self.user)
+        self.detail_url = reverse('blog-detail', kwargs={'pk': self.post.pk})
+
+    def test_repeat_read_served_from_cache(self):
+        for url in (reverse('blog-list'), self.detail_url, reverse('user-posts', kwargs={'username': 'cacheuser'})):
+            first = self.client.get(url)
+            self.assertEqual(first['X-Cache'], 'MISS')
+            with CaptureQueriesContext(connection) as queries:
+                second = self.client.get(url)
+            self.assertEqual(second['X-Cache'], 'HIT')
+            self.assertEqual(len(queries), 0)
+            self.assertEqual(second.data, first.data)
+
+    def test_writes_invalidate_cached_responses(self):
+        self.client.get(reverse('blog-list'))
+        self.client.get(self.detail_url)
+        self.client.force_authenticate(user=self.user)
+        response = self.client.put(self.detail_url, {'title': 'Edited', 'content': 'Body'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.assertEqual(self.client.get(self.detail_url).data['title'], 'Edited')
+        self.assertEqual(self.client.get(reverse('blog-list')).data['results'][0]['title'], 'Edited')
+
+        self.client.delete(self.detail_url)
+        self.assertEqual(self.client.get(self.detail_url).status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.client.get(reverse('blog-list')).data['results'], [])
+
+    def test_rename_invalidates_cached_responses(self):
+        old_author_url = reverse('user-posts', kwargs={'username': 'cacheuser'})
+        for url in (reverse('blog-list'), self.detail_url, old_author_url):
+            self.client.get(url)
+        self.user.username = 'renamed'
+        self.user.save()
+
+        self.assertEqual(self.client.get(reverse('blog-list')).data['results'][0]['author'], 'renamed')
+        self.assertEqual(self.client.get(self.detail_url).data['author'], 'renamed')
+        self.assertEqual(self.client.get(old_author_url).data['results'], [])
+
+    def test_deleting_an_author_does_not_load_them_per_post(self):
+        for i in range(4):
+            BlogPost.objects.create(title=f'More {i}', content='Body', author=self.user)
+        author_url = reverse('user-posts', kwargs={'username': 'cacheuser'})
+        self.client.get(author_url)
+        user = User.objects.get(pk=self.user.pk)
+        with CaptureQueriesContext(connection) as queries:
+            user.delete()
+        user_reads = [q for q in queries.captured_queries if q['sql'].startswith('SELECT') and 'FROM "users_user"' in q['sql']]
+        self.assertEqual(user_reads, [])
+        self.assertEqual(self.client.get(author_url).data['results'], [])
+
+    def test_post_saves_use_the_loaded_author(self):
+        post = BlogPost.objects.select_related('author').get(pk=self.post.pk)
+        with CaptureQueriesContext(connection) as queries:
+            post.save(update_fields=['title'])
+        self.assertFalse([q for q in queries.captured_queries if 'FROM "users_user"' in q['sql']])
+
+    def test_other_user_saves_leave_cache_alone(self):
+        self.client.get(self.detail_url)
+        self.user.last_login = timezone.now()
+        self.user.save(update_fields=['last_login'])
+        self.user.first_name = 'Cache'
+        self.user.save()
+        self.assertEqual(self.client.get(self.detail_url)['X-Cache'], 'HIT')
+
+    def test_versions_bumped_again_on_commit(self):
+        """a read that runs before the write commits can't leave old data cached under the new version"""
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.post.title = 'Edited'
+            self.post.save()
+            # a concurrent reader still sees the old row, and caches it
+            BlogPost.objects.filter(pk=self.post.pk).update(title='Cached')
+            self.client.get(self.detail_url)
+        BlogPost.objects.filter(pk=self.post.pk).update(title='Edited')
+        for callback in callbacks:
+            callback()
+        response = self.client.get(self.detail_url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['title'], 'Edited')
+
+    def test_replica_reads_of_recent_writes_not_stored(self):
+        """while a replica may lack a write, what it serves for the written data isn't cached"""
+        author_url = reverse('user-posts', kwargs={'username': 'cacheuser'})
+        with override_settings(DATABASE_READ_REPLICAS=['replica_1']), \
+                mock.patch('config.routers.ReplicaRoutingMiddleware.reads_from_replica', return_value=False), \
+                mock.patch('config.routers.reads_replica', return_value=True):
+            BlogPost.objects.filter(pk=self.post.pk).update(title='Edited')
+            response_cache.bump(response_cache.post_version(self.post.pk))
+            self.client.get(self.detail_url)
+            self.assertEqual(self.client.get(self.detail_url)['X-Cache'], 'MISS')
+            # other data is cached as usual
+            self.client.get(author_url)
+            self.assertEqual(self.client.get(author_url)['X-Cache'], 'HIT')
+
+    def test_cache_hit_answers_conditional_request(self):
+        etag = self.client.get(self.detail_url)['ETag']
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(len(queries), 0)
+
+    def test_hit_miss_stats(self):
+        before = response_cache.get_stats().get(('BlogPostDetailView', 'hit'), 0)
+        self.client.get(self.detail_url)
+        self.client.get(self.detail_url)
+        self.assertEqual(response_cache.get_stats()[('BlogPostDetailView', 'hit')], before + 1)
+
+
+class BlogPaginationTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='pageuser',
+            email='page@example.com',
+            password='PagePass123!'
+        )
+        published = timezone.now()
+        for i in range(7):
+            post = BlogPost.objects.create(title=f'Post {i}', content='Content', author=self.user)
+            # posts 3 and 4 share a timestamp to exercise the id tie-breaker
+            offset = min(i, 3) if i <= 4 else i - 1
+            BlogPost.objects.filter(pk=post.pk).update(published_date=published + timedelta(minutes=offset))
+        self.list_url = reverse('blog-list')
+        self.expected = list(
+            BlogPost.objects.order_by('-published_date', '-id').values_list('title', flat=True)
+        )
+
+    def test_first_page_limited_by_page_size(self):
+        response = self.client.get(self.list_url, {'page_size': 3})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([p['title'] for p in response.data['results']], self.expected[:3])
+        self.assertIsNotNone(response.data['next'])
+        self.assertIsNone(response.data['previous'])
+
+    def test_cursor_walks_forward_and_back(self):
+        """following next links visits every post once, previous links lead back"""
+        seen = []
+        pages = []
+        url = f'{self.list_url}?page_size=3'
+        while url:
+            response = self.client.get(url)
+            pages.append(response.data)
+            seen.extend(p['title'] for p in response.data['results'])
+            url = response.data['next']
+        self.assertEqual(seen, self.expected)
+        self.assertEqual(len(pages), 3)
+
+        response = self.client.get(pages[-1]['previous'])
+        self.assertEqual(response.data['results'], pages[-2]['results'])
+        response = self.client.get(response.data['previous'])
+        self.assertEqual(response.data['results'], pages[0]['results'])
+        self.assertIsNone(response.data['previous'])
+
+    def test_unpaginated_opt_in(self):
+        response = self.client.get(self.list_url, {'all': 'true'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([p['title'] for p in response.data], self.expected)
+
+    def test_invalid_cursor(self):
+        response = self.client.get(self.list_url, {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_user_posts_paginated(self):
+        url = reverse('user-posts', kwargs={'username': self.user.username})
+        response = self.client.get(url, {'page_size': 5})
+        self.assertEqual([p['title'] for p in response.data['results']], self.expected[:5])
+        response = self.client.get(response.data['next'])
+        self.assertEqual([p['title'] for p in response.data['results']], self.expected[5:])
+        self.assertIsNone(response.data['next'])
+
+
+class BlogQueryBudgetTestCase(QueryBudgetMixin, APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.authors = [
+            User.objects.create_user(username=f'author{i}', email=f'author{i}@example.com', password='AuthorPass123!')
+            for i in range(2)
+        ]
+        self.post = BlogPost.objects.create(title='First', content='Content', author=self.authors[0])
+
+    def add_posts(self):
+        for i in range(5):
+            author = User.objects.create_user(
+                username=f'extra{i}', email=f'extra{i}@example.com', password='ExtraPass123!'
+            )
+            BlogPost.objects.create(title=f'Extra {i}', content='Content', author=author)
+            BlogPost.objects.create(title=f'More {i}', content='Content', author=self.authors[0])
+
+    def test_list_query_budget(self):
+        url = reverse('blog-list')
+        self.assertQueryBudget(url)
+        self.assertConstantQueries(url, self.add_posts)
+        self.assertQueryBudget(f'{url}?all=true')
+
+    def test_user_posts_query_budget(self):
+        url = reverse('user-posts', kwargs={'username': self.authors[0].username})
+        self.assertQueryBudget(url)
+        self.assertConstantQueries(url, self.add_posts)
+
+    def test_detail_query_budget(self):
+        self.assertQueryBudget(reverse('blog-detail', kwargs={'pk': self.post.pk}))
+
+    def test_hot_queries_use_indexes(self):
+        self.post.tags = ['django']
+        self.post.save()
+        thread = self.post.comments.create(author=self.authors[1], content='Comment')
+        self.post.comments.create(author=self.authors[0], parent=thread, content='Reply')
+        self.add_posts()
+
+        out = StringIO()
+        call_command('explain_hot_queries', stdout=out)
+        self.assertIn('No full table scans', out.getvalue())
+
+    def test_explain_flags_full_scans(self):
+        with connection.cursor() as cursor:
+            _, scans = explain_hot_queries.EXPLAINERS[connection.vendor](
+                cursor, "SELECT id FROM blog_blogpost WHERE summary = 'unindexed'"
+            )
+        self.assertEqual(scans, ['blog_blogpost'])
+
+
+class BlogPostRenderCacheTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='renderuser',
+            email='render@example.com',
+            password='RenderPass123!'
+        )
+        self.post = BlogPost.objects.create(
+            title='Markdown Post',
+            content='# Heading\n\n**bold** <script>alert(1)</script>',
+            author=self.user
+        )
+
+    def test_content_html_rendered_on_save(self):
+        """saving a post stores sanitized HTML and the hash it was rendered from"""
+        self.assertIn('<h1 id="section-heading">Heading</h1>', self.post.content_html)
+        self.assertNotIn('<script>', self.post.content_html)
+        self.assertEqual(self.post.content_html_hash, rendering.content_digest(self.post.content))
+
+    def test_rendered_fields_stored_on_save(self):
+        """one rendering pass stores the excerpt, table of contents and reading stats"""
+        post = BlogPost.objects.create(
+            title='Long',
+            content='# Intro\n\nSome *text* here.\n\n## Details & more\n\n' + 'word ' * 400 + '\n\n# End',
+            author=self.user
+        )
+        self.assertTrue(post.excerpt.startswith('Intro Some text here. Details & more word'))
+        self.assertTrue(post.excerpt.endswith('…'))
+        self.assertLessEqual(len(post.excerpt), rendering.EXCERPT_LENGTH + 1)
+        self.assertEqual(post.toc, [
+            {'level': 1, 'id': 'section-intro', 'title': 'Intro', 'children': [
+                {'level': 2, 'id': 'section-details-more', 'title': 'Details & more', 'children': []},
+            ]},
+            {'level': 1, 'id': 'section-end', 'title': 'End', 'children': []},
+        ])
+        self.assertEqual(post.word_count, 408)
+        self.assertEqual(post.reading_time, 3)
+        self.assertIn('<h2 id="section-details-more">', post.content_html)
+
+    def test_reused_converter_is_reset_between_documents(self):
+        """heading ids and the toc of one document don't leak into the next"""
+        first = rendering.render_post('# Same\n\n## Only here')
+        second = rendering.render_post('# Same')
+        self.assertEqual(second.html, '<h1 id="section-same">Same</h1>')
+        self.assertEqual(second.toc, [{'level': 1, 'id': 'section-same', 'title': 'Same', 'children': []}])
+        self.assertEqual(rendering.render_post('# Same\n\n## Only here'), first)
+
+    def test_heading_ids_cannot_clobber_globals(self):
+        """every heading id is prefixed; raw HTML can't give an element an arbitrary id"""
+        rendered = rendering.render_post(
+            '# config\n\n<h2 id="location">Raw</h2>\n\n<h3 id="section-x">Prefixed</h3>\n\n<p id="config">p</p>'
+        )
+        self.assertIn('<h1 id="section-config">config</h1>', rendered.html)
+        self.assertIn('<h2>Raw</h2>', rendered.html)
+        self.assertIn('<h3 id="section-x">Prefixed</h3>', rendered.html)
+        self.assertIn('<p>p</p>', rendered.html)
+
+    def test_render_is_thread_safe(self):
+        """threads rendering at the same time get the same output as rendering one after another"""
+        documents = [f'# Post {n}\n\n' + f'*word* {n} ' * (50 * n) for n in range(1, 17)]
+        expected = [rendering.render_post(content) for content in documents]
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            self.assertEqual(list(executor.map(rendering.render_post, documents)), expected)
+
+    def test_chinese_words_counted_per_character(self):
+        rendered = rendering.render_post('这是中文 and English')
+        self.assertEqual(rendered.word_count, 6)
+        self.assertEqual(rendered.excerpt, '这是中文 and English')
+
+    def test_rendered_fields_served(self):
+        detail = self.client.get(reverse('blog-detail', kwargs={'pk': self.post.pk})).data
+        self.assertEqual(detail['excerpt'], 'Heading bold alert(1)')
+        self.assertEqual(detail['toc'], [{'level': 1, 'id': 'section-heading', 'title': 'Heading', 'children': []}])
+        self.assertEqual((detail['word_count'], detail['reading_time']), (3, 1))
+        listed = self.client.get(reverse('blog-list')).data['results'][0]
+        self.assertEqual((listed['excerpt'], listed['reading_time']), ('Heading bold alert(1)', 1))
+        self.assertNotIn('toc', listed)
+
+    def test_reads_serve_stored_rendering(self):
+        """reads never render: a stale rendering is served until render_posts rebuilds it"""
+        BlogPost.objects.filter(pk=self.post.pk).update(content_html='stored', content_html_hash='stale')
+        url = reverse('blog-detail', kwargs={'pk': self.post.pk})
+        with mock.patch.object(rendering, 'render_post') as render:
+            response = self.client.get(url)
+            self.client.get(reverse('blog-detail-async', kwargs={'pk': self.post.pk}))
+            self.client.get(reverse('blog-list'))
+        render.assert_not_called()
+        self.assertEqual(response.data['content_html'], 'stored')
+
+        call_command('render_posts', stdout=StringIO())
+        refreshed = self.client.get(url)
+        self.assertIn('<strong>bold</strong>', refreshed.data['content_html'])
+        self.assertNotEqual(refreshed['ETag'], response['ETag'])
+
+    def test_allow_list_change_invalidates_hash(self):
+        """changing the sanitizer allow-list changes the cache key"""
+        digest = rendering.content_digest(self.post.content)
+        with mock.patch.object(rendering, 'ALLOWED_TAGS', rendering.ALLOWED_TAGS + ['span']):
+            self.assertNotEqual(rendering.content_digest(self.post.content), digest)
+
+    def test_render_posts_command(self):
+        """render_posts pre-renders every post with a missing rendering"""
+        BlogPost.objects.filter(pk=self.post.pk).update(content_html='', content_html_hash='')
+        out = StringIO()
+        call_command('render_posts', stdout=out)
+        self.assertIn('Rendered 1 blog post(s)', out.getvalue())
+        self.post.refresh_from_db()
+        self.assertIn('<h1 id="section-heading">Heading</h1>', self.post.content_html)
+        self.assertEqual(self.post.word_count, 3)
+
+
+@override_settings(BLOG_PARALLEL_RENDER_THRESHOLD=4)
+class BlogParallelRenderTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(rendering.shutdown_pool)
+        self.documents = [
+            f'# Post {n}\n\n## Part\n\n' + f'Some **bold** text, a [link](https://example.com/{n}) '
+            f'and <script>alert({n})</script>.\n\n- one\n- two\n\n```\ncode {n}\n```\n' * n
+            for n in range(1, 13)
+        ]
+
+    def test_parallel_render_matches_serial(self):
+        serial = [rendering.render_post(content) for content in self.documents]
+        self.assertEqual(rendering.render_many(self.documents, workers=2), serial)
+        self.assertIsNotNone(rendering._pool)
+        self.assertEqual(rendering.render_many(self.documents, workers=1), serial)
+
+    def test_small_batches_render_serially(self):
+        with mock.patch.object(rendering, 'get_pool') as get_pool:
+            rendered = rendering.render_many(self.documents[:3], workers=2)
+        get_pool.assert_not_called()
+        self.assertEqual(rendered, [rendering.render_post(content) for content in self.documents[:3]])
+
+    def test_render_posts_in_parallel(self):
+        user = User.objects.create_user(username='paralleluser', email='parallel@example.com', password='Pass123!x')
+        posts = [BlogPost.objects.create(title=f'P{n}', content=content, author=user)
+                 for n, content in enumerate(self.documents)]
+        expected = {post.pk: [getattr(post, field) for field in BlogPost.RENDERED_FIELDS] for post in posts}
+        BlogPost.objects.update(content_html='', content_html_hash='', excerpt='', toc=[], word_count=0)
+
+        out = StringIO()
+        call_command('render_posts', workers=2, batch_size=6, stdout=out)
+        self.assertIn('Rendered 12 blog post(s)', out.getvalue())
+        for post in BlogPost.objects.all():
+            self.assertEqual([getattr(post, field) for field in BlogPost.RENDERED_FIELDS], expected[post.pk])
+
+
+class BlogSearchTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='searchuser',
+            email='search@example.com',
+            password='SearchPass123!'
+        )
+        self.django_post = BlogPost.objects.create(
+            title='Django performance',
+            content='Use **select_related** to avoid <b>N+1</b> queries in Django.',
+            author=self.user
+        )
+        self.react_post = BlogPost.objects.create(
+            title='React hooks',
+            content='Hooks are functions. Django is mentioned once.',
+            author=self.user
+        )
+        self.search_url = reverse('blog-search')
+
+    def test_search_ranks_and_highlights(self):
+        response = self.client.get(self.search_url, {'q': 'django'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.data['results']
+        # the title match outranks a single mention in the body
+        self.assertEqual([r['id'] for r in results], [self.django_post.id, self.react_post.id])
+        self.assertIn('<mark>Django</mark>', results[0]['snippet'])
+        # markup from the post body never reaches the snippet unescaped
+        self.assertNotIn('<b>', results[0]['snippet'])
+        self.assertNotIn('content', results[0])
+
+    def test_search_index_follows_edits_and_deletes(self):
+        self.react_post.content = 'Hooks are functions.'
+        self.react_post.save()
+        response = self.client.get(self.search_url, {'q': 'django'})
+        self.assertEqual([r['id'] for r in response.data['results']], [self.django_post.id])
+
+        self.django_post.delete()
+        response = self.client.get(self.search_url, {'q': 'django'})
+        self.assertEqual(response.data['results'], [])
+
+    def test_search_cursor_pagination(self):
+        for i in range(4):
+            BlogPost.objects.create(title=f'Django tip {i}', content='Django', author=self.user)
+        seen = []
+        pages = []
+        url = f'{self.search_url}?q=django&page_size=2'
+        while url:
+            response = self.client.get(url)
+            pages.append(response.data)
+            seen.extend(r['id'] for r in response.data['results'])
+            url = response.data['next']
+        self.assertEqual(len(seen), 6)
+        self.assertEqual(len(set(seen)), 6)
+        response = self.client.get(pages[1]['previous'])
+        self.assertEqual(response.data['results'], pages[0]['results'])
+
+    def test_search_requires_query(self):
+        response = self.client.get(self.search_url, {'q': '  '})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        # punctuation only queries are valid but match nothing
+        response = self.client.get(self.search_url, {'q': '"*'})
+        self.assertEqual(response.data['results'], [])
+
+
+class BlogBulkTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='bulkuser',
+            email='bulk@example.com',
+            password='BulkPass123!'
+        )
+        self.lines = [
+            json.dumps({'title': 'First', 'content': '# Heading', 'tags': ['Django', 'bulk']}),
+            '{not json',
+            json.dumps({'title': 'Second', 'content': 'Searchable body', 'tags': ['django']}),
+            json.dumps({'content': 'No title'}),
+            '',
+            json.dumps({'title': 'Third', 'content': 'Body'}),
+        ]
+
+    def import_body(self, lines):
+        return self.client.post(
+            reverse('blog-import'), '\n'.join(lines), content_type='application/x-ndjson'
+        )
+
+    @override_settings(BLOG_BULK_BATCH_SIZE=2)
+    def test_import_reports_invalid_lines_and_keeps_going(self):
+        self.client.force_authenticate(user=self.user)
+        response = self.import_body(self.lines)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['created'], 3)
+        self.assertEqual([error['line'] for error in response.data['errors']], [2, 4])
+        self.assertIn('title', response.data['errors'][1]['errors'])
+
+        posts = BlogPost.objects.order_by('id')
+        self.assertEqual([post.title for post in posts], ['First', 'Second', 'Third'])
+        self.assertTrue(all(post.author_id == self.user.id for post in posts))
+        # what save() and its signals would have done for each post
+        self.assertIn('<h1 id="section-heading">Heading</h1>', posts[0].content_html)
+        self.assertEqual(posts[0].toc[0]['title'], 'Heading')
+        self.assertEqual(dict(Tag.objects.values_list('name', 'post_count')), {'django': 2, 'bulk': 1})
+        response = self.client.get(reverse('blog-search'), {'q': 'searchable'})
+        self.assertEqual([r['title'] for r in response.data['results']], ['Second'])
+
+    def test_import_invalidates_cached_lists(self):
+        self.client.get(reverse('blog-list'))
+        self.client.force_authenticate(user=self.user)
+        self.import_body(self.lines)
+        response = self.client.get(reverse('blog-list'))
+        self.assertEqual(len(response.data['results']), 3)
+
+    def test_bulk_endpoints_require_authentication(self):
+        self.assertEqual(self.import_body(self.lines).status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(self.client.get(reverse('blog-export')).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_export_round_trips_through_import(self):
+        BlogPost.objects.create(title='One', content='Body one', tags=['a'], author=self.user)
+        BlogPost.objects.create(title='Two', content='Body two', author=self.user)
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(reverse('blog-export'))
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        rows = [json.loads(line) for line in lines]
+        self.assertEqual([row['title'] for row in rows], ['One', 'Two'])
+        self.assertEqual(rows[0]['author'], 'bulkuser')
+        self.assertNotIn('content_html', rows[0])
+
+        BlogPost.objects.all().delete()
+        self.assertEqual(self.import_body(lines).data['created'], 2)
+        self.assertEqual(
+            list(BlogPost.objects.order_by('id').values_list('title', 'content', 'tags')),
+            [('One', 'Body one', ['a']), ('Two', 'Body two', [])]
+        )
+
+    def test_database_errors_not_leaked(self):
+        with mock.patch('blog.bulk.create_posts', side_effect=DatabaseError('UNIQUE constraint failed: secret')), \
+                self.assertLogs('blog.bulk', 'ERROR'):
+            result = bulk.import_posts(self.lines, self.user)
+        self.assertEqual(result['created'], 0)
+        messages = {message for error in result['errors'] for message in error['errors'].get('non_field_errors', [])}
+        self.assertIn(bulk.BATCH_FAILED_ERROR, messages)
+        self.assertNotIn('secret', json.dumps(result))
+
+    def test_import_and_export_commands(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'posts.jsonl')
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write('\n'.join(self.lines))
+            out, err = StringIO(), StringIO()
+            call_command('import_posts', path, '--author', 'bulkuser', '--batch-size', '2',
+                         stdout=out, stderr=err)
+            self.assertIn('Imported 3 blog post(s), skipped 2 invalid line(s)', out.getvalue())
+            self.assertIn('line 2:', err.getvalue())
+
+        out = StringIO()
+        call_command('export_posts', '--author', 'bulkuser', '--chunk-size', '2', stdout=out, stderr=StringIO())
+        self.assertEqual([json.loads(line)['title'] for line in out.getvalue().splitlines()],
+                         ['First', 'Second', 'Third'])
+
+
+    def test_restore_keeps_authors_and_dates(self):
+        other = User.objects.create_user(username='other', email='other@example.com', password='OtherPass123!')
+        published = timezone.now() - timedelta(days=30)
+        BlogPost.objects.create(title='Old', content='Body', author=other)
+        BlogPost.objects.filter(title='Old').update(published_date=published)
+        out = StringIO()
+        call_command('export_posts', stdout=out, stderr=StringIO())
+        BlogPost.objects.all().delete()
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'posts.jsonl')
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(out.getvalue() + json.dumps({'title': 'Lost', 'content': 'Body', 'author': 'nobody'}) + '\n')
+            err = StringIO()
+            call_command('import_posts', path, '--restore', stdout=StringIO(), stderr=err)
+        post = BlogPost.objects.get()
+        self.assertEqual((post.title, post.author, post.published_date), ('Old', other, published))
+        self.assertIn("There is no user with the username 'nobody'", err.getvalue())
+
+    def test_ambiguous_author(self):
+        User.objects.create_user(username='bulkuser', email='twin@example.com', password='TwinPass123!')
+        with self.assertRaisesMessage(CommandError, 'Several users have the username bulkuser'):
+            call_command('import_posts', '-', '--author', 'bulkuser', stdout=StringIO())
+        with self.assertRaisesMessage(CommandError, '--author is required'):
+            call_command('import_posts', '-', stdout=StringIO())
+
+    @override_settings(BLOG_IMPORT_MAX_ERRORS=2)
+    def test_reported_errors_are_capped(self):
+        result = bulk.import_posts(['{not json'] * 5 + self.lines, self.user)
+        self.assertEqual((result['created'], result['skipped']), (3, 7))
+        self.assertEqual([error['line'] for error in result['errors']], [1, 2])
+
+@override_settings(RESPONSE_CACHE_ENABLED=False, BLOG_PAGE_SIZE=2)
+class BlogAsyncViewsTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='asyncuser', email='async@example.com', password='AsyncPass123!')
+        self.posts = [
+            BlogPost.objects.create(title=f'Post {i}', content=f'# Post {i}', tags=['a'] if i % 2 else [], author=self.user)
+            for i in range(5)
+        ]
+
+    def assertSameResponse(self, sync_url, async_url, **headers):
+        expected = self.client.get(sync_url, **headers)
+        response = self.client.get(async_url, **headers)
+        self.assertEqual(response.status_code, expected.status_code)
+        if expected.status_code == status.HTTP_304_NOT_MODIFIED:
+            return response
+        # links point at the endpoint that served the page
+        self.assertEqual(response.content.decode().replace('/async/', '/'), expected.content.decode())
+        return response
+
+    def test_async_list_matches_sync(self):
+        response = self.assertSameResponse(reverse('blog-list'), reverse('blog-list-async'))
+        self.assertSameResponse(response.json()['next'].replace('/async/', '/'), response.json()['next'])
+        self.assertSameResponse(f"{reverse('blog-list')}?all=true", f"{reverse('blog-list-async')}?all=true")
+        self.assertSameResponse(
+            f"{reverse('blog-list')}?tags=a&fields=id,title", f"{reverse('blog-list-async')}?tags=a&fields=id,title"
+        )
+
+    def test_async_user_posts_matches_sync(self):
+        self.assertSameResponse(
+            reverse('user-posts', args=['asyncuser']), reverse('user-posts-async', args=['asyncuser'])
+        )
+
+    def test_async_detail_matches_sync(self):
+        pk = self.posts[0].pk
+        response = self.assertSameResponse(reverse('blog-detail', args=[pk]), reverse('blog-detail-async', args=[pk]))
+        self.assertIn('<h1 id="section-post-0">Post 0</h1>', response.json()['content_html'])
+        response = self.client.get(reverse('blog-detail-async', args=[pk]), HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_async_errors_match_sync(self):
+        self.assertSameResponse(reverse('blog-detail', args=[999]), reverse('blog-detail-async', args=[999]))
+        self.assertSameResponse(f"{reverse('blog-list')}?cursor=bad", f"{reverse('blog-list-async')}?cursor=bad")
+        self.assertSameResponse(f"{reverse('blog-list')}?fields=nope", f"{reverse('blog-list-async')}?fields=nope")
+        self.assertSameResponse(
+            f"{reverse('blog-list')}?tags=a&tag_match=x", f"{reverse('blog-list-async')}?tags=a&tag_match=x"
+        )
+        response = self.client.post(reverse('blog-list-async'), {})
+        self.assertEqual(response.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+
+
+class BlogRelatedPostsTestCase(QueryBudgetMixin, APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='relater', email='relater@example.com', password='RelPass123!')
+        self.posts = {
+            name: BlogPost.objects.create(title=name, content='Body', tags=tags, author=self.user)
+            for name, tags in [
+                ('a', ['python', 'django', 'web']),
+                ('b', ['python', 'django']),
+                ('c', ['python']),
+                ('d', ['rust']),
+                ('e', ['web']),
+            ]
+        }
+
+    def related(self, name, **params):
+        response = self.client.get(reverse('blog-related', args=[self.posts[name].pk]), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [post['title'] for post in response.data]
+
+    def test_ranked_by_weighted_shared_tags(self):
+        # b shares two tags; 'web' (2 posts) outweighs 'python' (3 posts)
+        self.assertEqual(self.related('a'), ['b', 'e', 'c'])
+        self.assertEqual(self.related('c'), ['b', 'a'])
+        self.assertEqual(self.related('d'), [])
+
+    def test_list_representation(self):
+        response = self.client.get(reverse('blog-related', args=[self.posts['b'].pk]), {'fields': 'id,title,author'})
+        self.assertEqual(response.data[0], {'id': self.posts['a'].pk, 'title': 'a', 'author': 'relater'})
+
+    def test_unknown_post(self):
+        response = self.client.get(reverse('blog-related', args=[0]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_tag_changes_update_neighbours(self):
+        post = self.posts['c']
+        post.tags = ['rust']
+        post.save()
+        self.assertEqual(self.related('a'), ['b', 'e'])
+        self.assertEqual(self.related('d'), ['c'])
+        self.assertEqual(self.related('c'), ['d'])
+
+    def test_edits_leave_index_alone(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.posts['a'].save(update_fields=['title'])
+            self.posts['a'].save()
+        self.assertFalse([q for q in queries.captured_queries if 'blog_relatedpost' in q['sql']])
+
+    @override_settings(BLOG_RELATED_POSTS=1)
+    def test_lists_are_refilled(self):
+        call_command('rebuild_related_posts', stdout=StringIO())
+        self.assertEqual(self.related('a'), ['b'])
+        self.posts['b'].delete()
+        self.assertEqual(self.related('a'), ['e'])
+        # a leaves c's list, which has nothing left to fill it with
+        post = self.posts['a']
+        post.tags = ['web']
+        post.save()
+        self.assertEqual(self.related('c'), [])
+        self.assertEqual(self.related('e'), ['a'])
+
+    def test_rebuild_command(self):
+        expected = {name: self.related(name) for name in self.posts}
+        RelatedPost.objects.all().delete()
+        out = StringIO()
+        call_command('rebuild_related_posts', stdout=out)
+        self.assertIn('Indexed the related posts of 4 blog post(s)', out.getvalue())
+        self.assertEqual({name: self.related(name) for name in self.posts}, expected)
+
+    def test_imported_posts_are_indexed(self):
+        self.client.force_authenticate(user=self.user)
+        body = json.dumps({'title': 'imported', 'content': 'Body', 'tags': ['Rust']})
+        response = self.client.post(reverse('blog-import'), body, content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.related('d'), ['imported'])
+
+    def test_bulk_created_posts_indexed_in_constant_queries(self):
+        def import_batch(start, count):
+            posts = [
+                BlogPost(title=f'bulk {n}', content='Body', tags=[['python', 'web'], ['rust'], ['django', f'n{n}']][n % 3],
+                         author=self.user)
+                for n in range(start, start + count)
+            ]
+            with CaptureQueriesContext(connection) as queries:
+                bulk.create_posts(posts)
+            return len([q for q in queries.captured_queries if 'blog_relatedpost' in q['sql']])
+
+        def lists(post_ids):
+            rows = RelatedPost.objects.filter(post_id__in=post_ids).order_by('post_id', '-score', '-related_id')
+            return {post_id: [row.related_id for row in rows if row.post_id == post_id] for post_id in post_ids}
+
+        # the index costs the same few queries for a batch of any size
+        self.assertEqual(import_batch(0, 5), import_batch(5, 40))
+        # the second batch fills d's list (rust) behind the first, scored while 'rust' was rarer
+        self.assertEqual(self.related('d'), ['bulk 4', 'bulk 1', 'bulk 43', 'bulk 40', 'bulk 37'])
+        # the second batch's own lists are scored like a rebuild would
+        new_ids = list(BlogPost.objects.order_by('-pk').values_list('pk', flat=True)[:40])
+        indexed = lists(new_ids)
+        call_command('rebuild_related_posts', stdout=StringIO())
+        self.assertEqual(lists(new_ids), indexed)
+
+    def test_query_budget(self):
+        url = reverse('blog-related', args=[self.posts['a'].pk])
+        self.assertQueryBudget(url)
+        self.assertQueryBudget(reverse('blog-related', args=[self.posts['d'].pk]))
+
+        def add_rows():
+            other = User.objects.create_user(username='other', email='other@example.com', password='OtherPass123!')
+            BlogPost.objects.create(title='f', content='Body', tags=['web', 'django'], author=other)
+        self.assertConstantQueries(url, add_rows)
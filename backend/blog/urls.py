@@ -1,13 +1,28 @@
 from django.urls import path
+from .async_views import AsyncBlogPostListView, AsyncBlogPostDetailView, AsyncUserBlogPostsView
 from .views import (
     BlogPostListView,
     BlogPostDetailView,
-    UserBlogPostsView
+    RelatedPostsView,
+    UserBlogPostsView,
+    TagListView,
+    BlogPostSearchView,
+    BlogPostImportView,
+    BlogPostExportView
 )
 
 urlpatterns = [
     path('posts/', BlogPostListView.as_view(), name='blog-list'),
+    path('posts/import/', BlogPostImportView.as_view(), name='blog-import'),
+    path('posts/export/', BlogPostExportView.as_view(), name='blog-export'),
     path('posts/<int:pk>/', BlogPostDetailView.as_view(), name='blog-detail'),
+    path('posts/<int:pk>/related/', RelatedPostsView.as_view(), name='blog-related'),
     # allows users to view all posts by a specific user
     path('user/<str:username>/posts/', UserBlogPostsView.as_view(), name='user-posts'),
+    # async-native read paths (see blog.async_api), which skip the thread hop sync views need under ASGI
+    path('async/posts/', AsyncBlogPostListView.as_view(), name='blog-list-async'),
+    path('async/posts/<int:pk>/', AsyncBlogPostDetailView.as_view(), name='blog-detail-async'),
+    path('async/user/<str:username>/posts/', AsyncUserBlogPostsView.as_view(), name='user-posts-async'),
+    path('tags/', TagListView.as_view(), name='tag-list'),
+    path('search/', BlogPostSearchView.as_view(), name='blog-search'),
 ]
\ No newline at end of file
@@ -1,11 +1,48 @@
+from operator import attrgetter
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from rest_framework.permissions import IsAuthenticatedOrReadOnly
+from rest_framework.permissions import IsAuthenticated, IsAuthenticatedOrReadOnly
 from rest_framework import permissions
+from django.db import transaction
+from django.http import Http404, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
-from .models import BlogPost
-from .serializers import BlogPostSerializer
+from .models import BlogPost, RelatedPost, Tag
+from .serializers import BlogPostSerializer, BlogPostListSerializer, TagSerializer
+from . import bulk, conditional, response_cache, search, tags
+from .pagination import KeysetPagination, SearchPagination
+
+# the columns whose values change whenever a post's detail representation does
+POST_VERSION_FIELDS = ('updated_date', 'comment_count', 'last_comment_at', 'content_html_hash', 'author__username')
+
+def post_validators(pk, updated_date, comment_count, last_comment_at, content_html_hash, author_username):
+    """
+    Return the (ETag, Last-Modified) pair of a post's detail representation.
+    The rendering hash is part of the ETag because re-rendering (render_posts) changes the rendered fields,
+    and so is the author's username, which changes without touching the post.
+    """
+    etag = conditional.make_etag(
+        'post', pk, updated_date.isoformat(), comment_count,
+        last_comment_at.isoformat() if last_comment_at else '',
+        content_html_hash, author_username
+    )
+    return etag, max(updated_date, last_comment_at or updated_date)
+
+def post_versions(post):
+    return [attrgetter(field.replace('__', '.'))(post) for field in POST_VERSION_FIELDS]
+
+def filter_posts_by_tags(request, posts):
+    """
+    Apply the `?tags=` filter. Returns the filtered posts and the errors in the query parameters, if any.
+    """
+    tag_names = tags.parse_tags_param(request.query_params.get('tags'))
+    if tag_names:
+        # ?tag_match=all (default) requires every tag, ?tag_match=any requires at least one
+        match = request.query_params.get('tag_match', tags.MATCH_ALL)
+        if match not in (tags.MATCH_ALL, tags.MATCH_ANY):
+            return posts, {'tag_match': f"Must be '{tags.MATCH_ALL}' or '{tags.MATCH_ANY}'"}
+        posts = tags.filter_by_tags(posts, tag_names, match)
+    return posts, None
 
 class IsAuthorOrReadOnly(permissions.BasePermission):
     """
@@ -15,21 +52,45 @@ class IsAuthorOrReadOnly(permissions.BasePermission):
     def has_object_permission(self, request, view, obj):
         if request.method in permissions.SAFE_METHODS:
             return True
-        return obj.author == request.user
+        return obj.author_id == request.user.id
+
+class BlogPostListMixin:
+    """
+    Shared listing logic for the post list endpoints:
+    compact serialization with optional `?fields=` and keyset pagination.
+    """
+    pagination_class = KeysetPagination
+
+    def get_list_queryset(self, request, posts):
+        """
+        Return the `?fields=` selection and the posts queryset narrowed down to the columns it needs
+        """
+        fields = BlogPostListSerializer.parse_fields(request.query_params.get('fields'))
+        model_fields, related = BlogPostListSerializer(fields=fields).get_model_fields()
+        # the pagination cursor is built from these, so always load them
+        model_fields.update(field.lstrip('-') for field in self.pagination_class.ordering)
+        return fields, posts.select_related(*related).only(*model_fields)
 
-class BlogPostListView(APIView):
+    def list_posts(self, request, posts):
+        fields, posts = self.get_list_queryset(request, posts)
+        paginator = self.pagination_class()
+        page = paginator.paginate_queryset(posts, request, view=self)
+        if page is None:
+            # the client explicitly asked for every post with ?all=true
+            serializer = BlogPostListSerializer(posts, many=True, fields=fields)
+            return Response(serializer.data)
+        serializer = BlogPostListSerializer(page, many=True, fields=fields)
+        return paginator.get_paginated_response(serializer.data)
+
+class BlogPostListView(BlogPostListMixin, APIView):
     permission_classes = [IsAuthenticatedOrReadOnly]
 
+    @response_cache.cache_response(lambda request: [response_cache.post_list_version()])
     def get(self, request):
-        posts = BlogPost.objects.all().order_by('-published_date')
-        tags = request.query_params.get('tags')
-        # TODO: Implement filtering by tags after change DB to AWS PostgreSQL
-        # if tags:
-        #     tag_list = tags.split(',')
-        #     posts = posts.filter(tags__contains=tag_list)
-            
-        serializer = BlogPostSerializer(posts, many=True)
-        return Response(serializer.data)
+        posts, errors = filter_posts_by_tags(request, BlogPost.objects.all().order_by('-published_date', '-id'))
+        if errors:
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+        return self.list_posts(request, posts)
 
     def post(self, request):
         serializer = BlogPostSerializer(data=request.data, context={'request': request})
@@ -42,21 +103,41 @@ class BlogPostDetailView(APIView):
     permission_classes = [IsAuthenticatedOrReadOnly, IsAuthorOrReadOnly]
 
     def get_object(self, pk):
-        return get_object_or_404(BlogPost, pk=pk)
+        return get_object_or_404(BlogPost.objects.select_related('author'), pk=pk)
 
+    @response_cache.cache_response(lambda request, pk: [response_cache.post_version(pk)])
     def get(self, request, pk):
+        if conditional.has_preconditions(request):
+            # answer revalidations from a few version columns, without loading or serializing the post
+            versions = BlogPost.objects.filter(pk=pk).values_list(*POST_VERSION_FIELDS).first()
+            if versions is None:
+                raise Http404
+            response = conditional.evaluate_preconditions(request, *post_validators(pk, *versions))
+            if response is not None:
+                return response
+
         post = self.get_object(pk)
         serializer = BlogPostSerializer(post)
-        return Response(serializer.data)
+        return conditional.set_validators(Response(serializer.data), *post_validators(post.pk, *post_versions(post)))
 
+    @transaction.atomic
     def put(self, request, pk):
-        post = self.get_object(pk)
+        # lock the row so a concurrent editor can't slip in between the If-Match check and the save
+        post = get_object_or_404(
+            BlogPost.objects.select_related('author').select_for_update(of=('self',)),
+            pk=pk
+        )
         self.check_object_permissions(request, post)
-        
+        response = conditional.require_if_match(request) or conditional.evaluate_preconditions(
+            request, *post_validators(post.pk, *post_versions(post))
+        )
+        if response is not None:
+            return response
+
         serializer = BlogPostSerializer(post, data=request.data, context={'request': request})
         if serializer.is_valid():
             serializer.save()
-            return Response(serializer.data)
+            return conditional.set_validators(Response(serializer.data), *post_validators(post.pk, *post_versions(post)))
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
     def delete(self, request, pk):
@@ -66,8 +147,96 @@ class BlogPostDetailView(APIView):
         post.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
-class UserBlogPostsView(APIView):
+class RelatedPostsView(APIView):
+    """
+    The posts most related to a post by their shared tags, best first: /blog/posts/<pk>/related/
+    Served from the precomputed index (see blog.related), so it costs one query for K rows.
+    Takes `?fields=` like the post listings.
+    """
+    def get(self, request, pk):
+        fields = BlogPostListSerializer.parse_fields(request.query_params.get('fields'))
+        model_fields, relations = BlogPostListSerializer(fields=fields).get_model_fields()
+        links = (
+            RelatedPost.objects.filter(post_id=pk)
+            .select_related('related', *(f'related__{relation}' for relation in relations))
+            .only('related', *(f'related__{field}' for field in model_fields))
+            .order_by('-score', '-related_id')
+        )
+        posts = [link.related for link in links]
+        if not posts and not BlogPost.objects.filter(pk=pk).exists():
+            raise Http404
+        return Response(BlogPostListSerializer(posts, many=True, fields=fields).data)
+
+class UserBlogPostsView(BlogPostListMixin, APIView):
+    @response_cache.cache_response(lambda request, username: [response_cache.author_version(username)])
     def get(self, request, username):
-        posts = BlogPost.objects.filter(author__username=username).order_by('-published_date')
-        serializer = BlogPostSerializer(posts, many=True)
-        return Response(serializer.data)
\ No newline at end of file
+        posts = BlogPost.objects.filter(author__username=username).order_by('-published_date', '-id')
+        return self.list_posts(request, posts)
+
+class TagListView(APIView):
+    """
+    Lists tags in use with the number of posts carrying each, most used first.
+    Counts come from the maintained Tag.post_count counter, not from scanning posts.
+    """
+    def get(self, request):
+        tag_list = Tag.objects.filter(post_count__gt=0).order_by('-post_count', 'name')
+        serializer = TagSerializer(tag_list, many=True)
+        return Response(serializer.data)
+
+class BlogPostSearchView(APIView):
+    """
+    Full-text search over post titles and bodies: /blog/search/?q=...
+    Results are ranked best match first, each with an HTML-safe `snippet`
+    in which matched terms are wrapped in <mark>, and paginated with opaque cursors.
+    """
+    pagination_class = SearchPagination
+
+    def get(self, request):
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response({'q': 'A search query is required'}, status=status.HTTP_400_BAD_REQUEST)
+
+        paginator = self.pagination_class()
+        hits = paginator.paginate_search(search.search_posts, query, request)
+
+        model_fields, related = BlogPostListSerializer().get_model_fields()
+        posts = BlogPost.objects.select_related(*related).only(*model_fields).in_bulk([hit.id for hit in hits])
+        # the index is updated in the same transaction as the posts, but skip any stray entry
+        hits = [hit for hit in hits if hit.id in posts]
+        serializer = BlogPostListSerializer([posts[hit.id] for hit in hits], many=True)
+        results = []
+        for hit, data in zip(hits, serializer.data):
+            data['rank'] = hit.rank
+            data['snippet'] = search.highlight(hit.snippet)
+            results.append(data)
+        return paginator.get_paginated_response(results)
+
+class BlogPostImportView(APIView):
+    """
+    Bulk-create posts from a JSONL (NDJSON) request body, one post per line,
+    all authored by the requesting user. The body is read and inserted a batch at a time;
+    invalid lines are skipped, counted and (the first BLOG_IMPORT_MAX_ERRORS) reported by
+    line number in the response.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        # iterate the raw request stream rather than request.data, which would read the whole body
+        result = bulk.import_posts(request._request, author=request.user)
+        return Response(result, status=status.HTTP_201_CREATED if result['created'] else status.HTTP_200_OK)
+
+class BlogPostExportView(APIView):
+    """
+    Stream every post (or one author's with ?author=<username>) as JSONL, in id order,
+    in the format the import endpoint reads back.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        posts = BlogPost.objects.all()
+        author = request.query_params.get('author')
+        if author:
+            posts = posts.filter(author__username=author)
+        response = StreamingHttpResponse(bulk.export_posts(posts), content_type=bulk.JSONL_CONTENT_TYPE)
+        response['Content-Disposition'] = 'attachment; filename="posts.jsonl"'
+        return response
@@ -0,0 +1,59 @@
+from django.http import Http404
+from blog.async_api import AsyncAPIView, evaluate, json_response, not_found
+from blog.models import BlogPost
+from .models import Comment
+from .serializers import CommentSerializer, ThreadedCommentSerializer
+from .views import (
+    COMMENT_LIST_STATS,
+    CommentPagination,
+    attach_replies,
+    comment_list_queryset,
+    comment_list_validators,
+    post_id_param,
+    replies_queryset,
+    reply_limit,
+)
+from blog import conditional
+
+
+class AsyncCommentListView(AsyncAPIView):
+    """Async counterpart of CommentListView.get"""
+    pagination_class = CommentPagination
+
+    async def get(self, request):
+        post_id = post_id_param(request)
+        if not post_id:
+            return json_response({'error': 'post_id is required'}, status=400)
+        if not isinstance(post_id, int):
+            raise Http404
+
+        stats = await BlogPost.objects.filter(id=post_id).aaggregate(**COMMENT_LIST_STATS)
+        if not stats['exists']:
+            raise Http404
+        etag, last_modified = comment_list_validators(post_id, stats['count'], stats['last_updated'])
+        response = conditional.evaluate_preconditions(request, etag, last_modified)
+        if response is not None:
+            return response
+
+        comments, serializer_class = comment_list_queryset(request, post_id)
+        paginator = self.pagination_class()
+        page = paginator.get_page_queryset(comments, request)
+        rows = await evaluate(comments) if page is None else paginator.build_page(await evaluate(page))
+        if serializer_class is ThreadedCommentSerializer:
+            limit = reply_limit(request)
+            attach_replies(rows, await evaluate(replies_queryset(rows, limit)), limit)
+        data = serializer_class(rows, many=True).data
+        response = json_response(data if page is None else paginator.get_paginated_data(data))
+        return conditional.set_validators(response, etag, last_modified)
+
+
+class AsyncCommentDetailView(AsyncAPIView):
+    """Async counterpart of CommentDetailView.get"""
+
+    async def get(self, request, pk):
+        comments = Comment.objects.select_related('author', 'post').defer('post__content', 'post__content_html', 'post__excerpt', 'post__toc')
+        try:
+            comment = await comments.aget(pk=pk)
+        except Comment.DoesNotExist:
+            raise not_found(Comment)
+        return json_response(CommentSerializer(comment).data)
@@ -0,0 +1,77 @@
+"""
+Maintenance of the denormalized BlogPost.comment_count and last_comment_at columns.
+
+Updates use F() expressions and subqueries so they are atomic at the database level
+and never read-modify-write the counters in Python.
+"""
+
+from django.db.models import Count, F, Max, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce, Greatest
+from blog import response_cache
+from blog.models import BlogPost
+from .models import Comment
+
+
+def _latest_comment(post_ref):
+    return Subquery(
+        Comment.objects.filter(post=post_ref).order_by('-created_date').values('created_date')[:1]
+    )
+
+
+def _comment_count(post_ref):
+    return Coalesce(
+        Subquery(Comment.objects.filter(post=post_ref).values('post').annotate(n=Count('id')).values('n')),
+        0
+    )
+
+
+def comment_added(comment):
+    """Count a newly created comment on its post"""
+    BlogPost.objects.filter(pk=comment.post_id).update(
+        comment_count=F('comment_count') + 1,
+        last_comment_at=comment.created_date
+    )
+    invalidate_posts([comment.post_id])
+
+
+def comments_removed(post_id, count):
+    """Discount `count` deleted comments from a post and recompute its latest comment time"""
+    BlogPost.objects.filter(pk=post_id).update(
+        # never below zero, even if the counter had drifted low (reconcile_comment_counts fixes it)
+        comment_count=Greatest(F('comment_count') - count, 0),
+        last_comment_at=_latest_comment(OuterRef('pk'))
+    )
+    invalidate_posts([post_id])
+
+
+def drifted_posts():
+    """Posts whose stored comment stats disagree with their comments"""
+    return BlogPost.objects.annotate(
+        actual_count=Count('comments'),
+        actual_last=Max('comments__created_date')
+    ).filter(
+        ~Q(comment_count=F('actual_count'))
+        | Q(last_comment_at__isnull=True, actual_last__isnull=False)
+        | Q(last_comment_at__isnull=False, actual_last__isnull=True)
+        | ~Q(last_comment_at=F('actual_last'))
+    )
+
+
+def recount(post_ids):
+    """Recompute the comment stats of the given posts from scratch"""
+    post_ids = list(post_ids)
+    BlogPost.objects.filter(pk__in=post_ids).update(
+        comment_count=_comment_count(OuterRef('pk')),
+        last_comment_at=_latest_comment(OuterRef('pk'))
+    )
+    invalidate_posts(post_ids)
+
+
+def invalidate_posts(post_ids):
+    """The stats are part of the post list and detail responses, so drop their cached copies"""
+    authors = BlogPost.objects.filter(pk__in=post_ids).values_list('author__username', flat=True).distinct()
+    response_cache.bump(
+        response_cache.post_list_version(),
+        *(response_cache.post_version(pk) for pk in post_ids),
+        *(response_cache.author_version(username) for username in authors),
+    )
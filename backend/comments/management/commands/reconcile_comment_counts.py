@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from comments import counters
+
+
+class Command(BaseCommand):
+    help = 'Recompute BlogPost.comment_count and last_comment_at for posts whose stored values have drifted'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report the posts that have drifted'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Number of posts to fix per UPDATE'
+        )
+
+    def handle(self, *args, **options):
+        drifted = list(counters.drifted_posts().values_list('id', flat=True))
+        if options['dry_run']:
+            self.stdout.write(f'{len(drifted)} blog post(s) have drifted comment counts')
+            return
+
+        batch_size = options['batch_size']
+        for start in range(0, len(drifted), batch_size):
+            counters.recount(drifted[start:start + batch_size])
+        self.stdout.write(self.style.SUCCESS(f'Reconciled {len(drifted)} blog post(s)'))
@@ -0,0 +1,26 @@
+from django.db import migrations
+from django.db.models import Count, Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_comment_stats(apps, schema_editor):
+    """Fill BlogPost.comment_count and last_comment_at from the existing comments"""
+    BlogPost = apps.get_model("blog", "BlogPost")
+    Comment = apps.get_model("comments", "Comment")
+    per_post = Comment.objects.filter(post=OuterRef("pk")).values("post")
+    BlogPost.objects.update(
+        comment_count=Coalesce(Subquery(per_post.annotate(n=Count("id")).values("n")), 0),
+        last_comment_at=Subquery(per_post.annotate(last=Max("created_date")).values("last")),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0006_blogpost_comment_stats"),
+        ("comments", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_comment_stats, migrations.RunPython.noop),
+    ]
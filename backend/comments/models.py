@@ -3,11 +3,18 @@ from django.conf import settings
 from blog.models import BlogPost  # Make sure this import path matches your BlogPost location
 
 
+# width of one zero-padded id in a materialized path, so paths sort like the tree
+PATH_STEP = 10
+
+
 class Comment(models.Model):
     """
     Comment model for blog posts.
     Each comment is associated with a blog post and an author (user).
     Comments are ordered by creation date in ascending order (oldest first).
+    Replies point at their parent and at the top-level comment of their thread (root),
+    and carry a materialized path of zero-padded ids so a thread can be read in order
+    with a single indexed range scan.
     """
     post = models.ForeignKey(
         BlogPost, 
@@ -20,6 +27,24 @@ class Comment(models.Model):
         on_delete=models.CASCADE,
         related_name='blog_comments'
     )
+    parent = models.ForeignKey(
+        'self',
+        null=True,
+        blank=True,
+        on_delete=models.CASCADE,
+        related_name='replies',
+        help_text='The comment this one replies to, if any'
+    )
+    root = models.ForeignKey(
+        'self',
+        null=True,
+        blank=True,
+        on_delete=models.CASCADE,
+        related_name='thread',
+        help_text='The top-level comment of the thread, if this is a reply'
+    )
+    depth = models.PositiveSmallIntegerField(default=0)
+    path = models.CharField(max_length=255, blank=True, editable=False)
     content = models.TextField()
     created_date = models.DateTimeField(auto_now_add=True)
     updated_date = models.DateTimeField(auto_now=True)
@@ -28,6 +53,25 @@ class Comment(models.Model):
         ordering = ['created_date']
         verbose_name = 'comment'
         verbose_name_plural = 'comments'
+        indexes = [
+            # flat listing of a post's comments, oldest first
+            models.Index(fields=['post', 'created_date', 'id'], name='comment_post_created_idx'),
+            # top-level comments of a post (depth 0)
+            models.Index(fields=['post', 'depth', 'created_date', 'id'], name='comment_post_depth_idx'),
+            # replies of a thread in tree order
+            models.Index(fields=['root', 'path'], name='comment_root_path_idx'),
+        ]
 
     def __str__(self):
-        return f'Comment by {self.author.username} on {self.post.title}'
\ No newline at end of file
+        return f'Comment by {self.author.username} on {self.post.title}'
+
+    def save(self, *args, **kwargs):
+        if self.parent_id and self._state.adding:
+            self.root_id = self.parent.root_id or self.parent_id
+            self.depth = self.parent.depth + 1
+        super().save(*args, **kwargs)
+        if not self.path:
+            # the path ends with this comment's own id, so it can only be built after the insert
+            segment = str(self.pk).zfill(PATH_STEP)
+            self.path = f'{self.parent.path}/{segment}' if self.parent_id else segment
+            Comment.objects.filter(pk=self.pk).update(path=self.path)
\ No newline at end of file
@@ -0,0 +1,82 @@
+"""
+Set-wise moderation of comments: permission checks and deletes that cost a few queries
+per BATCH_SIZE comments, rather than one per comment, however many they touch.
+"""
+
+from django.db import connections, router, transaction
+from django.db.models import BooleanField, ExpressionWrapper, Q
+from blog import response_cache
+from .models import Comment
+from . import counters
+
+# ids per IN (...) list, under SQLite's parameter limit; lists never grow into nested expressions
+BATCH_SIZE = 500
+
+
+def batches(items, size=BATCH_SIZE):
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def with_delete_permission(comments, user):
+    """
+    Annotate each comment with `can_delete`: the user wrote it or wrote the post it is on,
+    the same rule as deleting a single comment.
+    """
+    return comments.annotate(can_delete=ExpressionWrapper(
+        Q(author_id=user.id) | Q(post__author_id=user.id),
+        output_field=BooleanField()
+    ))
+
+
+def ancestor_paths(path):
+    """The paths of the comments above the one at `path`"""
+    segments = path.split('/')
+    return ['/'.join(segments[:length]) for length in range(1, len(segments))]
+
+
+def subtree_rows(comments):
+    """
+    Lock and return the (id, post id) rows of the given (id, depth, path) comments and every
+    reply below them. Each thread they are in is read once through root_id, and a row belongs
+    to the subtrees when its path, or the path of one of its ancestors, is a selected one,
+    so selected comments below other selected comments cost nothing extra.
+    """
+    paths = {path for _, _, path in comments}
+    # the first segment of a path is the id of the thread's top-level comment
+    thread_ids = {int(path.split('/')[0]) for path in paths}
+    rows = []
+    for batch in batches(sorted(thread_ids)):
+        # lock the rows so a reply can't be attached to a comment between selecting and deleting it
+        threads = Comment.objects.select_for_update().filter(Q(id__in=batch) | Q(root_id__in=batch))
+        rows.extend(
+            (pk, post_id) for pk, post_id, path in threads.values_list('id', 'post_id', 'path')
+            if path in paths or not paths.isdisjoint(ancestor_paths(path))
+        )
+    return rows
+
+
+def delete_comments(comments):
+    """
+    Delete the given (id, depth, path) comments and their replies, BATCH_SIZE rows per DELETE,
+    and bring the affected posts' comment stats up to date in the same transaction.
+    Returns the ids of every deleted comment.
+    """
+    with transaction.atomic():
+        affected = subtree_rows(comments)
+        if not affected:
+            return []
+        ids = [pk for pk, _ in affected]
+        post_ids = {post_id for _, post_id in affected}
+        # A plain DELETE: the whole subtree is in `ids`, so nothing is left for Django's cascade
+        # to do, and QuerySet.delete() would load every row to send its post_delete signal.
+        # That signal's side effects (the stats and the cached lists) are applied below instead.
+        connection = connections[router.db_for_write(Comment)]
+        table = connection.ops.quote_name(Comment._meta.db_table)
+        with connection.cursor() as cursor:
+            for batch in batches(ids):
+                cursor.execute(f'DELETE FROM {table} WHERE id IN ({", ".join(["%s"] * len(batch))})', batch)
+        counters.recount(post_ids)
+        response_cache.bump(*(response_cache.comments_version(post_id) for post_id in post_ids))
+    return sorted(ids)
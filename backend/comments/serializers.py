@@ -1,8 +1,10 @@
+from django.conf import settings
 from rest_framework import serializers
+from config.metrics import TimedSerializerMixin
 from .models import Comment
 from blog.models import BlogPost
 
-class CommentSerializer(serializers.ModelSerializer):
+class CommentSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """
     Serializer for Comment model.
     Used for both reading and creating comments.
@@ -12,6 +14,11 @@ class CommentSerializer(serializers.ModelSerializer):
     author_id = serializers.IntegerField(source='author.id', read_only=True)
     post_id = serializers.IntegerField(write_only=True)
     post = serializers.PrimaryKeyRelatedField(read_only=True)
+    parent = serializers.PrimaryKeyRelatedField(
+        queryset=Comment.objects.only('id', 'post_id', 'root_id', 'depth', 'path'),
+        required=False,
+        allow_null=True
+    )
 
     class Meta:
         model = Comment
@@ -19,13 +26,15 @@ class CommentSerializer(serializers.ModelSerializer):
             'id', 
             'post',
             'post_id',
+            'parent',
+            'depth',
             'author_id',
             'author_username', 
             'content', 
             'created_date', 
             'updated_date'
         ]
-        read_only_fields = ['author_id', 'author_username', 'created_date', 'updated_date', 'post']
+        read_only_fields = ['author_id', 'author_username', 'created_date', 'updated_date', 'post', 'depth']
 
     def get_author_username(self, obj):
         """Get the username of the comment author"""
@@ -35,18 +44,78 @@ class CommentSerializer(serializers.ModelSerializer):
         """
         Validate that the post exists
         """
-        try:
-            BlogPost.objects.get(id=value)
-            return value
-        except BlogPost.DoesNotExist:
+        if not BlogPost.objects.filter(id=value).exists():
             raise serializers.ValidationError("Blog post does not exist")
+        return value
+
+    def validate(self, attrs):
+        """
+        Validate that a reply's parent is on the same post and the thread isn't nested too deeply
+        """
+        parent = attrs.get('parent')
+        if parent is not None:
+            if parent.post_id != attrs.get('post_id'):
+                raise serializers.ValidationError({'parent': 'Parent comment belongs to another post'})
+            if parent.depth + 1 >= settings.COMMENTS_MAX_DEPTH:
+                raise serializers.ValidationError({'parent': 'Replies are nested too deeply'})
+        return attrs
 
     def create(self, validated_data):
         """
         Override create method to set the author and post
         """
-        post_id = validated_data.pop('post_id')
-        post = BlogPost.objects.get(id=post_id)
-        validated_data['post'] = post
+        # post_id was validated above, so assign the FK directly instead of fetching the post again
+        validated_data['post_id'] = validated_data.pop('post_id')
         validated_data['author'] = self.context['request'].user
         return super().create(validated_data)
+
+
+class ThreadedCommentSerializer(CommentSerializer):
+    """
+    A top-level comment with the total number of replies in its thread
+    and the first few of them (in thread order), as attached by the list view.
+    """
+    reply_count = serializers.IntegerField(read_only=True)
+    replies = CommentSerializer(source='first_replies', many=True, read_only=True)
+
+    class Meta(CommentSerializer.Meta):
+        fields = CommentSerializer.Meta.fields + ['reply_count', 'replies']
+
+
+class CommentBulkDeleteSerializer(serializers.Serializer):
+    """
+    Selects the comments of a bulk delete: either explicit `ids`,
+    or a filter on any of author (username), post and creation date range.
+    """
+    ids = serializers.ListField(child=serializers.IntegerField(), required=False, allow_empty=False)
+    author = serializers.CharField(required=False)
+    post_id = serializers.IntegerField(required=False)
+    created_after = serializers.DateTimeField(required=False)
+    created_before = serializers.DateTimeField(required=False)
+
+    filter_fields = ['author', 'post_id', 'created_after', 'created_before']
+
+    def validate(self, attrs):
+        filters = [name for name in self.filter_fields if name in attrs]
+        if 'ids' in attrs and filters:
+            raise serializers.ValidationError('Pass either ids or a filter, not both')
+        if 'ids' not in attrs and not filters:
+            raise serializers.ValidationError(f"Pass ids or at least one of: {', '.join(self.filter_fields)}")
+        if len(attrs.get('ids', [])) > settings.COMMENTS_BULK_DELETE_LIMIT:
+            raise serializers.ValidationError(
+                {'ids': f'At most {settings.COMMENTS_BULK_DELETE_LIMIT} comments can be deleted at once'}
+            )
+        return attrs
+
+    def get_queryset(self):
+        """The comments selected by the validated ids or filter"""
+        data = self.validated_data
+        if 'ids' in data:
+            return Comment.objects.filter(id__in=data['ids'])
+        lookups = {
+            'author': 'author__username',
+            'post_id': 'post_id',
+            'created_after': 'created_date__gte',
+            'created_before': 'created_date__lt',
+        }
+        return Comment.objects.filter(**{lookups[name]: data[name] for name in lookups if name in data})
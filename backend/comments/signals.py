@@ -0,0 +1,20 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from blog import response_cache
+from blog.signals import renamed_from
+from .models import Comment
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_cached_comments(sender, instance, **kwargs):
+    response_cache.bump(response_cache.comments_version(instance.post_id))
+
+
+@receiver(post_save, sender=get_user_model())
+def invalidate_cached_comments_on_rename(sender, instance, created, **kwargs):
+    # comments show their author's name
+    if not created and renamed_from(instance) is not None:
+        post_ids = Comment.objects.filter(author=instance).values_list('post_id', flat=True).distinct()
+        response_cache.bump(*(response_cache.comments_version(post_id) for post_id in post_ids))
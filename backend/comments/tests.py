@@ -1,13 +1,20 @@
-from django.test import TestCase
+from datetime import timedelta
+from io import StringIO
+from django.core.management import call_command
+from django.test import TestCase, override_settings
 from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.utils import timezone
+from django.core.cache import cache
 from rest_framework.test import APIClient
 from rest_framework import status
 from blog.models import BlogPost
+from config.testing import QUERY_BUDGETS, QueryBudgetMixin
 from .models import Comment
 
 User = get_user_model()
 
-class CommentViewTests(TestCase):
+class CommentViewTests(QueryBudgetMixin, TestCase):
     def setUp(self):
         """
         Set up test data:
@@ -15,6 +22,7 @@ class CommentViewTests(TestCase):
         - One blog post
         - One comment
         """
+        cache.clear()
         # Create test users
         self.user1 = User.objects.create_user(
             username='author',
@@ -51,8 +59,8 @@ class CommentViewTests(TestCase):
         """
         response = self.client.get(f'/comments/?post_id={self.blog_post.id}')
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
-        self.assertEqual(response.data[0]['content'], 'Test comment')
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertEqual(response.data['results'][0]['content'], 'Test comment')
 
     def test_get_comments_without_post_id(self):
         """
@@ -142,3 +150,383 @@ class CommentViewTests(TestCase):
         response = self.client.delete(f'/comments/{self.comment.id}/')
         self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
         self.assertEqual(Comment.objects.count(), 1)
+
+    def test_comment_list_query_budget(self):
+        """
+        Test that listing comments costs the same number of queries however many authors comment
+        """
+        url = f'/comments/?post_id={self.blog_post.id}'
+
+        def add_comments():
+            for i in range(5):
+                author = User.objects.create_user(
+                    username=f'reader{i}',
+                    email=f'reader{i}@test.com',
+                    password='testpass123'
+                )
+                Comment.objects.create(post=self.blog_post, author=author, content=f'Comment {i}')
+
+        self.assertQueryBudget(url)
+        self.assertConstantQueries(url, add_comments)
+
+    def test_comment_detail_query_budget(self):
+        """
+        Test that retrieving a comment joins its author instead of loading it lazily
+        """
+        self.assertQueryBudget(f'/comments/{self.comment.id}/')
+
+    def test_comment_list_conditional_get(self):
+        """
+        Test that an unchanged comment list answers If-None-Match with 304,
+        and that adding a comment changes the ETag
+        """
+        url = f'/comments/?post_id={self.blog_post.id}'
+        etag = self.client.get(url)['ETag']
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        Comment.objects.create(post=self.blog_post, author=self.user1, content='Another comment')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_comment_writes_invalidate_cached_list(self):
+        """
+        Test that a cached comment list is refreshed after a comment is added or deleted
+        """
+        url = f'/comments/?post_id={self.blog_post.id}'
+        self.client.get(url)
+        self.assertEqual(self.client.get(url)['X-Cache'], 'HIT')
+
+        self.client.force_authenticate(user=self.user2)
+        self.client.post('/comments/', {'post_id': self.blog_post.id, 'content': 'Fresh comment'})
+        response = self.client.get(url)
+        self.assertEqual(len(response.data['results']), 2)
+
+        self.client.delete(f'/comments/{self.comment.id}/')
+        response = self.client.get(url)
+        self.assertEqual([c['content'] for c in response.data['results']], ['Fresh comment'])
+
+    def test_rename_invalidates_cached_list(self):
+        """
+        Test that a cached comment list shows a commenter's new username
+        """
+        url = f'/comments/?post_id={self.blog_post.id}'
+        self.client.get(url)
+        self.user2.username = 'renamed'
+        self.user2.save()
+        response = self.client.get(url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['results'][0]['author_username'], 'renamed')
+
+    def test_comment_stats_maintained(self):
+        """
+        Test that creating and deleting comments through the API keeps the post's
+        comment_count and last_comment_at in step
+        """
+        # the setUp comment was created directly, so start from reconciled stats
+        call_command('reconcile_comment_counts', stdout=StringIO())
+        self.client.force_authenticate(user=self.user2)
+        response = self.client.post('/comments/', {'post_id': self.blog_post.id, 'content': 'Second'})
+        self.blog_post.refresh_from_db()
+        self.assertEqual(self.blog_post.comment_count, 2)
+        self.assertEqual(self.blog_post.last_comment_at, Comment.objects.get(pk=response.data['id']).created_date)
+
+        self.client.delete(f'/comments/{response.data["id"]}/')
+        self.blog_post.refresh_from_db()
+        self.assertEqual(self.blog_post.comment_count, 1)
+        self.assertEqual(self.blog_post.last_comment_at, self.comment.created_date)
+
+        response = self.client.get(f'/blog/posts/{self.blog_post.id}/')
+        self.assertEqual(response.data['comment_count'], 1)
+        response = self.client.get('/blog/posts/')
+        self.assertEqual(response.data['results'][0]['comment_count'], 1)
+
+    def test_reconcile_comment_counts_command(self):
+        """
+        Test that the reconcile command finds and fixes drifted counters
+        """
+        out = StringIO()
+        call_command('reconcile_comment_counts', '--dry-run', stdout=out)
+        self.assertIn('1 blog post(s) have drifted', out.getvalue())
+
+        call_command('reconcile_comment_counts', stdout=StringIO())
+        self.blog_post.refresh_from_db()
+        self.assertEqual(self.blog_post.comment_count, 1)
+        self.assertEqual(self.blog_post.last_comment_at, self.comment.created_date)
+
+        out = StringIO()
+        call_command('reconcile_comment_counts', '--dry-run', stdout=out)
+        self.assertIn('0 blog post(s) have drifted', out.getvalue())
+
+    def reply(self, parent, content, author=None):
+        return Comment.objects.create(
+            post=self.blog_post, author=author or self.user1, parent=parent, content=content
+        )
+
+    def test_create_reply(self):
+        """
+        Test that a reply joins its parent's thread one level deeper
+        """
+        self.client.force_authenticate(user=self.user1)
+        response = self.client.post(
+            '/comments/', {'post_id': self.blog_post.id, 'parent': self.comment.id, 'content': 'A reply'}
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['parent'], self.comment.id)
+        self.assertEqual(response.data['depth'], 1)
+        reply = Comment.objects.get(pk=response.data['id'])
+        self.assertEqual(reply.root_id, self.comment.id)
+        self.assertTrue(reply.path.startswith(self.comment.path + '/'))
+
+    def test_reply_must_be_on_same_post(self):
+        """
+        Test that a comment can't reply to a comment on another post
+        """
+        other_post = BlogPost.objects.create(title='Other', content='Other', author=self.user1)
+        self.client.force_authenticate(user=self.user1)
+        response = self.client.post(
+            '/comments/', {'post_id': other_post.id, 'parent': self.comment.id, 'content': 'Misplaced'}
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('parent', response.data)
+
+    @override_settings(COMMENTS_MAX_DEPTH=2)
+    def test_reply_depth_is_limited(self):
+        """
+        Test that replies can't be nested deeper than COMMENTS_MAX_DEPTH
+        """
+        reply = self.reply(self.comment, 'Depth 1')
+        self.client.force_authenticate(user=self.user1)
+        response = self.client.post(
+            '/comments/', {'post_id': self.blog_post.id, 'parent': reply.id, 'content': 'Depth 2'}
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_threaded_comments(self):
+        """
+        Test that the threaded listing pages over top-level comments and
+        embeds the first replies of each thread in tree order
+        """
+        first = self.reply(self.comment, 'First reply')
+        self.reply(self.comment, 'Second reply')
+        self.reply(first, 'Nested reply')
+        Comment.objects.create(post=self.blog_post, author=self.user2, content='Another thread')
+
+        response = self.client.get(f'/comments/?post_id={self.blog_post.id}&threaded=true&replies=2')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        threads = response.data['results']
+        self.assertEqual([t['content'] for t in threads], ['Test comment', 'Another thread'])
+        self.assertEqual(threads[0]['reply_count'], 3)
+        self.assertEqual([r['content'] for r in threads[0]['replies']], ['First reply', 'Nested reply'])
+        self.assertEqual(threads[1]['reply_count'], 0)
+        self.assertEqual(threads[1]['replies'], [])
+
+        response = self.client.get(f'/comments/?post_id={self.blog_post.id}&threaded=true&replies=0')
+        self.assertEqual(response.data['results'][0]['reply_count'], 3)
+        self.assertEqual(response.data['results'][0]['replies'], [])
+
+    def test_threaded_comments_query_budget(self):
+        """
+        Test that the threaded listing costs the same number of queries however many threads and replies there are
+        """
+        url = f'/comments/?post_id={self.blog_post.id}&threaded=true'
+
+        def add_threads():
+            for i in range(3):
+                thread = Comment.objects.create(post=self.blog_post, author=self.user2, content=f'Thread {i}')
+                self.reply(self.reply(thread, f'Reply {i}'), f'Nested {i}')
+
+        self.assertQueryBudget(url, budget=QUERY_BUDGETS['comment-list-threaded'])
+        self.assertConstantQueries(url, add_threads)
+
+    @override_settings(COMMENTS_PAGE_SIZE=2)
+    def test_comment_list_is_paginated(self):
+        """
+        Test that following next cursors walks every comment exactly once, oldest first
+        """
+        for i in range(4):
+            Comment.objects.create(post=self.blog_post, author=self.user2, content=f'Comment {i}')
+        url = f'/comments/?post_id={self.blog_post.id}'
+        seen = []
+        while url:
+            response = self.client.get(url)
+            self.assertLessEqual(len(response.data['results']), 2)
+            seen += [c['content'] for c in response.data['results']]
+            url = response.data['next']
+        self.assertEqual(seen, ['Test comment'] + [f'Comment {i}' for i in range(4)])
+
+        response = self.client.get(f'/comments/?post_id={self.blog_post.id}&all=true')
+        self.assertEqual(len(response.data), 5)
+
+    def test_delete_comment_removes_its_replies(self):
+        """
+        Test that deleting a comment deletes its whole subtree and decrements the post's count by all of it
+        """
+        reply = self.reply(self.comment, 'Reply')
+        self.reply(reply, 'Nested reply')
+        call_command('reconcile_comment_counts', stdout=StringIO())
+
+        self.client.force_authenticate(user=self.user2)
+        response = self.client.delete(f'/comments/{self.comment.id}/')
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(Comment.objects.count(), 0)
+        self.blog_post.refresh_from_db()
+        self.assertEqual(self.blog_post.comment_count, 0)
+
+
+class CommentBulkDeleteTests(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author', email='author@test.com', password='testpass123')
+        self.spammer = User.objects.create_user(username='spammer', email='spammer@test.com', password='testpass123')
+        self.reader = User.objects.create_user(username='reader', email='reader@test.com', password='testpass123')
+        self.post = BlogPost.objects.create(title='Post', content='Content', author=self.author)
+        self.other_post = BlogPost.objects.create(title='Other', content='Content', author=self.reader)
+        self.spam = [
+            Comment.objects.create(post=self.post, author=self.spammer, content=f'Spam {i}') for i in range(3)
+        ]
+        self.reply = Comment.objects.create(post=self.post, author=self.reader, parent=self.spam[0], content='Reply')
+        self.kept = Comment.objects.create(post=self.post, author=self.reader, content='Legit')
+        self.elsewhere = Comment.objects.create(post=self.other_post, author=self.spammer, content='Spam elsewhere')
+        call_command('reconcile_comment_counts', stdout=StringIO())
+        self.url = reverse('comment-bulk-delete')
+        self.client = APIClient()
+
+    def bulk_delete(self, user, data):
+        self.client.force_authenticate(user=user)
+        return self.client.post(self.url, data, format='json')
+
+    def test_post_author_deletes_by_ids(self):
+        """
+        Test that the post author can delete a set of comments, with their replies,
+        and that the post's stats and cached comment list follow
+        """
+        list_url = f'/comments/?post_id={self.post.id}'
+        self.client.get(list_url)
+        response = self.bulk_delete(self.author, {'ids': [c.id for c in self.spam]})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['deleted'], sorted([c.id for c in self.spam] + [self.reply.id]))
+        self.assertEqual(list(Comment.objects.filter(post=self.post)), [self.kept])
+
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 1)
+        self.assertEqual(self.post.last_comment_at, self.kept.created_date)
+        response = self.client.get(list_url)
+        self.assertEqual([c['content'] for c in response.data['results']], ['Legit'])
+
+    def test_forbidden_selection_deletes_nothing(self):
+        """
+        Test that a selection containing a comment the user may not delete is rejected as a whole
+        """
+        response = self.bulk_delete(self.author, {'ids': [self.spam[1].id, self.elsewhere.id]})
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(response.data['forbidden'], [self.elsewhere.id])
+        self.assertEqual(Comment.objects.count(), 6)
+
+        # the spammer may delete their own comments everywhere
+        response = self.bulk_delete(self.spammer, {'author': 'spammer', 'post_id': self.other_post.id})
+        self.assertEqual(response.data['deleted'], [self.elsewhere.id])
+
+    def test_delete_by_filter(self):
+        """
+        Test deleting the comments of one author on a post within a date range
+        """
+        Comment.objects.filter(pk=self.spam[2].pk).update(created_date=timezone.now() - timedelta(days=2))
+        response = self.bulk_delete(self.author, {
+            'author': 'spammer',
+            'post_id': self.post.id,
+            'created_after': (timezone.now() - timedelta(days=1)).isoformat(),
+        })
+        self.assertEqual(response.data['deleted'], sorted([self.spam[0].id, self.spam[1].id, self.reply.id]))
+        self.assertTrue(Comment.objects.filter(pk=self.spam[2].pk).exists())
+
+    def test_bulk_delete_validation(self):
+        """
+        Test that a request needs exactly one of ids or a filter, and authentication
+        """
+        self.assertEqual(self.client.post(self.url, {'ids': [1]}, format='json').status_code,
+                         status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(self.bulk_delete(self.author, {}).status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.bulk_delete(self.author, {'ids': [self.spam[0].id], 'post_id': self.post.id})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        with override_settings(COMMENTS_BULK_DELETE_LIMIT=2):
+            response = self.bulk_delete(self.author, {'post_id': self.post.id})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Comment.objects.count(), 6)
+
+    def test_nested_selection(self):
+        """
+        Test that selecting a reply along with a comment above it deletes the subtree once
+        """
+        deeper = Comment.objects.create(post=self.post, author=self.reader, parent=self.reply, content='Deeper')
+        deepest = Comment.objects.create(post=self.post, author=self.reader, parent=deeper, content='Deepest')
+        response = self.bulk_delete(self.author, {'ids': [deepest.id, self.reply.id, deeper.id]})
+        self.assertEqual(response.data['deleted'], [self.reply.id, deeper.id, deepest.id])
+        self.assertTrue(Comment.objects.filter(pk=self.spam[0].pk).exists())
+
+    def test_selection_at_the_limit(self):
+        """
+        Test that a selection of as many replies as allowed is deleted, batch by batch
+        """
+        limit = 1000
+        replies = [
+            Comment.objects.create(post=self.post, author=self.spammer, parent=self.kept, content=f'Reply {i}')
+            for i in range(limit)
+        ]
+        nested = Comment.objects.create(post=self.post, author=self.reader, parent=replies[0], content='Nested')
+        with override_settings(COMMENTS_BULK_DELETE_LIMIT=limit):
+            response = self.bulk_delete(self.author, {'ids': [c.id for c in replies]})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['deleted']), limit + 1)
+        self.assertFalse(Comment.objects.filter(pk=nested.pk).exists())
+        self.assertEqual(Comment.objects.filter(post=self.post).count(), 5)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 5)
+
+    def test_bulk_delete_query_budget(self):
+        """
+        Test that a bulk delete costs the same number of queries however many comments it removes
+        """
+        for i in range(10):
+            Comment.objects.create(post=self.post, author=self.spammer, content=f'More spam {i}')
+        self.client.force_authenticate(user=self.author)
+        response = self.assertQueryBudget(self.url, method='post', data={'author': 'spammer'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        response = self.assertQueryBudget(
+            self.url, method='post', data={'author': 'spammer', 'post_id': self.post.id}, format='json'
+        )
+        self.assertEqual(len(response.data['deleted']), 14)
+
+
+@override_settings(RESPONSE_CACHE_ENABLED=False, COMMENTS_PAGE_SIZE=2)
+class AsyncCommentViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='author', email='author@test.com', password='testpass123')
+        self.post = BlogPost.objects.create(title='Post', content='Content', author=self.user)
+        threads = [Comment.objects.create(post=self.post, author=self.user, content=f'Thread {i}') for i in range(3)]
+        reply = Comment.objects.create(post=self.post, author=self.user, parent=threads[0], content='Reply')
+        Comment.objects.create(post=self.post, author=self.user, parent=reply, content='Nested')
+        self.comment = threads[1]
+
+    def assertSameResponse(self, url, async_url):
+        expected = self.client.get(url)
+        response = self.client.get(async_url)
+        self.assertEqual(response.status_code, expected.status_code)
+        self.assertEqual(response.content.decode().replace('/async/', '/'), expected.content.decode())
+        return response
+
+    def test_async_comment_list_matches_sync(self):
+        for query in ('', '&threaded=true&replies=1', '&all=true'):
+            response = self.assertSameResponse(
+                f'/comments/?post_id={self.post.id}{query}', f'/comments/async/?post_id={self.post.id}{query}'
+            )
+        self.assertEqual(len(response.json()), 5)
+        response = self.client.get(f'/comments/async/?post_id={self.post.id}')
+        self.assertSameResponse(response.json()['next'].replace('/async/', '/'), response.json()['next'])
+
+    def test_async_comment_detail_matches_sync(self):
+        self.assertSameResponse(f'/comments/{self.comment.id}/', f'/comments/async/{self.comment.id}/')
+        self.assertSameResponse('/comments/999/', '/comments/async/999/')
+        self.assertSameResponse('/comments/?post_id=999', '/comments/async/?post_id=999')
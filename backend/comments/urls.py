@@ -1,7 +1,12 @@
 from django.urls import path
-from .views import CommentListView, CommentDetailView
+from .views import CommentListView, CommentDetailView, CommentBulkDeleteView
+from .async_views import AsyncCommentListView, AsyncCommentDetailView
 
 urlpatterns = [
     path('', CommentListView.as_view(), name='comment-list'),
+    path('bulk-delete/', CommentBulkDeleteView.as_view(), name='comment-bulk-delete'),
+    # async-native read paths (see blog.async_api)
+    path('async/', AsyncCommentListView.as_view(), name='comment-list-async'),
+    path('async/<int:pk>/', AsyncCommentDetailView.as_view(), name='comment-detail-async'),
     path('<int:pk>/', CommentDetailView.as_view(), name='comment-detail'),
 ]
\ No newline at end of file
@@ -1,10 +1,90 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, permissions
+from django.db import transaction
+from django.conf import settings
+from django.db.models import Count, F, Max, Window
+from django.db.models.functions import RowNumber
+from django.http import Http404
 from django.shortcuts import get_object_or_404
 from .models import Comment
+from blog import conditional, response_cache
 from blog.models import BlogPost
-from .serializers import CommentSerializer
+from blog.pagination import KeysetPagination
+from .serializers import CommentBulkDeleteSerializer, CommentSerializer, ThreadedCommentSerializer
+from . import counters, moderation
+
+def post_id_param(request):
+    """Return the post_id query parameter, as an int when it is numeric"""
+    value = request.query_params.get('post_id', '')
+    return int(value) if value.isdigit() else value
+
+def comment_list_validators(post_id, count, last_updated):
+    """
+    Return the (ETag, Last-Modified) pair of a post's comment list.
+    The count is part of the ETag so that deleting a comment changes it too.
+    """
+    etag = conditional.make_etag('comments', post_id, count, last_updated.isoformat() if last_updated else '')
+    return etag, last_updated
+
+# aggregated over a post and its comments: whether the post exists, and the comment list's validators
+COMMENT_LIST_STATS = {
+    'exists': Count('id', distinct=True),
+    'count': Count('comments'),
+    'last_updated': Max('comments__updated_date'),
+}
+
+def comment_list_queryset(request, post_id):
+    """
+    Return the comments to page over and the serializer class for them:
+    every comment of the post, or only top-level ones with ?threaded=true
+    """
+    if request.query_params.get('threaded', '').lower() in ('1', 'true', 'yes'):
+        comments = Comment.objects.filter(post_id=post_id, depth=0)
+        serializer_class = ThreadedCommentSerializer
+    else:
+        comments = Comment.objects.filter(post_id=post_id)
+        serializer_class = CommentSerializer
+    return comments.select_related('author').order_by('created_date', 'id'), serializer_class
+
+def reply_limit(request):
+    """The number of replies to show per thread, from ?replies="""
+    try:
+        limit = int(request.query_params.get('replies', settings.COMMENTS_THREAD_REPLIES))
+    except ValueError:
+        limit = settings.COMMENTS_THREAD_REPLIES
+    return max(0, min(limit, settings.COMMENTS_MAX_THREAD_REPLIES))
+
+def replies_queryset(roots, limit):
+    """
+    Return the first `limit` replies of each top-level comment's thread, in thread order,
+    annotated with their `position` in it and the thread's size.
+    Fetches every thread of a page at once: one windowed query, whatever the page size.
+    """
+    replies = Comment.objects.filter(root_id__in=[root.id for root in roots]).select_related('author').annotate(
+        position=Window(RowNumber(), partition_by=F('root_id'), order_by=F('path').asc()),
+        thread_size=Window(Count('id'), partition_by=F('root_id'))
+    )
+    # when no replies are shown, still fetch one row per thread for its reply_count
+    return replies.filter(position__lte=max(limit, 1)).order_by('root_id', 'path')
+
+def attach_replies(roots, replies, limit):
+    """Set `reply_count` and `first_replies` on each top-level comment from the rows of replies_queryset"""
+    by_id = {root.id: root for root in roots}
+    for root in roots:
+        root.reply_count = 0
+        root.first_replies = []
+    for reply in replies:
+        root = by_id[reply.root_id]
+        root.reply_count = reply.thread_size
+        if reply.position <= limit:
+            root.first_replies.append(reply)
+
+class CommentPagination(KeysetPagination):
+    ordering = ('created_date', 'id')
+
+    def get_default_page_size(self):
+        return settings.COMMENTS_PAGE_SIZE
 
 class CommentListView(APIView):
     """
@@ -13,23 +93,46 @@ class CommentListView(APIView):
     """
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
 
+    pagination_class = CommentPagination
+
+    @response_cache.cache_response(
+        lambda request: [response_cache.comments_version(post_id_param(request))]
+    )
     def get(self, request):
         """
-        Get all comments for a specific blog post.
+        Get the comments of a specific blog post, oldest first, a page at a time.
         Requires post_id as a query parameter.
+        With ?threaded=true, pages over top-level comments instead, each with its
+        reply_count and the first ?replies=N replies of its thread.
         """
-        post_id = request.query_params.get('post_id')
+        post_id = post_id_param(request)
         if not post_id:
             return Response(
                 {'error': 'post_id is required'}, 
                 status=status.HTTP_400_BAD_REQUEST
             )
+        if not isinstance(post_id, int):
+            raise Http404
 
-        # Get comments for the specified post
-        post = get_object_or_404(BlogPost, id=post_id)
-        comments = Comment.objects.filter(post=post)
-        serializer = CommentSerializer(comments, many=True)
-        return Response(serializer.data)
+        # one query both checks that the post exists and computes the list's validators
+        stats = BlogPost.objects.filter(id=post_id).aggregate(**COMMENT_LIST_STATS)
+        if not stats['exists']:
+            raise Http404
+        etag, last_modified = comment_list_validators(post_id, stats['count'], stats['last_updated'])
+        response = conditional.evaluate_preconditions(request, etag, last_modified)
+        if response is not None:
+            return response
+
+        comments, serializer_class = comment_list_queryset(request, post_id)
+        paginator = self.pagination_class()
+        page = paginator.paginate_queryset(comments, request, view=self)
+        rows = list(comments) if page is None else page
+        if serializer_class is ThreadedCommentSerializer:
+            limit = reply_limit(request)
+            attach_replies(rows, list(replies_queryset(rows, limit)), limit)
+        data = serializer_class(rows, many=True).data
+        response = Response(data) if page is None else paginator.get_paginated_response(data)
+        return conditional.set_validators(response, etag, last_modified)
 
     def post(self, request):
         """
@@ -42,8 +145,10 @@ class CommentListView(APIView):
         )
         
         if serializer.is_valid():
-            # Create the comment with the current user as author
-            serializer.save(author=request.user)
+            with transaction.atomic():
+                # Create the comment with the current user as author
+                comment = serializer.save(author=request.user)
+                counters.comment_added(comment)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
             
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -59,7 +164,7 @@ class CommentDetailView(APIView):
         """
         Retrieve a specific comment.
         """
-        comment = get_object_or_404(Comment, pk=pk)
+        comment = self.get_comment(pk)
         serializer = CommentSerializer(comment)
         return Response(serializer.data)
 
@@ -67,17 +172,20 @@ class CommentDetailView(APIView):
         """
         Helper method to get a comment instance.
         Returns 404 if not found.
+        The author and the post are joined in so permission checks
+        and serialization don't need extra queries.
         """
-        return get_object_or_404(Comment, pk=pk)
+        comments = Comment.objects.select_related('author', 'post').defer('post__content', 'post__content_html', 'post__excerpt', 'post__toc')
+        return get_object_or_404(comments, pk=pk)
 
     def put(self, request, pk):
         """
         Update a specific comment.
         Only the comment author can update their comment.
         """
-        comment = get_object_or_404(Comment, pk=pk)
+        comment = self.get_comment(pk)
         # Check if user is the author of the comment
-        if comment.author != request.user:
+        if comment.author_id != request.user.id:
             return Response(
                 {'error': 'You can only edit your own comments'},
                 status=status.HTTP_403_FORBIDDEN
@@ -103,12 +211,50 @@ class CommentDetailView(APIView):
         Delete a specific comment.
         Only the comment author or the post author can delete the comment.
         """
-        comment = get_object_or_404(Comment, pk=pk)
+        comment = self.get_comment(pk)
         # Check if user is either the comment author or the post author
-        if comment.author != request.user and comment.post.author != request.user:
+        if comment.author_id != request.user.id and comment.post.author_id != request.user.id:
             return Response(
                 {'error': 'You can only delete your own comments or comments on your posts'},
                 status=status.HTTP_403_FORBIDDEN
             )
-        comment.delete()
-        return Response(status=status.HTTP_204_NO_CONTENT)
\ No newline at end of file
+        with transaction.atomic():
+            # replies are deleted along with the comment, so count them all
+            _, deleted = comment.delete()
+            counters.comments_removed(comment.post_id, deleted.get(Comment._meta.label, 0))
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+class CommentBulkDeleteView(APIView):
+    """
+    Delete many comments, and their replies, in one request:
+    POST {"ids": [...]} or a filter such as {"post_id": 1, "created_after": "..."}.
+    Permissions are checked for the whole selection at once; if the user may not delete
+    every selected comment, nothing is deleted and the offending ids are returned.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        serializer = CommentBulkDeleteSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        limit = settings.COMMENTS_BULK_DELETE_LIMIT
+        selected = list(
+            moderation.with_delete_permission(serializer.get_queryset(), request.user)
+            .values_list('id', 'depth', 'path', 'can_delete')
+            .order_by('id')[:limit + 1]
+        )
+        if len(selected) > limit:
+            return Response(
+                {'error': f'The filter matches more than {limit} comments, narrow it down'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        forbidden = [pk for pk, _, _, can_delete in selected if not can_delete]
+        if forbidden:
+            return Response(
+                {'error': 'You can only delete your own comments or comments on your posts', 'forbidden': forbidden},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        deleted = moderation.delete_comments([(pk, depth, path) for pk, depth, path, _ in selected])
+        return Response({'deleted': deleted})
@@ -0,0 +1,234 @@
+"""
+Per-request performance measurements and their Prometheus export.
+
+The measurements of the request being handled live in a context variable, so code anywhere
+below the view (serializers, the Markdown renderer, the database layer) can add to them
+without having the request passed in, including from the threads async views run
+ORM calls in. config.middleware.PerformanceMiddleware starts and finishes them, and
+aggregates them into per-route histograms kept in process memory. With several worker
+processes every process exports its own series, which Prometheus scrapes separately.
+"""
+
+import hmac
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.http import HttpResponse, HttpResponseForbidden
+
+_current = ContextVar('request_metrics', default=None)
+
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+BYTES_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+
+class RequestMetrics:
+    """What one request spent its time on"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.duration = None
+        self.db_queries = 0
+        self.db_time = 0.0
+        # seconds per named section, see timer()
+        self.timings = {}
+        self._active = set()
+
+    def finish(self):
+        self.duration = time.perf_counter() - self.started
+        return self.duration
+
+
+def current():
+    """The measurements of the request being handled, or None outside of a request"""
+    return _current.get()
+
+
+def start():
+    """Start measuring a request; returns the token to pass to stop()"""
+    return _current.set(RequestMetrics())
+
+
+def stop(token):
+    _current.reset(token)
+
+
+@contextmanager
+def timer(name):
+    """
+    Add the time spent in the block to the current request's `name` section.
+    Nested blocks of the same section (a serializer serializing a nested serializer)
+    are only counted once. Does nothing outside of a request.
+    """
+    metrics = _current.get()
+    if metrics is None or name in metrics._active:
+        yield
+        return
+    metrics._active.add(name)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics._active.discard(name)
+        metrics.timings[name] = metrics.timings.get(name, 0.0) + time.perf_counter() - started
+
+
+class TimedSerializerMixin:
+    """Counts a serializer's to_representation() as the request's `serializer` time"""
+
+    def to_representation(self, instance):
+        with timer('serializer'):
+            return super().to_representation(instance)
+
+
+def record_query(execute, sql, params, many, context):
+    """Database execute wrapper counting the queries of the current request and their time"""
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.db_queries += 1
+        metrics.db_time += time.perf_counter() - started
+
+
+def install_query_recorder(connection):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+@receiver(connection_created)
+def install_on_new_connection(sender, connection, **kwargs):
+    install_query_recorder(connection)
+
+
+def install_on_open_connections():
+    """Cover the connections this thread opened before this module was imported"""
+    for connection in connections.all(initialized_only=True):
+        install_query_recorder(connection)
+
+
+class Histogram:
+    """A Prometheus histogram with a fixed label set, kept in process memory"""
+
+    def __init__(self, name, documentation, buckets, labels=('route', 'method')):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = buckets
+        self.labels = labels
+        # label values -> [count per bucket..., total count, sum]
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += 1
+            series[-1] += value
+
+    def samples(self, label_values):
+        with self._lock:
+            return list(self._series.get(label_values, ()))
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+    def expose(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            series = sorted(self._series.items())
+        for label_values, values in series:
+            labels = format_labels(zip(self.labels, label_values))
+            for bound, count in zip(self.buckets, values):
+                lines.append(f'{self.name}_bucket{{{labels},le="{bound}"}} {count}')
+            lines.append(f'{self.name}_bucket{{{labels},le="+Inf"}} {values[-2]}')
+            lines.append(f'{self.name}_sum{{{labels}}} {values[-1]}')
+            lines.append(f'{self.name}_count{{{labels}}} {values[-2]}')
+        return lines
+
+
+REQUEST_DURATION = Histogram('http_request_duration_seconds', 'Time to build the response.', SECONDS_BUCKETS)
+DB_QUERIES = Histogram('http_request_db_queries', 'SQL queries per request.', QUERY_BUCKETS)
+DB_DURATION = Histogram('http_request_db_duration_seconds', 'Time spent in SQL queries.', SECONDS_BUCKETS)
+SERIALIZER_DURATION = Histogram(
+    'http_request_serializer_duration_seconds', 'Time spent serializing the response data.', SECONDS_BUCKETS
+)
+MARKDOWN_DURATION = Histogram(
+    'http_request_markdown_duration_seconds', 'Time spent rendering Markdown.', SECONDS_BUCKETS
+)
+RESPONSE_SIZE = Histogram('http_response_size_bytes', 'Response body size.', BYTES_BUCKETS)
+HISTOGRAMS = (REQUEST_DURATION, DB_QUERIES, DB_DURATION, SERIALIZER_DURATION, MARKDOWN_DURATION, RESPONSE_SIZE)
+
+
+def observe(metrics, route, method, response_bytes):
+    """Add a finished request to the per-route histograms"""
+    REQUEST_DURATION.observe(metrics.duration, route, method)
+    DB_QUERIES.observe(metrics.db_queries, route, method)
+    DB_DURATION.observe(metrics.db_time, route, method)
+    SERIALIZER_DURATION.observe(metrics.timings.get('serializer', 0.0), route, method)
+    MARKDOWN_DURATION.observe(metrics.timings.get('markdown', 0.0), route, method)
+    RESPONSE_SIZE.observe(response_bytes, route, method)
+
+
+def reset():
+    """Forget every observation (for tests)"""
+    for histogram in HISTOGRAMS:
+        histogram.clear()
+
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_labels(pairs):
+    return ','.join(f'{name}="{escape_label(value)}"' for name, value in pairs)
+
+
+def cache_lines():
+    """The response cache's hit and miss counters, in the exposition format"""
+    from blog.response_cache import get_stats
+
+    name = 'response_cache_requests_total'
+    lines = [f'# HELP {name} Cacheable GET requests answered from the response cache or not.',
+             f'# TYPE {name} counter']
+    for (view, result), count in sorted(get_stats().items()):
+        lines.append(f'{name}{{{format_labels([("view", view), ("result", result)])}}} {count}')
+    return lines
+
+
+def expose():
+    """Every metric of this process in the Prometheus text format"""
+    lines = []
+    for histogram in HISTOGRAMS:
+        lines.extend(histogram.expose())
+    lines.extend(cache_lines())
+    return '\n'.join(lines) + '\n'
+
+
+def scrape_allowed(request):
+    """Whether the request bears METRICS_TOKEN or comes from one of METRICS_ALLOWED_IPS"""
+    token = settings.METRICS_TOKEN
+    if token and hmac.compare_digest(request.META.get('HTTP_AUTHORIZATION', ''), f'Bearer {token}'):
+        return True
+    allowed = settings.METRICS_ALLOWED_IPS
+    return '*' in allowed or request.META.get('REMOTE_ADDR') in allowed
+
+
+def metrics_view(request):
+    """Prometheus scrape endpoint, denied to everyone but the scrapers allowed by the METRICS_* settings"""
+    if not scrape_allowed(request):
+        return HttpResponseForbidden()
+    return HttpResponse(expose(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,120 @@
+import json
+import logging
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from . import metrics
+
+logger = logging.getLogger('performance')
+
+
+class PerformanceMiddleware:
+    """
+    Measure every request: total time, SQL queries and their time, serializer and Markdown
+    rendering time, and response size.
+
+    The timings go out as a Server-Timing header (when PERFORMANCE_SERVER_TIMING is on),
+    as one JSON log line on the `performance` logger (at WARNING for requests slower than
+    PERFORMANCE_SLOW_REQUEST_MS, INFO otherwise) and into the per-route histograms served at /metrics.
+    Keep it first in MIDDLEWARE so the total includes the other middleware.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+        metrics.install_on_open_connections()
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        token = metrics.start()
+        try:
+            response = self.get_response(request)
+            return self.process(request, response, metrics.current())
+        finally:
+            metrics.stop(token)
+
+    async def __acall__(self, request):
+        token = metrics.start()
+        try:
+            response = await self.get_response(request)
+            return self.process(request, response, metrics.current())
+        finally:
+            metrics.stop(token)
+
+    def process(self, request, response, measured):
+        if not settings.PERFORMANCE_METRICS_ENABLED:
+            return response
+        measured.finish()
+        if settings.PERFORMANCE_SERVER_TIMING:
+            response['Server-Timing'] = server_timing(measured)
+        if not response.streaming:
+            self.report(request, response, measured, len(response.content))
+            return response
+
+        # the size of a streamed body is only known once it has been sent
+        def report_after(sent):
+            self.report(request, response, measured, sent)
+
+        if response.is_async:
+            response.streaming_content = count_async(response.streaming_content, report_after)
+        else:
+            response.streaming_content = count(response.streaming_content, report_after)
+        return response
+
+    def report(self, request, response, measured, response_bytes):
+        match = request.resolver_match
+        route = f'/{match.route}' if match else 'unmatched'
+        metrics.observe(measured, route, request.method, response_bytes)
+
+        duration_ms = measured.duration * 1000
+        level = logging.WARNING if duration_ms > settings.PERFORMANCE_SLOW_REQUEST_MS else logging.INFO
+        if logger.isEnabledFor(level):
+            logger.log(level, json.dumps({
+                'method': request.method,
+                'path': request.path,
+                'route': route,
+                'status': response.status_code,
+                'duration_ms': round(duration_ms, 2),
+                'db_queries': measured.db_queries,
+                'db_ms': round(measured.db_time * 1000, 2),
+                'serializer_ms': round(measured.timings.get('serializer', 0.0) * 1000, 2),
+                'markdown_ms': round(measured.timings.get('markdown', 0.0) * 1000, 2),
+                'response_bytes': response_bytes,
+                'cache': response.get('X-Cache'),
+            }))
+
+
+def server_timing(measured):
+    """The Server-Timing header value of a finished request (durations in milliseconds)"""
+    entries = [
+        f'total;dur={measured.duration * 1000:.2f}',
+        f'db;dur={measured.db_time * 1000:.2f};desc="{measured.db_queries} queries"',
+    ]
+    for name in ('serializer', 'markdown'):
+        if name in measured.timings:
+            entries.append(f'{name};dur={measured.timings[name] * 1000:.2f}')
+    return ', '.join(entries)
+
+
+def count(chunks, done):
+    sent = 0
+    try:
+        for chunk in chunks:
+            sent += len(chunk)
+            yield chunk
+    finally:
+        done(sent)
+
+
+async def count_async(chunks, done):
+    sent = 0
+    try:
+        async for chunk in chunks:
+            sent += len(chunk)
+            yield chunk
+    finally:
+        done(sent)
@@ -0,0 +1,136 @@
+"""
+Read-replica routing.
+
+ReplicaRoutingMiddleware decides per request where reads go: the reads of a GET, HEAD or
+OPTIONS request go to one of DATABASE_READ_REPLICAS, everything else to the primary
+('default'). A client that wrote something reads from the primary for the next
+DATABASE_REPLICA_STICKY_SECONDS, so it sees its own writes while the replicas catch up.
+A write pins both the client's Authorization header and its address, found behind
+NUM_PROXIES proxies the way the throttles find it: logging in is a write without the token
+the client goes on to use, so the address is what carries the pin over. The pins are kept in
+the default cache, so they hold across processes when it's shared.
+
+reads_replica() tells code running in a request whether its reads may lag behind the primary.
+
+Outside a request (management commands, the shell, tests) every query goes to the primary.
+"""
+
+import hashlib
+import random
+from contextvars import ContextVar
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from rest_framework.throttling import BaseThrottle
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class Routing:
+    """Where the current request reads from, and whether it has written"""
+
+    def __init__(self, replica):
+        self.replica = replica
+        self.wrote = False
+
+
+_routing = ContextVar('replica_routing', default=None)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        routing = _routing.get()
+        if routing is None or routing.replica is None or routing.wrote:
+            return DEFAULT_DB_ALIAS
+        return routing.replica
+
+    def db_for_write(self, model, **hints):
+        routing = _routing.get()
+        if routing is not None:
+            # later reads of this request must see the write
+            routing.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *settings.DATABASE_READ_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # replicas get their schema from the primary
+        if db in settings.DATABASE_READ_REPLICAS:
+            return False
+        return None
+
+
+def pin_key(credentials):
+    return 'replica:pin:' + hashlib.sha256(credentials.encode()).hexdigest()
+
+
+def client_keys(request):
+    """The pin keys of a request's client: its address, and its Authorization header if it has one"""
+    keys = [pin_key(BaseThrottle().get_ident(request))]
+    if request.META.get('HTTP_AUTHORIZATION'):
+        keys.append(pin_key(request.META['HTTP_AUTHORIZATION']))
+    return keys
+
+
+def reads_replica():
+    """Whether the current request reads from a replica, which may still lack the latest writes"""
+    routing = _routing.get()
+    return routing is not None and routing.replica is not None and not routing.wrote
+
+
+class ReplicaRoutingMiddleware:
+    """Route the reads of safe requests to a replica, pinning clients that write to the primary"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        routing = Routing(
+            self.pick() if self.reads_from_replica(request) and not cache.get_many(client_keys(request)) else None
+        )
+        token = _routing.set(routing)
+        try:
+            return self.get_response(request)
+        finally:
+            _routing.reset(token)
+            if self.pins(request, routing):
+                cache.set_many(self.pinned(request), settings.DATABASE_REPLICA_STICKY_SECONDS)
+
+    async def __acall__(self, request):
+        routing = Routing(
+            self.pick() if self.reads_from_replica(request) and not await cache.aget_many(client_keys(request)) else None
+        )
+        token = _routing.set(routing)
+        try:
+            return await self.get_response(request)
+        finally:
+            _routing.reset(token)
+            if self.pins(request, routing):
+                await cache.aset_many(self.pinned(request), settings.DATABASE_REPLICA_STICKY_SECONDS)
+
+    def reads_from_replica(self, request):
+        """Whether the request may read from a replica, unless its client is pinned to the primary"""
+        return bool(settings.DATABASE_READ_REPLICAS) and request.method in SAFE_METHODS
+
+    def pick(self):
+        return random.choice(settings.DATABASE_READ_REPLICAS)
+
+    def pins(self, request, routing):
+        """Whether the client has to read from the primary for a while"""
+        return bool(settings.DATABASE_READ_REPLICAS) and (routing.wrote or request.method not in SAFE_METHODS)
+
+    def pinned(self, request):
+        """The cache entries pinning the request's client"""
+        return dict.fromkeys(client_keys(request), True)
@@ -13,6 +13,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 from pathlib import Path
 import os
 from dotenv import load_dotenv
+from config.database import database_config, replica_configs
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -65,14 +66,53 @@ INSTALLED_APPS = [
 # authentication settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        # TokenAuthentication, with recent token lookups cached (see users/authentication.py)
+        'users.authentication.CachedTokenAuthentication',
         # 'rest_framework.authentication.SessionAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
     ],
+    # sliding-window rate limits (see config/throttling.py); endpoints can pick others with throttle_classes
+    'DEFAULT_THROTTLE_CLASSES': [
+        'config.throttling.AnonReadThrottle',
+        'config.throttling.UserWriteThrottle',
+    ],
+    # proxies in front of the app, whose X-Forwarded-For entries identify anonymous clients
+    'NUM_PROXIES': int(os.getenv('NUM_PROXIES')) if os.getenv('NUM_PROXIES') else None,
+}
+
+# requests per scope, as 'number/period' (s, min, hour or day)
+THROTTLE_ENABLED = os.getenv('THROTTLE_ENABLED', 'True') == 'True'
+THROTTLE_RATES = {
+    'anon_read': os.getenv('THROTTLE_ANON_READ_RATE', '300/min'),
+    'user_write': os.getenv('THROTTLE_USER_WRITE_RATE', '60/min'),
+    'oauth_callback': os.getenv('THROTTLE_OAUTH_CALLBACK_RATE', '10/min'),
 }
 
+# blog post list pagination
+BLOG_PAGE_SIZE = int(os.getenv('BLOG_PAGE_SIZE', '20'))
+BLOG_MAX_PAGE_SIZE = int(os.getenv('BLOG_MAX_PAGE_SIZE', '100'))
+# comment list pagination, and how many replies each thread shows in ?threaded=true listings
+COMMENTS_PAGE_SIZE = int(os.getenv('COMMENTS_PAGE_SIZE', '50'))
+COMMENTS_THREAD_REPLIES = int(os.getenv('COMMENTS_THREAD_REPLIES', '3'))
+COMMENTS_MAX_THREAD_REPLIES = 20
+COMMENTS_MAX_DEPTH = 8
+# the most comments one bulk delete request may select (their replies are deleted too)
+COMMENTS_BULK_DELETE_LIMIT = int(os.getenv('COMMENTS_BULK_DELETE_LIMIT', '1000'))
+# rows validated and inserted per transaction by the JSONL import, and rows fetched per query by the export
+BLOG_BULK_BATCH_SIZE = int(os.getenv('BLOG_BULK_BATCH_SIZE', '500'))
+# invalid rows listed in an import's report; the rest are only counted
+BLOG_IMPORT_MAX_ERRORS = int(os.getenv('BLOG_IMPORT_MAX_ERRORS', '100'))
+# processes rendering Markdown for batches of posts (imports, render_posts), and the smallest batch
+# worth sending to them; smaller batches, or any batch with BLOG_RENDER_WORKERS <= 1, render in-process
+BLOG_RENDER_WORKERS = int(os.getenv('BLOG_RENDER_WORKERS', str(min(4, os.cpu_count() or 1))))
+BLOG_PARALLEL_RENDER_THRESHOLD = int(os.getenv('BLOG_PARALLEL_RENDER_THRESHOLD', '32'))
+# reject blog post updates that don't carry an If-Match header with the ETag the editor last read
+BLOG_REQUIRE_IF_MATCH = os.getenv('BLOG_REQUIRE_IF_MATCH', 'False') == 'True'
+# related posts kept per post (see blog/related.py); run rebuild_related_posts after changing it
+BLOG_RELATED_POSTS = int(os.getenv('BLOG_RELATED_POSTS', '5'))
+
 # for OAuth
 SITE_ID = 1
 AUTHENTICATION_BACKENDS = (
@@ -92,11 +132,27 @@ ACCOUNT_ADAPTER = 'allauth.account.adapter.DefaultAccountAdapter'
 # OAuth settings
 GITHUB_CLIENT_ID = os.getenv('GITHUB_CLIENT_ID')
 GITHUB_CLIENT_SECRET = os.getenv('GITHUB_CLIENT_SECRET')
+# where the OAuth flow and the REST API live (point both at users.testing.GitHubStub to run offline)
+GITHUB_OAUTH_URL = os.getenv('GITHUB_OAUTH_URL', 'https://github.com')
+GITHUB_API_URL = os.getenv('GITHUB_API_URL', 'https://api.github.com')
+# seconds to wait for a connection and then for each read, so a slow GitHub can't hold a worker
+GITHUB_CONNECT_TIMEOUT = float(os.getenv('GITHUB_CONNECT_TIMEOUT', '3.05'))
+GITHUB_READ_TIMEOUT = float(os.getenv('GITHUB_READ_TIMEOUT', '10'))
+# retries of failed connections and 5xx responses, with exponential backoff between them
+GITHUB_MAX_RETRIES = int(os.getenv('GITHUB_MAX_RETRIES', '2'))
+GITHUB_RETRY_BACKOFF = float(os.getenv('GITHUB_RETRY_BACKOFF', '0.3'))
+# keep-alive connections (and threads fetching concurrently) per process
+GITHUB_POOL_SIZE = int(os.getenv('GITHUB_POOL_SIZE', '10'))
 CORS_ALLOW_CREDENTIALS = True
 CORS_ALLOWED_ORIGINS = os.getenv('CORS_ALLOWED_ORIGINS', 'http://localhost:3000').split(',')
 
 
 MIDDLEWARE = [
+    # first, so its timings include every other middleware
+    'config.middleware.PerformanceMiddleware',
+    # before anything that queries, so those queries are routed
+    'config.routers.ReplicaRoutingMiddleware',
+    'config.throttling.RateLimitHeadersMiddleware',
     'corsheaders.middleware.CorsMiddleware', 
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -134,11 +190,80 @@ WSGI_APPLICATION = 'config.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# SQLite in the backend directory by default; see config/database.py for the DATABASE_URL forms
+# and the DATABASE_* settings tuning its connections
+
 DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+    'default': database_config(os.getenv('DATABASE_URL', 'sqlite:///db.sqlite3'), BASE_DIR, os.environ),
+}
+
+# read replicas for the reads of GET requests (see config/routers.py), as comma-separated URLs;
+# to try them locally, point one at a copy of the SQLite database: sqlite:///replica.sqlite3
+DATABASES.update(replica_configs(os.getenv('DATABASE_REPLICA_URLS', ''), BASE_DIR, os.environ))
+DATABASE_READ_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['config.routers.ReplicaRouter']
+# seconds a client that wrote something keeps reading from the primary, longer than the usual replication lag
+DATABASE_REPLICA_STICKY_SECONDS = int(os.getenv('DATABASE_REPLICA_STICKY_SECONDS', '5'))
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# local memory by default; set REDIS_URL to share the cache between processes and hosts
+
+if os.getenv('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('REDIS_URL'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'OPTIONS': {'MAX_ENTRIES': 10000},
+        }
     }
+
+# token lookups remembered by users.authentication.CachedTokenAuthentication: for how many seconds,
+# how many per process, and in which shared cache (none unless the cache is shared between processes)
+AUTH_TOKEN_CACHE_TTL = int(os.getenv('AUTH_TOKEN_CACHE_TTL', '30'))
+AUTH_TOKEN_CACHE_SIZE = int(os.getenv('AUTH_TOKEN_CACHE_SIZE', '1024'))
+AUTH_TOKEN_CACHE_ALIAS = os.getenv('AUTH_TOKEN_CACHE_ALIAS', 'default' if os.getenv('REDIS_URL') else '') or None
+
+# read endpoint response cache (see blog/response_cache.py)
+RESPONSE_CACHE_ENABLED = os.getenv('RESPONSE_CACHE_ENABLED', 'True') == 'True'
+RESPONSE_CACHE_ALIAS = 'default'
+RESPONSE_CACHE_TIMEOUT = int(os.getenv('RESPONSE_CACHE_TIMEOUT', '300'))
+
+
+# per-request performance measurements (see config/middleware.py)
+PERFORMANCE_METRICS_ENABLED = os.getenv('PERFORMANCE_METRICS_ENABLED', 'True') == 'True'
+# Server-Timing headers show where a request spent its time to anyone, so they're off in production by default
+PERFORMANCE_SERVER_TIMING = os.getenv('PERFORMANCE_SERVER_TIMING', str(DEBUG)) == 'True'
+# requests slower than this are logged at WARNING, the others at INFO
+PERFORMANCE_SLOW_REQUEST_MS = float(os.getenv('PERFORMANCE_SLOW_REQUEST_MS', '1000'))
+# addresses allowed to scrape /metrics ('*' for any), none by default. Behind a reverse proxy on
+# the same host every request comes from the proxy's address (usually 127.0.0.1), so allowing it
+# would open /metrics to the internet: use METRICS_TOKEN instead, or block /metrics at the proxy.
+METRICS_ALLOWED_IPS = [ip.strip() for ip in os.getenv('METRICS_ALLOWED_IPS', '').split(',') if ip.strip()]
+# a scraper sending `Authorization: Bearer <token>` is allowed from any address
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        # one JSON line per request; set PERFORMANCE_LOG_LEVEL=INFO to log every request, not just slow ones
+        'performance': {
+            'handlers': ['console'],
+            'level': os.getenv('PERFORMANCE_LOG_LEVEL', 'WARNING'),
+            'propagate': False,
+        },
+    },
 }
 
 
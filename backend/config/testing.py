@@ -0,0 +1,67 @@
+"""
+Shared test helpers for the project's apps.
+"""
+
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
+
+# Maximum number of SQL queries each endpoint may issue for a single request,
+# regardless of how many rows it returns. Keyed by URL name.
+QUERY_BUDGETS = {
+    'blog-list': 1,
+    'blog-detail': 1,
+    'user-posts': 1,
+    # the index rows joined with their posts; a post without related posts is checked for existence
+    'blog-related': 2,
+    'comment-list': 2,
+    # top-level comments, plus one windowed query for the first replies of every thread
+    'comment-list-threaded': 3,
+    'comment-detail': 1,
+    # permission check, locking select of the subtrees, delete, counter update and cache invalidation
+    # (plus the savepoint around them)
+    'comment-bulk-delete': 7,
+}
+
+
+class QueryBudgetMixin:
+    """
+    Assertions that keep per-endpoint query counts bounded.
+    Mix into an APITestCase/TestCase that has `self.client`.
+    Requests are made with the response cache off, so the budgets cover the uncached path.
+    """
+
+    def assertQueryBudget(self, url, method='get', budget=None, **kwargs):
+        """
+        Request `url` and fail if it issues more queries than its budget in QUERY_BUDGETS.
+        Returns the response so the caller can make further assertions.
+        """
+        if budget is None:
+            budget = QUERY_BUDGETS[resolve(url.split('?')[0]).url_name]
+        with override_settings(RESPONSE_CACHE_ENABLED=False), CaptureQueriesContext(connection) as queries:
+            response = getattr(self.client, method)(url, **kwargs)
+        executed = '\n'.join(query['sql'] for query in queries.captured_queries)
+        self.assertLessEqual(
+            len(queries),
+            budget,
+            f'{method.upper()} {url} issued {len(queries)} queries, budget is {budget}:\n{executed}'
+        )
+        return response
+
+    def assertConstantQueries(self, url, add_rows, method='get', **kwargs):
+        """
+        Fail if the number of queries for `url` changes after `add_rows()` adds more data,
+        which usually means a lazy relation is loaded once per row (N+1).
+        """
+        with override_settings(RESPONSE_CACHE_ENABLED=False):
+            with CaptureQueriesContext(connection) as before:
+                getattr(self.client, method)(url, **kwargs)
+            add_rows()
+            with CaptureQueriesContext(connection) as after:
+                getattr(self.client, method)(url, **kwargs)
+        self.assertEqual(
+            len(before),
+            len(after),
+            f'{method.upper()} {url} went from {len(before)} to {len(after)} queries as rows were added'
+        )
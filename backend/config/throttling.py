@@ -0,0 +1,165 @@
+"""
+Request throttling with a sliding-window counter.
+
+DRF's SimpleRateThrottle keeps the timestamp of every request in the window, so a client
+allowed 300 requests a minute costs a 300-item list, read and rewritten on every request.
+SlidingWindowThrottle keeps two integers per client instead: the number of requests in the
+current fixed window and in the previous one. A request is allowed while
+
+    previous * (share of the previous window still inside the sliding window) + current < limit
+
+which follows a true sliding window closely, without the burst at window edges a plain
+fixed window allows.
+
+Scopes and their rates (THROTTLE_RATES, e.g. '300/min'; None turns a scope off):
+
+    anon_read       unauthenticated GET/HEAD/OPTIONS requests, per client address
+    user_write      authenticated requests of any other method, per user
+    oauth_callback  the GitHub login callback, per client address
+
+The first two apply to every API view (DEFAULT_THROTTLE_CLASSES); an endpoint picks other
+scopes with `throttle_classes`. Throttled requests get a 429 with Retry-After, and
+RateLimitHeadersMiddleware adds X-RateLimit-Limit/Remaining/Reset to throttled endpoints'
+responses. Counters live in the default cache, so they're per process unless it's shared.
+"""
+
+import math
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from rest_framework.throttling import SimpleRateThrottle
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class SlidingWindowThrottle(SimpleRateThrottle):
+    cache_format = 'throttle:%(scope)s:%(ident)s'
+
+    def get_rate(self):
+        # read at request time, so the rates follow the settings (DRF caches its own at import)
+        if not settings.THROTTLE_ENABLED:
+            return None
+        return settings.THROTTLE_RATES.get(self.scope)
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        key = self.get_cache_key(request, view)
+        if key is None:
+            return True
+        keys = self.window_keys(key)
+        counts = self.cache.get_many(keys)
+        if not self.check(request, counts.get(keys[0], 0), counts.get(keys[1], 0)):
+            return False
+        # counters outlive their window by one, while they still weigh on the next
+        self.cache.add(keys[1], 0, self.duration * 2)
+        self.cache.incr(keys[1])
+        return True
+
+    async def aallow_request(self, request, view):
+        """allow_request for async views, with the async cache API"""
+        if self.rate is None:
+            return True
+        key = self.get_cache_key(request, view)
+        if key is None:
+            return True
+        keys = self.window_keys(key)
+        counts = await self.cache.aget_many(keys)
+        if not self.check(request, counts.get(keys[0], 0), counts.get(keys[1], 0)):
+            return False
+        await self.cache.aadd(keys[1], 0, self.duration * 2)
+        await self.cache.aincr(keys[1])
+        return True
+
+    def window_keys(self, key):
+        """The keys of the previous and the current window's counters"""
+        self.now = self.timer()
+        self.window = int(self.now // self.duration)
+        return [f'{key}:{self.window - 1}', f'{key}:{self.window}']
+
+    def check(self, request, previous, current):
+        """Whether another request fits the limit; records the outcome for wait() and the headers"""
+        self.elapsed = self.now - self.window * self.duration
+        self.previous, self.current = previous, current
+        estimate = previous * (1 - self.elapsed / self.duration) + current
+        allowed = estimate < self.num_requests
+        remaining = max(0, math.floor(self.num_requests - estimate - 1)) if allowed else 0
+        record(request, self.num_requests, remaining, math.ceil(self.duration - self.elapsed))
+        return allowed
+
+    def wait(self):
+        """Seconds until the estimate falls below the limit, assuming no further requests are let in"""
+        limit = self.num_requests
+        if self.current < limit and self.previous:
+            # within this window, once enough of the previous one has slid out
+            wait = self.duration * (1 - (limit - self.current) / self.previous) - self.elapsed
+            if self.elapsed + wait < self.duration:
+                return max(wait, 0)
+        # in the next window, once enough of this one has slid out
+        sliding = self.duration * (1 - limit / self.current) if self.current > limit else 0
+        return self.duration - self.elapsed + sliding
+
+
+class AnonReadThrottle(SlidingWindowThrottle):
+    """Unauthenticated safe requests, per client address"""
+    scope = 'anon_read'
+
+    def get_cache_key(self, request, view):
+        if request.method not in SAFE_METHODS or request.user.is_authenticated:
+            return None
+        return self.cache_format % {'scope': self.scope, 'ident': self.get_ident(request)}
+
+
+class UserWriteThrottle(SlidingWindowThrottle):
+    """Authenticated unsafe requests, per user"""
+    scope = 'user_write'
+
+    def get_cache_key(self, request, view):
+        if request.method in SAFE_METHODS or not request.user.is_authenticated:
+            return None
+        return self.cache_format % {'scope': self.scope, 'ident': request.user.pk}
+
+
+class OAuthCallbackThrottle(SlidingWindowThrottle):
+    """Every request to the endpoint, per client address"""
+    scope = 'oauth_callback'
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {'scope': self.scope, 'ident': self.get_ident(request)}
+
+
+def record(request, limit, remaining, reset):
+    """Keep the tightest limit checked for a request, for RateLimitHeadersMiddleware"""
+    request = getattr(request, '_request', request)
+    current = getattr(request, 'rate_limit', None)
+    if current is None or remaining < current[1]:
+        request.rate_limit = (limit, remaining, reset)
+
+
+class RateLimitHeadersMiddleware:
+    """Add the rate limit a request was checked against to its response"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        return add_headers(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return add_headers(request, await self.get_response(request))
+
+
+def add_headers(request, response):
+    rate_limit = getattr(request, 'rate_limit', None)
+    if rate_limit is not None:
+        limit, remaining, reset = rate_limit
+        response['X-RateLimit-Limit'] = str(limit)
+        response['X-RateLimit-Remaining'] = str(remaining)
+        response['X-RateLimit-Reset'] = str(reset)
+    return response
@@ -0,0 +1,148 @@
+"""
+Token authentication that remembers recent token lookups.
+
+DRF's TokenAuthentication loads the token and its user (a Token JOIN User query) on every
+authenticated request. CachedTokenAuthentication keeps the result for AUTH_TOKEN_CACHE_TTL
+seconds in a bounded in-process LRU and, when AUTH_TOKEN_CACHE_ALIAS names a cache, in that
+shared cache too, so other processes can skip the query as well.
+
+Entries are dropped when the token is deleted (logout) and when its user is saved or deleted
+(see users.signals). Those drops reach the shared cache and this process's LRU; the LRUs of
+other processes keep a dropped entry until it expires, so the TTL is the longest a revoked
+token can keep working there.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, router, transaction
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+User = get_user_model()
+
+# the user columns kept in the cache; the password hash never leaves the database
+USER_FIELDS = [field.attname for field in User._meta.concrete_fields if field.attname != 'password']
+
+
+class LRUCache:
+    """A thread-safe LRU mapping of at most `maxsize` entries, each expiring after its own TTL"""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+_local = LRUCache(settings.AUTH_TOKEN_CACHE_SIZE)
+
+
+def cache_key(token_key):
+    return f'auth:token:{token_key}'
+
+
+def get_shared_cache():
+    alias = settings.AUTH_TOKEN_CACHE_ALIAS
+    return caches[alias] if alias else None
+
+
+def remember(token):
+    """Cache a token looked up with its user"""
+    entry = (token.created, [getattr(token.user, name) for name in USER_FIELDS])
+    _local.set(token.key, entry, settings.AUTH_TOKEN_CACHE_TTL)
+    shared = get_shared_cache()
+    if shared is not None:
+        shared.set(cache_key(token.key), entry, settings.AUTH_TOKEN_CACHE_TTL)
+
+
+def recall(key):
+    """
+    Return the cached (user, token) of a token key, or None.
+    Every call builds new instances, so a request that changes its user can't affect another's.
+    """
+    entry = _local.get(key)
+    if entry is None:
+        shared = get_shared_cache()
+        entry = shared.get(cache_key(key)) if shared is not None else None
+        if entry is None:
+            return None
+        _local.set(key, entry, settings.AUTH_TOKEN_CACHE_TTL)
+    created, values = entry
+    db = router.db_for_read(Token) or DEFAULT_DB_ALIAS
+    user = User.from_db(db, USER_FIELDS, values)
+    token = Token.from_db(db, ['key', 'user_id', 'created'], [key, user.pk, created])
+    # also caches user.auth_token, so logging out doesn't query for the token again
+    token.user = user
+    return user, token
+
+
+def forget(*keys):
+    """
+    Drop cached tokens, now and again once the current transaction commits, so a request
+    that read the token before the delete committed can't cache it again.
+    """
+    def drop():
+        shared = get_shared_cache()
+        for key in keys:
+            _local.delete(key)
+        if shared is not None:
+            shared.delete_many([cache_key(key) for key in keys])
+
+    if keys:
+        drop()
+        transaction.on_commit(drop)
+
+
+def forget_user(user):
+    """Drop the cached tokens of a user"""
+    forget(*Token.objects.filter(user_id=user.pk).values_list('key', flat=True))
+
+
+def clear():
+    """Drop this process's cached tokens (the shared cache is left alone)"""
+    _local.clear()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication answering repeated lookups of the same token from a cache"""
+
+    def authenticate_credentials(self, key):
+        cached = recall(key)
+        if cached is not None:
+            return cached
+        user, token = super().authenticate_credentials(key)
+        remember(token)
+        return user, token
@@ -1,38 +1,108 @@
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from django.conf import settings
 from django.contrib.auth import get_user_model
-import uuid
+from django.core.signals import setting_changed
+from django.dispatch import receiver
 
 User = get_user_model()
 
+# one keep-alive session and fetch pool per process, created on first use
+_session = None
+_executor = None
+_lock = threading.Lock()
+
+
+def get_session():
+    """
+    Return the shared HTTP session for GitHub calls.
+    Its connection pool keeps connections to GitHub alive between logins, and it retries
+    failed connections and 5xx responses with exponential backoff. POSTs are only retried
+    when the connection failed, since an OAuth code can't be exchanged twice.
+    """
+    global _session
+    with _lock:
+        if _session is None:
+            retry = Retry(
+                total=settings.GITHUB_MAX_RETRIES,
+                backoff_factor=settings.GITHUB_RETRY_BACKOFF,
+                status_forcelist=(500, 502, 503, 504),
+                raise_on_status=False,
+            )
+            adapter = HTTPAdapter(
+                pool_connections=2,
+                pool_maxsize=settings.GITHUB_POOL_SIZE,
+                max_retries=retry,
+            )
+            session = requests.Session()
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            session.headers['Accept'] = 'application/json'
+            _session = session
+        return _session
+
+
+def get_executor():
+    """Return the thread pool used to make independent GitHub calls concurrently"""
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=settings.GITHUB_POOL_SIZE, thread_name_prefix='github')
+        return _executor
+
+
+def close_session():
+    """Drop the shared session and pool, so the next call builds them from the current settings"""
+    global _session, _executor
+    with _lock:
+        if _session is not None:
+            _session.close()
+        if _executor is not None:
+            _executor.shutdown(wait=False)
+        _session = _executor = None
+
+
+@receiver(setting_changed)
+def reset_session_on_setting_change(setting, **kwargs):
+    if setting.startswith('GITHUB_'):
+        close_session()
+
+
+def timeout():
+    return (settings.GITHUB_CONNECT_TIMEOUT, settings.GITHUB_READ_TIMEOUT)
+
+
 def get_github_token(code):
     """Exchange code for access token"""
     try:
         print(f"Attempting to exchange code for token with GitHub...")
-        resp = requests.post(
-            'https://github.com/login/oauth/access_token',
+        resp = get_session().post(
+            f'{settings.GITHUB_OAUTH_URL}/login/oauth/access_token',
             data={
                 'client_id': settings.GITHUB_CLIENT_ID,
                 'client_secret': settings.GITHUB_CLIENT_SECRET,
                 'code': code,
             },
-            headers={'Accept': 'application/json'}
+            timeout=timeout()
         )
         resp.raise_for_status()
         response_data = resp.json()
-        print(f"GitHub token response: {response_data}")
-        
+
         if 'error' in response_data:
             error_msg = f"GitHub returned an error: {response_data['error']}"
             print(error_msg)
             raise Exception(error_msg)
-            
+
         access_token = response_data.get('access_token')
         if not access_token:
             error_msg = "No access_token in GitHub response"
             print(error_msg)
             raise Exception(error_msg)
-            
+
         return access_token
     except requests.exceptions.RequestException as e:
         error_msg = f"Network error while getting GitHub token: {str(e)}"
@@ -43,18 +113,19 @@ def get_github_token(code):
         print(error_msg)
         raise
 
+def _get_api(path, access_token):
+    resp = get_session().get(
+        f'{settings.GITHUB_API_URL}{path}',
+        headers={'Authorization': f'token {access_token}'},
+        timeout=timeout()
+    )
+    resp.raise_for_status()  # Raise an exception for bad status codes
+    return resp.json()
+
 def get_github_user(access_token):
     """Get GitHub user information"""
     try:
-        resp = requests.get(
-            'https://api.github.com/user',
-            headers={
-                'Authorization': f'token {access_token}',
-                'Accept': 'application/json',
-            }
-        )
-        resp.raise_for_status()  # Raise an exception for bad status codes
-        return resp.json()
+        return _get_api('/user', access_token)
     except requests.exceptions.RequestException as e:
         print(f"Error fetching GitHub user: {str(e)}")
         return None
@@ -62,25 +133,26 @@ def get_github_user(access_token):
 def get_github_emails(access_token):
     """Get user's GitHub email addresses"""
     try:
-        resp = requests.get(
-            'https://api.github.com/user/emails',
-            headers={
-                'Authorization': f'token {access_token}',
-                'Accept': 'application/json',
-            }
-        )
-        resp.raise_for_status()
-        return resp.json()
+        return _get_api('/user/emails', access_token)
     except requests.exceptions.RequestException as e:
         print(f"Error fetching GitHub emails: {str(e)}")
         return []
 
-def get_or_create_user(github_user, access_token):
+def get_github_profile(access_token):
+    """
+    Get the user's GitHub information and email addresses.
+    Both are fetched at the same time, so a login waits for the slower call rather than for both.
+    """
+    executor = get_executor()
+    user = executor.submit(get_github_user, access_token)
+    emails = executor.submit(get_github_emails, access_token)
+    return user.result(), emails.result()
+
+def get_or_create_user(github_user, emails):
     """Get existing user or create new one based on GitHub data"""
     email = github_user.get('email')
     if not email:
-        # If email is private, try to get primary email from email endpoint
-        emails = get_github_emails(access_token)
+        # If email is private, use the primary address from the email endpoint
         primary_email = next(
             (email['email'] for email in emails if email['primary']),
             None
@@ -92,11 +164,11 @@ def get_or_create_user(github_user, access_token):
         try:
             user = User.objects.get(email=email)
             print(f"Found existing user with email: {email}")
-            
+
             if user.username != github_user['login']:
                 user.username = github_user['login']
                 user.save()
-                
+
         except User.DoesNotExist:
             random_password = str(uuid.uuid4())  # generate a random password
             user = User.objects.create_user(
@@ -105,9 +177,9 @@ def get_or_create_user(github_user, access_token):
                 password=random_password
             )
             print(f"Created new user with email: {email}")
-            
+
         return user
-        
+
     except Exception as e:
         print(f"Error creating/getting user: {str(e)}")
         raise
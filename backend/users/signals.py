@@ -0,0 +1,20 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+from . import authentication
+
+User = get_user_model()
+
+
+@receiver(post_delete, sender=Token)
+def forget_deleted_token(sender, instance, **kwargs):
+    # logging out deletes the token; deleting a user deletes theirs through the cascade
+    authentication.forget(instance.key)
+
+
+@receiver(post_save, sender=User)
+def forget_tokens_of_changed_user(sender, instance, created, **kwargs):
+    # a cached user would otherwise keep its old permissions and details for the rest of the TTL
+    if not created:
+        authentication.forget_user(instance)
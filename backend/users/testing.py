@@ -0,0 +1,152 @@
+"""
+A local stand-in for GitHub's OAuth and REST endpoints, so the GitHub login flow can be
+tested and load-tested offline.
+
+In tests:
+
+    with GitHubStub(delay=0.1) as github, override_settings(**github.settings()):
+        client.post('/users/github/callback/', {'code': 'any'})
+
+From the command line, for load tests against a running server started with
+GITHUB_OAUTH_URL and GITHUB_API_URL pointing at it:
+
+    python -m users.testing --port 8765 --delay 0.05
+"""
+
+import argparse
+import json
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class GitHubStub:
+    """
+    Threaded HTTP server answering the three calls the login flow makes:
+    POST /login/oauth/access_token, GET /user and GET /user/emails.
+
+    `delay` is added to every response (or a {path: seconds} dict per path),
+    `failures` makes a path answer 503 that many times before succeeding, and
+    `email` is the public profile address (None makes it private, like most accounts).
+    `requests` counts the requests per path and `max_in_flight` records how many were
+    served at the same time.
+    """
+
+    def __init__(self, login='octocat', email=None, primary_email='octocat@example.com',
+                 delay=0, failures=None, host='127.0.0.1', port=0):
+        self.login = login
+        self.email = email
+        self.primary_email = primary_email
+        self.delay = delay
+        self.failures = Counter(failures or {})
+        self.requests = Counter()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), self._handler_class())
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def settings(self):
+        """The settings that point the GitHub client at this stub"""
+        return {'GITHUB_OAUTH_URL': self.url, 'GITHUB_API_URL': self.url}
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def respond(self, method, path):
+        """Return the (status, body) of a request"""
+        with self._lock:
+            self.requests[path] += 1
+            if self.failures[path] > 0:
+                self.failures[path] -= 1
+                return 503, {'message': 'Service unavailable'}
+        if method == 'POST' and path == '/login/oauth/access_token':
+            return 200, {'access_token': f'stub-token-{self.login}', 'token_type': 'bearer', 'scope': 'user:email'}
+        if method == 'GET' and path == '/user':
+            return 200, {'login': self.login, 'id': 1, 'email': self.email}
+        if method == 'GET' and path == '/user/emails':
+            return 200, [
+                {'email': self.primary_email, 'primary': True, 'verified': True},
+                {'email': f'{self.login}@users.noreply.github.com', 'primary': False, 'verified': True},
+            ]
+        return 404, {'message': 'Not Found'}
+
+    def _handler_class(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def handle_request(self, method):
+                length = int(self.headers.get('Content-Length') or 0)
+                if length:
+                    self.rfile.read(length)
+                path = self.path.split('?')[0]
+                with stub._lock:
+                    stub.in_flight += 1
+                    stub.max_in_flight = max(stub.max_in_flight, stub.in_flight)
+                try:
+                    delay = stub.delay.get(path, 0) if isinstance(stub.delay, dict) else stub.delay
+                    if delay:
+                        time.sleep(delay)
+                    status, body = stub.respond(method, path)
+                finally:
+                    with stub._lock:
+                        stub.in_flight -= 1
+                payload = json.dumps(body).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_GET(self):
+                self.handle_request('GET')
+
+            def do_POST(self):
+                self.handle_request('POST')
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Serve a stub of the GitHub OAuth and user APIs')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--delay', type=float, default=0, help='seconds added to every response')
+    args = parser.parse_args(argv)
+
+    stub = GitHubStub(delay=args.delay, host=args.host, port=args.port)
+    print(f'GitHub stub listening on {stub.url}; set GITHUB_OAUTH_URL and GITHUB_API_URL to it')
+    try:
+        stub.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stub.server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,8 +1,16 @@
+import time
 from django.urls import reverse
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from rest_framework import status
+from rest_framework.authtoken.models import Token
 from rest_framework.test import APITestCase
 from allauth.account.models import EmailAddress
+from . import authentication
+from .testing import GitHubStub
 
 User = get_user_model()
 
@@ -127,4 +135,132 @@ class AuthAPITestCase(APITestCase):
         logout_response = self.client.post(self.logout_url, {}, format='json')
         self.assertEqual(logout_response.status_code, status.HTTP_200_OK)
         self.assertIn('detail', logout_response.data)
-        self.assertEqual(logout_response.data['detail'], 'Successfully logged out.')
\ No newline at end of file
+        self.assertEqual(logout_response.data['detail'], 'Successfully logged out.')
+
+class CachedTokenAuthenticationTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        authentication.clear()
+        self.user = User.objects.create_user(username='cached', email='cached@example.com', password='CachedPass123!')
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        self.url = reverse('rest_user_details')
+
+    def get(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url)
+        token_queries = [q['sql'] for q in queries.captured_queries if 'authtoken_token' in q['sql']]
+        return response, token_queries
+
+    def test_repeated_requests_skip_the_token_query(self):
+        response, token_queries = self.get()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(token_queries), 1)
+        response, token_queries = self.get()
+        self.assertEqual(response.data['email'], 'cached@example.com')
+        self.assertEqual(token_queries, [])
+
+    def test_password_hash_is_not_cached(self):
+        self.get()
+        created, values = authentication._local.get(self.token.key)
+        self.assertNotIn(self.user.password, values)
+
+    def test_logout_revokes_cached_token(self):
+        self.get()
+        self.assertEqual(self.client.post(reverse('rest_logout')).status_code, status.HTTP_200_OK)
+        self.assertFalse(Token.objects.filter(key=self.token.key).exists())
+        response, _ = self.get()
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deleted_user_is_rejected(self):
+        self.get()
+        self.user.delete()
+        response, _ = self.get()
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_changed_user_is_reloaded(self):
+        self.get()
+        self.user.email = 'renamed@example.com'
+        self.user.save()
+        response, token_queries = self.get()
+        self.assertEqual(response.data['email'], 'renamed@example.com')
+        self.assertEqual(len(token_queries), 1)
+
+    def test_saving_cached_user_keeps_password(self):
+        self.get()
+        user, token = authentication.recall(self.token.key)
+        self.assertEqual(user.auth_token, token)
+        user.username = 'saved'
+        user.save(update_fields=['username'])
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.username, 'saved')
+        self.assertTrue(self.user.check_password('CachedPass123!'))
+        self.assertIsNone(authentication.recall(self.token.key))
+
+    @override_settings(AUTH_TOKEN_CACHE_TTL=0)
+    def test_entries_expire(self):
+        self.get()
+        _, token_queries = self.get()
+        self.assertEqual(len(token_queries), 1)
+
+    @override_settings(AUTH_TOKEN_CACHE_ALIAS='default')
+    def test_shared_cache_serves_other_processes(self):
+        self.get()
+        authentication.clear()  # as if this were another process
+        _, token_queries = self.get()
+        self.assertEqual(token_queries, [])
+        self.token.delete()
+        self.assertIsNone(cache.get(authentication.cache_key(self.token.key)))
+
+    def test_lru_evicts_least_recently_used(self):
+        lru = authentication.LRUCache(maxsize=2)
+        lru.set('a', 1, ttl=60)
+        lru.set('b', 2, ttl=60)
+        lru.get('a')
+        lru.set('c', 3, ttl=60)
+        self.assertEqual((lru.get('a'), lru.get('b'), lru.get('c')), (1, None, 3))
+
+
+@override_settings(GITHUB_CLIENT_ID='client-id', GITHUB_CLIENT_SECRET='client-secret', GITHUB_RETRY_BACKOFF=0)
+class GitHubCallbackTestCase(APITestCase):
+    def setUp(self):
+        self.url = reverse('github-callback')
+
+    def login(self, **stub_options):
+        stub = GitHubStub(**stub_options).start()
+        self.addCleanup(stub.stop)
+        with override_settings(**stub.settings()):
+            started = time.monotonic()
+            response = self.client.post(self.url, {'code': 'oauth-code'}, format='json')
+            self.elapsed = time.monotonic() - started
+        return stub, response
+
+    def test_login_creates_user_with_primary_email(self):
+        stub, response = self.login()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['user'], {'username': 'octocat', 'email': 'octocat@example.com'})
+        self.assertTrue(Token.objects.filter(key=response.data['key'], user__username='octocat').exists())
+
+    def test_profile_and_emails_are_fetched_concurrently(self):
+        stub, response = self.login(delay={'/user': 0.3, '/user/emails': 0.3})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # both calls were being served at the same time
+        self.assertEqual(stub.max_in_flight, 2)
+
+    def test_server_errors_are_retried(self):
+        stub, response = self.login(failures={'/user': 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(stub.requests['/user'], 3)
+
+    def test_token_exchange_is_not_retried(self):
+        # an OAuth code is single use, so a POST that reached GitHub must not be resent
+        stub, response = self.login(failures={'/login/oauth/access_token': 1})
+        self.assertEqual(response.status_code, status.HTTP_500_INTERNAL_SERVER_ERROR)
+        self.assertEqual(stub.requests['/login/oauth/access_token'], 1)
+
+    @override_settings(GITHUB_READ_TIMEOUT=0.2, GITHUB_MAX_RETRIES=0)
+    def test_slow_github_times_out(self):
+        stub, response = self.login(delay={'/login/oauth/access_token': 2})
+        self.assertEqual(response.status_code, status.HTTP_500_INTERNAL_SERVER_ERROR)
+        self.assertIn('timed out', response.data['error'])
+        self.assertLess(self.elapsed, 1.5)
@@ -1,15 +1,17 @@
 from django.shortcuts import render
 from django.http import JsonResponse
 from rest_framework import status
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, throttle_classes
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 from rest_framework.authtoken.models import Token
-from .github import get_github_token, get_github_user, get_or_create_user
+from config.throttling import OAuthCallbackThrottle
+from .github import get_github_token, get_github_profile, get_or_create_user
 import traceback
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
+@throttle_classes([OAuthCallbackThrottle])
 def github_callback(request):
     """Handle GitHub OAuth callback"""
     code = request.data.get('code')
@@ -26,8 +28,8 @@ def github_callback(request):
         access_token = get_github_token(code)
         print(f"Successfully obtained GitHub access token")
             
-        # Get GitHub user data
-        github_user = get_github_user(access_token)
+        # Get GitHub user data and email addresses
+        github_user, emails = get_github_profile(access_token)
         if not github_user:
             return Response(
                 {'error': 'Failed to get GitHub user data'}, 
@@ -37,7 +39,7 @@ def github_callback(request):
         print(f"Successfully obtained GitHub user data: {github_user.get('login')}")
             
         # Get or create user
-        user = get_or_create_user(github_user, access_token)
+        user = get_or_create_user(github_user, emails)
         print(f"User processed successfully: {user.username}")
             
         # Generate auth token
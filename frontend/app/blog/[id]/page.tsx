@@ -3,9 +3,10 @@
 import { useEffect, useState, useRef, useLayoutEffect } from 'react';
 import Link from 'next/link';
 import { useParams, notFound } from 'next/navigation';
-import { fetchBlogPost } from '@/app/lib/blogApi';
+import { fetchBlogPost, fetchRelatedPosts } from '@/app/lib/blogApi';
 import { BlogPost } from '@/app/lib/blogTypes';
 import BlogPostActions from '@/app/components/blog/BlogPostActions';
+import BlogPostCard from '@/app/components/blog/BlogPostCard';
 import CommentSection from '@/app/components/comments/CommentSection';
 import ReactMarkdown from 'react-markdown';
 import remarkGfm from 'remark-gfm';
@@ -19,6 +20,7 @@ export default function BlogPostDetailPage() {
   const id = params?.id as string;
   const [post, setPost] = useState<BlogPost | null>(null);
   const [loading, setLoading] = useState(true);
+  const [relatedPosts, setRelatedPosts] = useState<BlogPost[]>([]);
 
   useEffect(() => {
     async function loadPost() {
@@ -39,6 +41,11 @@ export default function BlogPostDetailPage() {
     loadPost();
   }, [id]);
 
+  useEffect(() => {
+    // fetchRelatedPosts resolves to an empty list on errors, so the section is simply left out
+    fetchRelatedPosts(id).then(setRelatedPosts);
+  }, [id]);
+
   if (loading) {
     return <div className="text-center p-8">Loading...</div>;
   }
@@ -74,6 +81,16 @@ export default function BlogPostDetailPage() {
         </div>
       </div>
       <BlogPostActions postId={post.id} authorName={post.author} />
+      {relatedPosts.length > 0 && (
+        <div className="mb-8">
+          <h2 className="text-2xl font-bold mb-4">Related Posts</h2>
+          <div className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-3 gap-6">
+            {relatedPosts.map((relatedPost) => (
+              <BlogPostCard key={relatedPost.id} post={relatedPost} />
+            ))}
+          </div>
+        </div>
+      )}
       <div className="bg-white rounded-lg shadow-md p-6">
         <div className="w-full">
           <CommentSection postId={post.id} postAuthor={post.author} />
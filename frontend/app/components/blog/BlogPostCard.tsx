@@ -15,6 +15,7 @@ export default function BlogPostCard({ post }: BlogPostCardProps) {
       </h2>
       <p className="text-gray-600 text-sm mb-3">
         Author: {post.author} | Published: {new Date(post.published_date).toLocaleDateString()}
+        {post.reading_time ? ` | ${post.reading_time} min read` : ''}
       </p>
       {post.tags && post.tags.length > 0 && (
         <div className="mb-3">
@@ -25,7 +26,7 @@ export default function BlogPostCard({ post }: BlogPostCardProps) {
           ))}
         </div>
       )}
-      <p className="text-gray-700 mb-4">{post.summary}</p>
+      <p className="text-gray-700 mb-4">{post.summary || post.excerpt}</p>
       <Link href={`/blog/${post.id}`} className="text-blue-500 hover:text-blue-700 font-medium">
         Read More &rarr;
       </Link>
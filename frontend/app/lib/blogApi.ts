@@ -1,25 +1,31 @@
-import { BlogPost, BlogPostFormData, ApiError } from './blogTypes';
+import { BlogPost, BlogPostFormData, ApiError, PaginatedResponse } from './blogTypes';
 
 const API_BASE_URL = 'http://localhost:8000'; 
 const BLOG_URL = `${API_BASE_URL}/blog`;
 
 /**
- * Fetches all blog posts from the API.
+ * Fetches every blog post from the API (newest first), following the `next` link of each page.
  * @returns A promise that resolves to an array of BlogPost objects.
  */
 export async function fetchBlogPosts(): Promise<BlogPost[]> {
   try {
-    const res = await fetch(`${BLOG_URL}/posts/`, {
-      next: { revalidate: 60 } // Revalidate data every 60 seconds
-    });
-
-    if (!res.ok) {
-      const errorData: ApiError = await res.json();
-      throw new Error(`Failed to fetch posts: ${errorData.detail || res.statusText}`);
+    const posts: BlogPost[] = [];
+    let url: string | null = `${BLOG_URL}/posts/`;
+    while (url) {
+      const res: Response = await fetch(url, {
+        next: { revalidate: 60 } // Revalidate data every 60 seconds
+      });
+
+      if (!res.ok) {
+        const errorData: ApiError = await res.json();
+        throw new Error(`Failed to fetch posts: ${errorData.detail || res.statusText}`);
+      }
+
+      const data: PaginatedResponse<BlogPost> = await res.json();
+      posts.push(...data.results);
+      url = data.next;
     }
-
-    const data: BlogPost[] = await res.json();
-    return data;
+    return posts;
   } catch (error) {
     console.error('Error fetching blog posts:', error);
     return [];
@@ -54,6 +60,30 @@ export async function fetchBlogPost(id: string): Promise<BlogPost | null> {
   }
 }
 
+/**
+ * Fetches the posts most related to a blog post by their shared tags, best first.
+ * @param id The ID of the blog post.
+ * @returns A promise that resolves to an array of BlogPost objects (without their content).
+ */
+export async function fetchRelatedPosts(id: string): Promise<BlogPost[]> {
+  try {
+    const res = await fetch(`${BLOG_URL}/posts/${id}/related/`, {
+      next: { revalidate: 60 }
+    });
+
+    if (!res.ok) {
+      const errorData: ApiError = await res.json();
+      throw new Error(`Failed to fetch posts related to ${id}: ${errorData.detail || res.statusText}`);
+    }
+
+    const data: BlogPost[] = await res.json();
+    return data;
+  } catch (error) {
+    console.error(`Error fetching posts related to ${id}:`, error);
+    return [];
+  }
+}
+
 /**
  * Creates a new blog post.
  * @param postData The data for the new blog post.
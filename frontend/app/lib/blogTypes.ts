@@ -10,6 +10,20 @@ export interface BlogPost {
   tags: string[];
   content: string;
   content_html?: string; // Added for type-safe access to the backend's HTML field
+  excerpt?: string; // plain-text opening of the post, generated by the backend
+  reading_time?: number; // minutes
+  word_count?: number;
+  toc?: TocEntry[]; // headings of the post, linking to the ids in content_html
+}
+
+/**
+ * Defines one heading of a post's table of contents.
+ */
+export interface TocEntry {
+  level: number;
+  id: string;
+  title: string;
+  children: TocEntry[];
 }
 
 /**
@@ -25,6 +39,16 @@ export interface BlogPostFormData {
   content: string;
 }
 
+/**
+ * Defines the envelope of cursor-paginated list responses.
+ * `next` and `previous` are full URLs carrying an opaque cursor, or null at either end.
+ */
+export interface PaginatedResponse<T> {
+  next: string | null;
+  previous: string | null;
+  results: T[];
+}
+
 /**
  * Defines common API error response structure.
  */
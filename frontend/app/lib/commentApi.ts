@@ -1,9 +1,13 @@
+import { PaginatedResponse } from './blogTypes';
+
 const API_BASE_URL = 'http://localhost:8000'; 
 const COMMENT_URL = `${API_BASE_URL}/comments`;
 
 export interface Comment {
   id: number;
   post_id: number;
+  parent: number | null;
+  depth: number;
   author_id: number;
   author_username: string;
   content: string;
@@ -13,6 +17,7 @@ export interface Comment {
 
 export interface CreateCommentData {
   post_id: number;
+  parent?: number | null;
   content: string;
 }
 
@@ -20,13 +25,20 @@ export interface UpdateCommentData {
   content: string;
 }
 
-// Fetch comments for a specific post
+// Fetch every comment for a specific post, following the `next` link of each page
 export const fetchComments = async (postId: number): Promise<Comment[]> => {
-  const response = await fetch(`${COMMENT_URL}/?post_id=${postId}`);
-  if (!response.ok) {
-    throw new Error('Failed to fetch comments');
+  const comments: Comment[] = [];
+  let url: string | null = `${COMMENT_URL}/?post_id=${postId}`;
+  while (url) {
+    const response: Response = await fetch(url);
+    if (!response.ok) {
+      throw new Error('Failed to fetch comments');
+    }
+    const data: PaginatedResponse<Comment> = await response.json();
+    comments.push(...data.results);
+    url = data.next;
   }
-  return response.json();
+  return comments;
 };
 
 // Create a new comment